@@ -0,0 +1,141 @@
+"""Measures the throughput of the module level API with concurrent readers.
+
+Usage: python benchmarks/client_reads.py
+
+Threads call `lekko_client.get_int` in a loop for a fixed time, through the lock free read path, and through
+the same path serialized by a lock, which is how reads used to be. Two clients are read:
+
+- remote, which waits on each read like the API and sidecar clients wait on an RPC, releasing the GIL
+- local, which evaluates a compiled plan like the cached clients, holding the GIL
+
+Remote reads scale with the number of threads only when they aren't serialized. Local reads can't scale under
+the GIL either way, which shows the cost of the read path itself.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+from google.protobuf.wrappers_pb2 import Int64Value
+
+import lekko_client
+from lekko_client.clients import Client
+from lekko_client.context import ContextArg
+from lekko_client.evaluation.plan import build_plan
+from lekko_client.gen.lekko.feature.v1beta1.feature_pb2 import Constraint, Feature
+from lekko_client.gen.lekko.rules.v1beta3.rules_pb2 import (
+    Atom,
+    ComparisonOperator,
+    Rule,
+)
+
+THREAD_COUNTS = [1, 2, 4, 8, 16]
+DURATION_S = 1.0
+RPC_LATENCY_S = 0.0002
+
+
+class BenchmarkClient(Client):
+    def __init__(self, read: Callable[[ContextArg], int]) -> None:
+        self.read = read
+
+    def get_bool(self, namespace: str, key: str, context: ContextArg) -> bool:
+        raise NotImplementedError
+
+    def get_int(self, namespace: str, key: str, context: ContextArg) -> int:
+        return self.read(context)
+
+    def get_float(self, namespace: str, key: str, context: ContextArg) -> float:
+        raise NotImplementedError
+
+    def get_string(self, namespace: str, key: str, context: ContextArg) -> str:
+        raise NotImplementedError
+
+    def get_json(self, namespace: str, key: str, context: ContextArg, read_only: bool = False) -> Any:
+        raise NotImplementedError
+
+    def get_proto(self, namespace: str, key: str, context: ContextArg) -> Any:
+        raise NotImplementedError
+
+    def get_proto_by_type(self, namespace: str, key: str, context: ContextArg, proto_message_type: Any) -> Any:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+def remote_read(context: ContextArg) -> int:
+    time.sleep(RPC_LATENCY_S)
+    return 1
+
+
+def local_read() -> Callable[[ContextArg], int]:
+    feature = Feature(key="config")
+    feature.tree.default.Pack(Int64Value(value=-1))
+    for i in range(8):
+        constraint = Constraint(
+            rule_ast_new=Rule(
+                atom=Atom(
+                    context_key="region",
+                    comparison_operator=ComparisonOperator.COMPARISON_OPERATOR_EQUALS,
+                    comparison_value={"string_value": f"r{i}"},
+                )
+            )
+        )
+        constraint.value.Pack(Int64Value(value=i))
+        feature.tree.constraints.append(constraint)
+    plan = build_plan(feature, "ns")
+    return lambda context: 1 if plan.evaluate(dict(context)) else 0
+
+
+def reads_per_second(threads: int, read: Callable[[], Any]) -> float:
+    counts = [0] * threads
+    start = threading.Barrier(threads + 1)
+    stop = threading.Event()
+
+    def run(i: int) -> None:
+        start.wait()
+        count = 0
+        while not stop.is_set():
+            read()
+            count += 1
+        counts[i] = count
+
+    workers = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    start.wait()
+    time.sleep(DURATION_S)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    return sum(counts) / DURATION_S
+
+
+def main() -> None:
+    lock = threading.RLock()
+    context = {"region": "r5"}
+
+    def lock_free() -> int:
+        return lekko_client.get_int("ns", "config", context)
+
+    def locked() -> int:
+        with lock:
+            return lekko_client.get_int("ns", "config", context)
+
+    clients: Dict[str, Callable[[ContextArg], int]] = {"remote": remote_read, "local": local_read()}
+    for name, read in clients.items():
+        lekko_client.set_client(BenchmarkClient(read))
+        print(f"{name} client (reads per second)")
+        print(f"{'threads':>8} {'locked':>12} {'lock free':>12} {'scaling':>8}")
+        baseline: List[float] = []
+        for threads in THREAD_COUNTS:
+            locked_rate = reads_per_second(threads, locked)
+            lock_free_rate = reads_per_second(threads, lock_free)
+            baseline.append(lock_free_rate)
+            print(f"{threads:>8} {locked_rate:>12.0f} {lock_free_rate:>12.0f} {lock_free_rate / baseline[0]:>7.1f}x")
+        print()
+    lekko_client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Compares the change detection of `Store.load` with sorting and hashing the serialized contents.
+
+Usage: python benchmarks/content_hash.py
+
+For each repository size, contents made of configs with a few constraints, spread over namespaces of 100
+configs, are checked for changes the way a poll that finds nothing new does: with the previous approach, sorting
+every namespace and hashing the whole serialized response, and with the Merkle hash of config names and shas.
+"""
+
+import hashlib
+import timeit
+
+from google.protobuf.wrappers_pb2 import Int64Value
+
+from lekko_client.gen.lekko.backend.v1beta1.distribution_service_pb2 import (
+    Feature as DistFeature,
+)
+from lekko_client.gen.lekko.backend.v1beta1.distribution_service_pb2 import (
+    GetRepositoryContentsResponse,
+    Namespace,
+)
+from lekko_client.gen.lekko.feature.v1beta1.feature_pb2 import Constraint, Feature
+from lekko_client.gen.lekko.rules.v1beta3.rules_pb2 import (
+    Atom,
+    ComparisonOperator,
+    Rule,
+)
+from lekko_client.stores.memory import MemoryStore
+from lekko_client.stores.store import Store
+
+CONFIG_COUNTS = [1_000, 10_000, 50_000]
+NAMESPACE_SIZE = 100
+
+
+def feature(key: str) -> Feature:
+    feature = Feature(key=key, description=f"Config {key}")
+    feature.tree.default.Pack(Int64Value(value=-1))
+    for i in range(4):
+        constraint = Constraint(
+            rule_ast_new=Rule(
+                atom=Atom(
+                    context_key="region",
+                    comparison_operator=ComparisonOperator.COMPARISON_OPERATOR_EQUALS,
+                    comparison_value={"string_value": f"region_{i}"},
+                )
+            )
+        )
+        constraint.value.Pack(Int64Value(value=i))
+        feature.tree.constraints.append(constraint)
+    return feature
+
+
+def repository_contents(count: int) -> GetRepositoryContentsResponse:
+    contents = GetRepositoryContentsResponse(commit_sha="commit")
+    for n in range(count // NAMESPACE_SIZE):
+        namespace = Namespace(name=f"ns_{n}")
+        for i in range(NAMESPACE_SIZE):
+            key = f"config_{i}"
+            namespace.features.append(
+                DistFeature(name=key, sha=hashlib.sha1(f"{n}/{key}".encode()).hexdigest(), feature=feature(key))
+            )
+        contents.namespaces.append(namespace)
+    return contents
+
+
+def sort_and_hash(contents: GetRepositoryContentsResponse) -> str:
+    return hashlib.sha256(Store.sort_contents(contents).SerializeToString()).hexdigest()
+
+
+def main() -> None:
+    print("change detection (ms per poll)")
+    print(f"{'configs':>8} {'size (MB)':>10} {'sort+sha256':>12} {'merkle':>10}")
+    for count in CONFIG_COUNTS:
+        contents = repository_contents(count)
+        size = contents.ByteSize() / 1e6
+        number = max(1, 20_000 // count)
+        full = min(timeit.repeat(lambda: sort_and_hash(contents), number=number, repeat=5)) / number
+        merkle = min(timeit.repeat(lambda: MemoryStore.hash_contents(contents), number=number, repeat=5)) / number
+        print(f"{count:>8} {size:>10.1f} {full * 1e3:>12.2f} {merkle * 1e3:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Compares evaluating runs of sibling constraints through the plan indexes with a linear scan.
+
+Usage: python benchmarks/plan_indexes.py
+
+For each run length, a config made of a single run of equality (`region == "r<i>"`) or numeric range
+(`size < <i>`) constraints is evaluated for contexts that match every constraint of the run in turn, and for one
+that matches none. The crossover is the shortest run for which the index is faster, which is what
+`_MIN_DISPATCH_RUN` and `_MIN_INTERVAL_RUN` in `lekko_client.evaluation.plan` are based on.
+"""
+
+import timeit
+from typing import Callable, Dict, List
+
+from google.protobuf.wrappers_pb2 import Int64Value
+
+from lekko_client.evaluation.plan import build_plan
+from lekko_client.gen.lekko.feature.v1beta1.feature_pb2 import Constraint, Feature
+from lekko_client.gen.lekko.rules.v1beta3.rules_pb2 import (
+    Atom,
+    ComparisonOperator,
+    Rule,
+)
+from lekko_client.models import NativeContext
+
+RUN_LENGTHS = [1, 2, 3, 4, 6, 8, 16, 32, 64, 128, 256]
+
+
+def equality_feature(length: int) -> Feature:
+    return _feature(
+        length,
+        lambda i: Atom(
+            context_key="region",
+            comparison_operator=ComparisonOperator.COMPARISON_OPERATOR_EQUALS,
+            comparison_value={"string_value": f"r{i}"},
+        ),
+    )
+
+
+def range_feature(length: int) -> Feature:
+    return _feature(
+        length,
+        lambda i: Atom(
+            context_key="size",
+            comparison_operator=ComparisonOperator.COMPARISON_OPERATOR_LESS_THAN,
+            comparison_value={"number_value": (i + 1) * 10},
+        ),
+    )
+
+
+def _feature(length: int, atom: Callable[[int], Atom]) -> Feature:
+    feature = Feature(key="config")
+    feature.tree.default.Pack(Int64Value(value=-1))
+    for i in range(length):
+        constraint = Constraint(rule_ast_new=Rule(atom=atom(i)))
+        constraint.value.Pack(Int64Value(value=i))
+        feature.tree.constraints.append(constraint)
+    return feature
+
+
+def time_per_evaluation(feature: Feature, contexts: List[NativeContext], indexed: bool) -> float:
+    plan = build_plan(feature, "ns")
+    if not indexed:
+        plan.dispatch = {}
+
+    def run() -> None:
+        for context in contexts:
+            plan.evaluate(context)
+
+    number = max(1, 20000 // len(contexts))
+    return min(timeit.repeat(run, number=number, repeat=5)) / number / len(contexts)
+
+
+def main() -> None:
+    cases: Dict[str, Callable[[int], Feature]] = {"equality": equality_feature, "range": range_feature}
+    contexts: Dict[str, Callable[[int], List[NativeContext]]] = {
+        "equality": lambda length: [{"region": f"r{i}"} for i in range(length)] + [{"region": "none"}],
+        "range": lambda length: [{"size": i * 10 + 5} for i in range(length)] + [{"size": length * 10 + 5}],
+    }
+    for name, make_feature in cases.items():
+        print(f"{name} runs (us per evaluation)")
+        print(f"{'length':>8} {'linear':>10} {'indexed':>10}")
+        crossover = None
+        for length in RUN_LENGTHS:
+            feature = make_feature(length)
+            linear = time_per_evaluation(feature, contexts[name](length), indexed=False)
+            indexed = time_per_evaluation(feature, contexts[name](length), indexed=True)
+            if crossover is None and indexed < linear:
+                crossover = length
+            print(f"{length:>8} {linear * 1e6:>10.3f} {indexed * 1e6:>10.3f}")
+        print(f"crossover: {crossover}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,9 @@
 """Lekko Python SDK Client"""
 
-import functools
 import logging
 from dataclasses import dataclass
-from threading import RLock
-from typing import Any, Callable, Dict, Optional, Type, TypeVar, cast
+from threading import Event, Lock, RLock, get_ident
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
 
 from google.protobuf.message import Message as ProtoMessage
 
@@ -14,16 +13,80 @@ from lekko_client.clients import (
     CachedBackendClient,
     CachedGitClient,
     Client,
+    ConfigHandle,
     SidecarClient,
 )
+from lekko_client.clients.distribution_client import CachedDistributionClient
+from lekko_client.clients.handle import ConfigRequest, HandleType
 from lekko_client.constants import LEKKO_API_URL, LEKKO_SIDECAR_URL  # noqa
+from lekko_client.context import (  # noqa
+    Context,
+    ContextArg,
+    context_scope,
+    current_scope,
+)
+from lekko_client.models import ConfigValue
 from lekko_client.stores.memory import MemoryStore
 
 __version__ = "0.2.1"
 
 logging.getLogger(__name__).addHandler(logging.NullHandler())
 
-__client: Optional[Client] = None
+
+class _ClientRef:
+    """The global client, along with the reads in flight through it.
+
+    Reads only register their thread, without locking: list appends and removals are atomic. A swapped out client
+    is retired, and only closed once every read that started before the swap is done. A client retired from within
+    a read through it is closed by the last of those reads instead, since waiting for them would never end.
+    """
+
+    __slots__ = ("client", "_reads", "_retired", "_close_on_release", "_drained", "_closing")
+
+    def __init__(self, client: Optional[Client]) -> None:
+        self.client = client
+        self._reads: List[int] = []
+        self._retired = False
+        self._close_on_release = False
+        self._drained = Event()
+        # Acquired by whichever thread closes the client, so that it's closed once
+        self._closing = Lock()
+
+    def acquire(self) -> None:
+        self._reads.append(get_ident())
+
+    def release(self) -> None:
+        self._reads.remove(get_ident())
+        if self._retired and not self._reads:
+            if self._close_on_release:
+                self._close()
+            else:
+                self._drained.set()
+
+    def retire(self) -> None:
+        if get_ident() in self._reads:
+            self._close_on_release = True
+            self._retired = True
+            return
+        self._retired = True
+        if self._reads:
+            self._drained.wait()
+        self._close()
+
+    def _close(self) -> None:
+        if self.client and self._closing.acquire(blocking=False):
+            self.client.close()
+
+    def __enter__(self) -> Client:
+        assert self.client
+        return self.client
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.release()
+
+
+__client_ref = _ClientRef(None)
+# Serializes the changes of the global client, reads don't take it
 __client_lock = RLock()
 
 
@@ -49,35 +112,35 @@ class APIConfig(Config):
 @dataclass(kw_only=True)
 class CachedServerConfig(Config):
     update_interval_ms: int = 15 * 1000  # 15s
+    result_cache_size: int = 0
 
 
 @dataclass(kw_only=True)
 class CachedGitConfig(Config):
     git_repo_path: str
+    result_cache_size: int = 0
 
 
 def initialize(config: Config) -> Client:
-    global __client
+    client: Client
     with __client_lock:
-        if __client:
-            __client.close()
         match config:
             case APIConfig():
-                __client = APIClient(
+                client = APIClient(
                     owner_name=config.owner_name,
                     repo_name=config.repo_name,
                     api_key=config.api_key,
                     context=config.context,
                 )
             case SidecarConfig():
-                __client = SidecarClient(
+                client = SidecarClient(
                     owner_name=config.owner_name,
                     repo_name=config.repo_name,
                     api_key=config.api_key,
                     context=config.context,
                 )
             case CachedGitConfig():
-                __client = CachedGitClient(
+                client = CachedGitClient(
                     config.lekko_uri,
                     config.owner_name,
                     config.repo_name,
@@ -85,9 +148,10 @@ def initialize(config: Config) -> Client:
                     config.git_repo_path,
                     config.api_key,
                     config.context,
+                    result_cache_size=config.result_cache_size,
                 )
             case CachedServerConfig():
-                __client = CachedBackendClient(
+                client = CachedBackendClient(
                     config.lekko_uri,
                     config.owner_name,
                     config.repo_name,
@@ -95,88 +159,134 @@ def initialize(config: Config) -> Client:
                     api_key=config.api_key,
                     context=config.context,
                     update_interval_ms=config.update_interval_ms,
+                    result_cache_size=config.result_cache_size,
                 )
             case _:
                 raise exceptions.LekkoError("Unknown client mode")
-        return __client
+    __swap_client(client)
+    return client
 
 
 def set_client(client: Client) -> None:
-    global __client
-    with __client_lock:
-        if __client:
-            __client.close()
-        __client = client
+    __swap_client(client)
 
 
 def close() -> None:
-    global __client
-    with __client_lock:
-        if __client:
-            __client.close()
-            __client = None
+    __swap_client(None)
 
 
-TFunc = TypeVar("TFunc", bound=Callable[..., Any])
+def __swap_client(client: Optional[Client]) -> None:
+    """Replaces the global client, and closes the previous one once the reads in flight through it are done"""
+    global __client_ref
+    with __client_lock:
+        previous = __client_ref
+        __client_ref = _ClientRef(client)
+    # Retired without holding the lock, since the reads it waits for may replace the global client themselves
+    previous.retire()
 
 
-def __get_safe(func: TFunc) -> TFunc:
-    @functools.wraps(func)
-    def wrapper(*args: Any, **kwargs: Any) -> Any:
-        with __client_lock:
-            if not __client:
-                raise exceptions.ClientNotInitialized("lekko_client.initialize() must be called prior to using API")
-            return func(*args, **kwargs)
+def __read_client() -> _ClientRef:
+    """Registers a read of the global client without locking, to be used as a context manager around the read"""
+    while True:
+        ref = __client_ref
+        ref.acquire()
+        # A client that was swapped out before the read was registered may already be closed
+        if ref is __client_ref:
+            break
+        ref.release()
+    if ref.client is None:
+        ref.release()
+        raise exceptions.ClientNotInitialized("lekko_client.initialize() must be called prior to using API")
+    return ref
 
-    return cast(TFunc, wrapper)
 
+def __get_context(context: Optional[ContextArg]) -> ContextArg:
+    # Calls without a context use the current context scope's
+    if context is not None:
+        return context
+    scope = current_scope()
+    return scope.context if scope else {}
 
-@__get_safe
-def get_bool(namespace: str, key: str, context: Dict[str, Any]) -> bool:
-    assert __client
-    return __client.get_bool(namespace, key, context)
 
+def get_bool(namespace: str, key: str, context: Optional[ContextArg] = None) -> bool:
+    with __read_client() as client:
+        return client.get_bool(namespace, key, __get_context(context))
 
-@__get_safe
-def get_int(namespace: str, key: str, context: Dict[str, Any]) -> int:
-    assert __client
-    return __client.get_int(namespace, key, context)
 
+def get_int(namespace: str, key: str, context: Optional[ContextArg] = None) -> int:
+    with __read_client() as client:
+        return client.get_int(namespace, key, __get_context(context))
 
-@__get_safe
-def get_float(namespace: str, key: str, context: Dict[str, Any]) -> float:
-    assert __client
-    return __client.get_float(namespace, key, context)
 
+def get_float(namespace: str, key: str, context: Optional[ContextArg] = None) -> float:
+    with __read_client() as client:
+        return client.get_float(namespace, key, __get_context(context))
 
-@__get_safe
-def get_string(namespace: str, key: str, context: Dict[str, Any]) -> str:
-    assert __client
-    return __client.get_string(namespace, key, context)
 
+def get_string(namespace: str, key: str, context: Optional[ContextArg] = None) -> str:
+    with __read_client() as client:
+        return client.get_string(namespace, key, __get_context(context))
 
-@__get_safe
-def get_json(namespace: str, key: str, context: Dict[str, Any]) -> Any:
-    assert __client
-    return __client.get_json(namespace, key, context)
+
+def get_json(namespace: str, key: str, context: Optional[ContextArg] = None, read_only: bool = False) -> Any:
+    with __read_client() as client:
+        return client.get_json(namespace, key, __get_context(context), read_only)
 
 
-@__get_safe
 def get_proto(
     namespace: str,
     key: str,
-    context: Dict[str, Any],
+    context: Optional[ContextArg] = None,
 ) -> ProtoMessage:
-    assert __client
-    return __client.get_proto(namespace, key, context)
+    with __read_client() as client:
+        return client.get_proto(namespace, key, __get_context(context))
 
 
-@__get_safe
 def get_proto_by_type(
     namespace: str,
     key: str,
-    context: Dict[str, Any],
+    context: Optional[ContextArg],
     proto_message_type: Type[Client.ProtoType],
 ) -> Client.ProtoType:
-    assert __client
-    return __client.get_proto_by_type(namespace, key, context, proto_message_type)
+    with __read_client() as client:
+        return client.get_proto_by_type(namespace, key, __get_context(context), proto_message_type)
+
+
+def bind(namespace: str, key: str, typ: Type[HandleType]) -> ConfigHandle[HandleType]:
+    """Returns a handle reading a config as `typ` through the global client, like the top level `get_*` functions.
+
+    Handles can be declared before the client is initialized, and are bound again when it is replaced.
+    """
+    bound: Optional[Tuple[_ClientRef, ConfigHandle[HandleType]]] = None
+
+    def get(context: Optional[ContextArg]) -> HandleType:
+        nonlocal bound
+        ref = __read_client()
+        with ref as client:
+            ref_handle = bound
+            if ref_handle is None or ref_handle[0] is not ref:
+                ref_handle = bound = (ref, client.bind(namespace, key, typ))
+            return ref_handle[1](__get_context(context))
+
+    return ConfigHandle(namespace, key, typ, get)
+
+
+def get_many(requests: Sequence[ConfigRequest], context: Optional[ContextArg] = None) -> List[Any]:
+    """Reads several configs for one context, returning their values in the order of `requests`, which are
+    (namespace, key, type) tuples"""
+    with __read_client() as client:
+        return client.get_many(requests, __get_context(context))
+
+
+def evaluate_namespace(namespace: str, context: Optional[ContextArg] = None) -> Dict[str, ConfigValue]:
+    with __read_client() as client:
+        if not isinstance(client, CachedDistributionClient):
+            raise exceptions.LekkoError("Evaluating whole namespaces is only supported by cached clients")
+        return client.evaluate_namespace(namespace, __get_context(context))
+
+
+def evaluate_all(context: Optional[ContextArg] = None) -> Dict[str, Dict[str, ConfigValue]]:
+    with __read_client() as client:
+        if not isinstance(client, CachedDistributionClient):
+            raise exceptions.LekkoError("Evaluating all configs is only supported by cached clients")
+        return client.evaluate_all(__get_context(context))
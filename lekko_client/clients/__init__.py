@@ -6,6 +6,7 @@ from lekko_client.clients.config_client import (  # noqa
     ConfigServiceClient,
     SidecarClient,
 )
+from lekko_client.clients.handle import ConfigHandle  # noqa
 
 __all__ = [
     "APIClient",
@@ -14,4 +15,5 @@ __all__ = [
     "CachedBackendClient",
     "CachedGitClient",
     "Client",
+    "ConfigHandle",
 ]
@@ -4,7 +4,6 @@ from threading import Event, Thread
 from typing import Any, Dict, Optional
 
 import grpc
-from google.protobuf.any_pb2 import Any as ProtoAny
 
 from lekko_client.clients.distribution_client import CachedDistributionClient
 from lekko_client.exceptions import ClientNotInitialized
@@ -47,12 +46,13 @@ class CachedBackendClient(CachedDistributionClient):
         credentials: grpc.ChannelCredentials = grpc.ssl_channel_credentials(),
         *,
         update_interval_ms: int,
+        result_cache_size: int = 0,
     ) -> None:
         self.update_interval_ms = update_interval_ms
         self.timeout = None
         self.closed = False
         self.initialized_event = Event()
-        super().__init__(uri, owner_name, repo_name, store, api_key, context, credentials)
+        super().__init__(uri, owner_name, repo_name, store, api_key, context, credentials, result_cache_size)
 
     def initialize(self) -> None:
         super().initialize()
@@ -90,7 +90,7 @@ class CachedBackendClient(CachedDistributionClient):
         self.refresh_thread.stop()
         self.initialized_event.clear()
 
-    def get(self, namespace: str, key: str, context: Dict[str, Any]) -> ProtoAny:
-        if not self.initialized_event.wait(timeout=5):  # Give the background thread 5 seconds to populate
+    def _ensure_loaded(self) -> None:
+        # Checked without locking once loaded, otherwise give the background thread 5 seconds to populate
+        if not self.initialized_event.is_set() and not self.initialized_event.wait(timeout=5):
             raise ClientNotInitialized("Repository contents not yet loaded from server")
-        return super().get(namespace, key, context)
@@ -49,11 +49,14 @@ class CachedGitClient(CachedDistributionClient):
         context: Optional[Dict[str, Any]] = None,
         credentials: grpc.ChannelCredentials = grpc.ssl_channel_credentials(),
         should_watch: Optional[bool] = True,
+        result_cache_size: int = 0,
     ):
         self.watcher: Optional[BaseObserver] = None
         self.path = path
         self.should_watch = should_watch
-        super().__init__(lekko_uri, repository_owner, repository_name, store, api_key, context, credentials)
+        super().__init__(
+            lekko_uri, repository_owner, repository_name, store, api_key, context, credentials, result_cache_size
+        )
 
     def initialize(self) -> None:
         super().initialize()
@@ -1,9 +1,19 @@
+import functools
 import os
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional, Type, TypeVar
+from typing import Any, Callable, Dict, List, Optional, Sequence, Type, TypeVar, cast
 
 from google.protobuf.message import Message as ProtoMessage
 
+from lekko_client.clients.handle import (
+    SCALAR_TYPES,
+    ConfigHandle,
+    ConfigRequest,
+    HandleType,
+    check_value_type,
+)
+from lekko_client.context import ContextArg
+
 
 class Client(ABC):
     ProtoType = TypeVar("ProtoType", bound=ProtoMessage)
@@ -22,23 +32,28 @@ class Client(ABC):
         self.api_key = api_key or os.environ.get("LEKKO_API_KEY")
 
     @abstractmethod
-    def get_bool(self, namespace: str, key: str, context: Dict[str, Any]) -> bool:
+    def get_bool(self, namespace: str, key: str, context: ContextArg) -> bool:
         ...
 
     @abstractmethod
-    def get_int(self, namespace: str, key: str, context: Dict[str, Any]) -> int:
+    def get_int(self, namespace: str, key: str, context: ContextArg) -> int:
         ...
 
     @abstractmethod
-    def get_float(self, namespace: str, key: str, context: Dict[str, Any]) -> float:
+    def get_float(self, namespace: str, key: str, context: ContextArg) -> float:
         ...
 
     @abstractmethod
-    def get_string(self, namespace: str, key: str, context: Dict[str, Any]) -> str:
+    def get_string(self, namespace: str, key: str, context: ContextArg) -> str:
         ...
 
     @abstractmethod
-    def get_json(self, namespace: str, key: str, context: Dict[str, Any]) -> Any:
+    def get_json(self, namespace: str, key: str, context: ContextArg, read_only: bool = False) -> Any:
+        """Returns a JSON config as Python objects.
+
+        With `read_only`, dicts are returned as MappingProxyType and lists as tuples, which may be shared between
+        callers instead of being copied.
+        """
         ...
 
     @abstractmethod
@@ -46,7 +61,7 @@ class Client(ABC):
         self,
         namsespace: str,
         key: str,
-        context: Dict[str, Any],
+        context: ContextArg,
     ) -> ProtoMessage:
         ...
 
@@ -55,11 +70,33 @@ class Client(ABC):
         self,
         namsespace: str,
         key: str,
-        context: Dict[str, Any],
+        context: ContextArg,
         proto_message_type: Type[ProtoType],
     ) -> ProtoType:
         ...
 
+    def bind(self, namespace: str, key: str, typ: Type[HandleType]) -> ConfigHandle[HandleType]:
+        """Returns a handle reading a config as `typ`, which is bool, int, float, str or a proto message type"""
+        get = self._getter(namespace, key, typ)
+        return ConfigHandle(namespace, key, typ, lambda context: get(context if context is not None else {}))
+
+    def get_many(self, requests: Sequence[ConfigRequest], context: ContextArg) -> List[Any]:
+        """Reads several configs for one context, returning their values in the order of `requests`.
+
+        Requests are (namespace, key, type) tuples, with the types `bind` takes. The configs are read one after
+        the other, unless the client overrides this.
+        """
+        getters = [self._getter(namespace, key, typ) for namespace, key, typ in requests]
+        return [get(context) for get in getters]
+
+    def _getter(self, namespace: str, key: str, typ: type) -> Callable[[ContextArg], Any]:
+        check_value_type(typ)
+        if typ in SCALAR_TYPES:
+            getter = {bool: self.get_bool, int: self.get_int, float: self.get_float, str: self.get_string}[typ]
+            return functools.partial(getter, namespace, key)
+        message_type = cast(Type[ProtoMessage], typ)
+        return lambda context: self.get_proto_by_type(namespace, key, context, message_type)
+
     @abstractmethod
     def close(self) -> None:
         ...
@@ -1,14 +1,24 @@
 import json
-from typing import Any, Callable, Dict, Optional, Tuple, Type, TypeVar
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+)
 
 import grpc
-from google.protobuf import descriptor_pool as proto_descriptor_pool
-from google.protobuf import symbol_database as proto_symbol_database
 from google.protobuf.any_pb2 import Any as AnyProto
 from google.protobuf.message import Message as ProtoMessage
 
 from lekko_client.clients.client import Client
+from lekko_client.clients.handle import SCALAR_TYPES, ConfigRequest, check_value_type
 from lekko_client.constants import LEKKO_API_URL, LEKKO_SIDECAR_URL
+from lekko_client.context import Context, ContextArg
 from lekko_client.exceptions import (
     AuthenticationError,
     ConfigNotFoundError,
@@ -22,6 +32,7 @@ from lekko_client.gen.lekko.client.v1beta1.configuration_service_pb2 import (
     GetIntValueRequest,
     GetJSONValueRequest,
     GetProtoValueRequest,
+    GetProtoValueResponse,
     GetStringValueRequest,
     RegisterRequest,
     RepositoryKey,
@@ -29,7 +40,13 @@ from lekko_client.gen.lekko.client.v1beta1.configuration_service_pb2 import (
 from lekko_client.gen.lekko.client.v1beta1.configuration_service_pb2_grpc import (
     ConfigurationServiceStub,
 )
-from lekko_client.helpers import convert_context, get_grpc_channel
+from lekko_client.helpers import (
+    convert_context,
+    freeze_json,
+    get_grpc_channel,
+    get_message_class,
+)
+from lekko_client.models import ClientContext
 
 ReturnType = TypeVar("ReturnType")
 
@@ -82,94 +99,145 @@ class ConfigServiceClient(Client):
         super().close()
         self._client.Deregister(DeregisterRequest())
 
-    def get_bool(self, namespace: str, key: str, context: dict[str, Any]) -> bool:
+    def get_bool(self, namespace: str, key: str, context: ContextArg) -> bool:
         return self._get(namespace, key, context, GetBoolValueRequest, self._client.GetBoolValue).value
 
-    def get_int(self, namespace: str, key: str, context: dict[str, Any]) -> int:
+    def get_int(self, namespace: str, key: str, context: ContextArg) -> int:
         return self._get(namespace, key, context, GetIntValueRequest, self._client.GetIntValue).value
 
-    def get_float(self, namespace: str, key: str, context: dict[str, Any]) -> float:
+    def get_float(self, namespace: str, key: str, context: ContextArg) -> float:
         return self._get(namespace, key, context, GetFloatValueRequest, self._client.GetFloatValue).value
 
-    def get_string(self, namespace: str, key: str, context: dict[str, Any]) -> str:
+    def get_string(self, namespace: str, key: str, context: ContextArg) -> str:
         return self._get(namespace, key, context, GetStringValueRequest, self._client.GetStringValue).value
 
-    def get_json(self, namespace: str, key: str, context: dict[str, Any]) -> Any:
+    def get_json(self, namespace: str, key: str, context: ContextArg, read_only: bool = False) -> Any:
         json_bytes = self._get(namespace, key, context, GetJSONValueRequest, self._client.GetJSONValue).value
-        return json.loads(json_bytes.decode("utf-8"))
+        val = json.loads(json_bytes.decode("utf-8"))
+        return freeze_json(val) if read_only else val
 
-    def get_proto(self, namespace: str, key: str, context: dict[str, Any]) -> ProtoMessage:
+    def get_proto(self, namespace: str, key: str, context: ContextArg) -> ProtoMessage:
         val = self._get_proto(namespace, key, context)
-        db = proto_symbol_database.SymbolDatabase(pool=proto_descriptor_pool.Default())  # type: ignore
-        try:
-            ret_val = db.GetSymbol(val.type_url.split("/")[1])()
+        message_class = get_message_class(val.type_url)
+        if message_class:
+            ret_val = message_class()
             if val.Unpack(ret_val):
                 return ret_val
-        except (KeyError, IndexError):
-            pass
         return val
 
     def get_proto_by_type(
         self,
         namespace: str,
         key: str,
-        context: Dict[str, Any],
+        context: ContextArg,
         proto_message_type: Type[Client.ProtoType],
     ) -> Client.ProtoType:
-        val = self._get_proto(namespace, key, context)
+        return self._unpack_message(self._get_proto(namespace, key, context), proto_message_type)
+
+    def _unpack_message(self, val: AnyProto, proto_message_type: Type[Client.ProtoType]) -> Client.ProtoType:
         ret_val = proto_message_type()
         if val.Unpack(ret_val):
             return ret_val
 
         raise MismatchedProtoType(f"Error unpacking from {val.type_url} to {proto_message_type.DESCRIPTOR.name}")
 
+    def get_many(self, requests: Sequence[ConfigRequest], context: ContextArg) -> List[Any]:
+        """Reads several configs for one context, returning their values in the order of `requests`.
+
+        The context is converted once, and the RPCs are sent concurrently instead of one after the other.
+        """
+        for _, _, typ in requests:
+            check_value_type(typ)
+        client_context = self._convert_context(context)
+        futures = []
+        for namespace, key, typ in requests:
+            req_type, fn = self._rpc(typ)
+            req = req_type(key=key, context=client_context, namespace=namespace, repo_key=self.repository)
+            futures.append(fn.future(req))
+
+        values: List[Any] = []
+        try:
+            for (_, _, typ), future in zip(requests, futures):
+                try:
+                    response = future.result()
+                except grpc.RpcError as e:
+                    self._translate_rpc_error(e)
+                    raise
+                if typ in SCALAR_TYPES:
+                    values.append(response.value)
+                else:
+                    values.append(self._unpack_message(self._proto_value(response), typ))
+        finally:
+            # Not waited for after an error
+            for future in futures[len(values) :]:
+                future.cancel()
+        return values
+
+    def _rpc(self, typ: type) -> Tuple[Any, Any]:
+        """Returns the request type and RPC reading a config as `typ`"""
+        rpcs: Dict[type, Tuple[Any, Any]] = {
+            bool: (GetBoolValueRequest, self._client.GetBoolValue),
+            int: (GetIntValueRequest, self._client.GetIntValue),
+            float: (GetFloatValueRequest, self._client.GetFloatValue),
+            str: (GetStringValueRequest, self._client.GetStringValue),
+        }
+        return rpcs.get(typ) or (GetProtoValueRequest, self._client.GetProtoValue)
+
+    def _convert_context(self, context: ContextArg) -> ClientContext:
+        if isinstance(context, Context):
+            # Converted once per Context
+            return context.merged(self.context).proto_values
+        return convert_context(self.context | context)
+
     def _get(
         self,
         namespace: str,
         key: str,
-        context: Dict[str, Any],
+        context: ContextArg,
         req_type: Type[RequestType],
         fn: Callable[[RequestType], ReturnType],
     ) -> ReturnType:
-        ctx = self.context | context
         try:
             req = req_type(
                 key=key,
-                context=convert_context(ctx),
+                context=self._convert_context(context),
                 namespace=namespace,
                 repo_key=self.repository,
             )
             response = fn(req)
             return response
         except grpc.RpcError as e:
-            if e.code() == grpc.StatusCode.NOT_FOUND:
-                raise ConfigNotFoundError(e.details()) from e
-            if e.code() == grpc.StatusCode.INVALID_ARGUMENT:
-                raise MismatchedType(e.details()) from e
+            self._translate_rpc_error(e)
             raise
 
-    def _get_proto(self, namespace: str, key: str, context: dict[str, Any]) -> AnyProto:
-        ctx = self.context | context
+    def _get_proto(self, namespace: str, key: str, context: ContextArg) -> AnyProto:
         try:
             req = GetProtoValueRequest(
                 key=key,
-                context=convert_context(ctx),
+                context=self._convert_context(context),
                 namespace=namespace,
                 repo_key=self.repository,
             )
             response = self._client.GetProtoValue(req)
-            if response.value_v2.IsInitialized() and response.value_v2.type_url:
-                return AnyProto(
-                    type_url=response.value_v2.type_url,
-                    value=response.value_v2.value,
-                )
-            return response.value
         except grpc.RpcError as e:
-            if e.code() == grpc.StatusCode.NOT_FOUND:
-                raise ConfigNotFoundError(e.details()) from e
-            if e.code() == grpc.StatusCode.INVALID_ARGUMENT:
-                raise MismatchedType(e.details()) from e
+            self._translate_rpc_error(e)
             raise
+        return self._proto_value(response)
+
+    def _proto_value(self, response: GetProtoValueResponse) -> AnyProto:
+        if response.value_v2.IsInitialized() and response.value_v2.type_url:
+            return AnyProto(
+                type_url=response.value_v2.type_url,
+                value=response.value_v2.value,
+            )
+        return response.value
+
+    def _translate_rpc_error(self, e: grpc.RpcError) -> None:
+        """Raises the Lekko error for an RPC error, callers re-raise the others"""
+        if e.code() == grpc.StatusCode.NOT_FOUND:
+            raise ConfigNotFoundError(e.details()) from e
+        if e.code() == grpc.StatusCode.INVALID_ARGUMENT:
+            raise MismatchedType(e.details()) from e
 
 
 class SidecarClient(ConfigServiceClient):
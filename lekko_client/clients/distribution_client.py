@@ -1,27 +1,64 @@
-import json
+import functools
 import logging
+import math
 import queue
 import random
 import time
 from abc import abstractmethod
+from dataclasses import dataclass, field
 from datetime import datetime
 from threading import Thread
-from typing import Any, Dict, List, Optional, Type, TypeVar
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+    cast,
+)
 
 import grpc
-from google.protobuf import descriptor_pool as proto_descriptor_pool
-from google.protobuf import symbol_database as proto_symbol_database
 from google.protobuf.any_pb2 import Any as ProtoAny
-from google.protobuf.json_format import MessageToJson
 from google.protobuf.message import Message as ProtoMessage
 from google.protobuf.struct_pb2 import Value
 from google.protobuf.timestamp_pb2 import Timestamp
-from google.protobuf.wrappers_pb2 import BoolValue, FloatValue, Int64Value, StringValue
+from google.protobuf.wrappers_pb2 import (
+    BoolValue,
+    DoubleValue,
+    FloatValue,
+    Int64Value,
+    StringValue,
+)
 
 from lekko_client.clients.client import Client
+from lekko_client.clients.handle import (
+    SCALAR_TYPES,
+    ConfigHandle,
+    ConfigRequest,
+    HandleType,
+    check_value_type,
+)
+from lekko_client.context import Context, ContextArg, current_scope
+from lekko_client.evaluation.batch import BatchEvaluationResult, evaluate_batch
+from lekko_client.evaluation.cache import ResultCache, project_context
+from lekko_client.evaluation.compiler import RuleMemo
 from lekko_client.evaluation.evaluation import EvaluationResult, evaluate
-from lekko_client.exceptions import LekkoRpcError, MismatchedProtoType, MismatchedType
+from lekko_client.evaluation.plan import build_plan
+from lekko_client.exceptions import (
+    ConfigNotFoundError,
+    LekkoError,
+    LekkoRpcError,
+    MismatchedProtoType,
+    MismatchedType,
+    NamespaceNotFound,
+)
 from lekko_client.gen.lekko.backend.v1beta1.distribution_service_pb2 import (
+    ContextKey,
     DeregisterClientRequest,
     FlagEvaluationEvent,
     GetRepositoryContentsResponse,
@@ -32,15 +69,94 @@ from lekko_client.gen.lekko.backend.v1beta1.distribution_service_pb2 import (
 from lekko_client.gen.lekko.backend.v1beta1.distribution_service_pb2_grpc import (
     DistributionServiceStub,
 )
-from lekko_client.helpers import convert_context, get_context_keys, get_grpc_channel
-from lekko_client.models import ClientContext, ConfigData
-from lekko_client.stores.store import Store
+from lekko_client.helpers import (
+    convert_context,
+    freeze_json,
+    get_context_keys,
+    get_grpc_channel,
+    get_message_class,
+    json_value_to_python,
+    normalize_context,
+    thaw_json,
+)
+from lekko_client.models import ClientContext, ConfigData, ConfigValue, NativeContext
+from lekko_client.stores.memory import get_config, get_namespace_configs
+from lekko_client.stores.store import ChangeSet, Store
 
 log = logging.getLogger(__name__)
 
 EVENT_QUEUE_BREAKPOINT = 10000
 EVENT_SAMPLE_RATE = 0.1
 
+_MISSING = object()
+
+
+@dataclass
+class _ScopedEvaluations:
+    """The store snapshot a context scope is evaluated against, and the results evaluated for it"""
+
+    # Result cache generation, read before the store
+    generation: int
+    commit_sha: str
+    configs: Mapping[str, Mapping[str, ConfigData]]
+    results: Dict[Tuple[str, str], EvaluationResult] = field(default_factory=dict)
+    # Rule results for the scope's context, shared by every config evaluated for it
+    memo: RuleMemo = field(default_factory=dict)
+
+
+class _CachedConfigHandle(ConfigHandle[HandleType]):
+    """A config handle bound by a cached client, which keeps the config's store entry"""
+
+    __slots__ = ("client", "decode", "_entry")
+
+    def __init__(
+        self,
+        client: "CachedDistributionClient",
+        namespace: str,
+        key: str,
+        typ: Type[HandleType],
+        decode: Callable[[EvaluationResult], Any],
+    ) -> None:
+        super().__init__(namespace, key, typ)
+        self.client = client
+        self.decode = decode
+        # The store version the config was looked up for, and the config or why it wasn't found. Replaced as a
+        # whole so that concurrent reads see a consistent entry
+        self._entry: Tuple[int, Optional[ConfigData], Optional[LekkoError]] = (-1, None, None)
+
+    def __call__(self, context: Optional[ContextArg] = None) -> HandleType:
+        client = self.client
+        if context is None:
+            context = {}
+        client._ensure_loaded()
+        if client._scoped_evaluations(context) is not None:
+            result = client._get_result(self.namespace, self.key, context)
+        else:
+            # Read before the store like `_get_result` does
+            generation = client.result_cache.generation if client.result_cache else 0
+            store = client.store
+            commit_sha = store.commit_sha
+            version, config_data, error = self._entry
+            if version != store.version:
+                version, config_data, error = self._entry = self._lookup(store)
+            if config_data is None:
+                assert error
+                raise type(error)(*error.args)
+            result = client._evaluate_context(self.namespace, self.key, config_data, context, generation, commit_sha)
+        # Scalars decoded by an earlier read
+        decoded = result.decoded.get(self.type)
+        if type(decoded) is self.type:
+            return decoded
+        value: HandleType = self.decode(result)
+        return value
+
+    def _lookup(self, store: Store) -> Tuple[int, Optional[ConfigData], Optional[LekkoError]]:
+        version = store.version
+        try:
+            return version, store.get(self.namespace, self.key), None
+        except (NamespaceNotFound, ConfigNotFoundError) as e:
+            return version, None, e
+
 
 class CachedDistributionClient(Client):
     class EventsBatcher(Thread):
@@ -54,7 +170,7 @@ class CachedDistributionClient(Client):
             self.batch_size = batch_size
             self.session_key = session_key
             self.events: List[FlagEvaluationEvent] = []
-            self.queue: queue.Queue[Optional[FlagEvaluationEvent]] = queue.Queue()
+            self.queue: queue.Queue[Optional[FlagEvaluationEvent | List[FlagEvaluationEvent]]] = queue.Queue()
 
         def stop(self) -> None:
             self.queue.put(None)  # Termination signal to stop waiting on get
@@ -65,6 +181,12 @@ class CachedDistributionClient(Client):
                 return
             self.queue.put(event)
 
+        def add_events(self, events: List[FlagEvaluationEvent]) -> None:
+            # Queued as a single item, and sampled as a whole when the backlog is large
+            if self.queue.qsize() >= EVENT_QUEUE_BREAKPOINT and random.random() > EVENT_SAMPLE_RATE:
+                return
+            self.queue.put(events)
+
         def _upload_events(self) -> None:
             if len(self.events) > 0:
                 self.dist_client.SendFlagEvaluationMetrics(
@@ -77,7 +199,10 @@ class CachedDistributionClient(Client):
             event = self.queue.get()
             if event is None:  # Termination signal
                 return False
-            self.events.append(event)
+            if isinstance(event, list):
+                self.events.extend(event)
+            else:
+                self.events.append(event)
             return True
 
         def run(self) -> None:
@@ -106,11 +231,19 @@ class CachedDistributionClient(Client):
         api_key: Optional[str] = None,
         context: Optional[Dict[str, Any]] = None,
         credentials: grpc.ChannelCredentials = grpc.ssl_channel_credentials(),
+        result_cache_size: int = 0,
     ):
         super().__init__(owner_name, repo_name, api_key, context)
         self.uri = uri
         self.repository = RepositoryKey(owner_name=owner_name, repo_name=repo_name)
         self.store = store
+        try:
+            # Configs get specialized for the static context when they are loaded
+            self.store.base_context = normalize_context(self.context) or {}
+        except ValueError:
+            self.store.base_context = {}
+        # Caches evaluation results on the context keys each config reads, disabled by default
+        self.result_cache = ResultCache(result_cache_size) if result_cache_size > 0 else None
         self._client: Optional[DistributionServiceStub] = None
         self.session_key = ""
         self.events_batcher = None
@@ -149,96 +282,416 @@ class CachedDistributionClient(Client):
     def initialize(self) -> None:
         ...
 
-    def load(self) -> bool:
+    def load(self) -> Optional[ChangeSet]:
+        """Loads the latest repository contents into the store, returning the configs that changed, or None if
+        nothing was loaded"""
         contents = self.load_contents()
         if not contents:
-            return False
-        loaded = self.store.load(contents)
-        return loaded
+            return None
+        changes = self.store.load(contents)
+        if changes is not None and self.result_cache:
+            self.result_cache.clear()
+        return changes
 
     @abstractmethod
     def load_contents(self) -> Optional[GetRepositoryContentsResponse]:
         ...
 
+    def _ensure_loaded(self) -> None:
+        """Called before reading the store. Clients that load their contents in the background wait for the first
+        load here"""
+
     def track(
-        self, namespace: str, config_data: ConfigData, result: EvaluationResult, context: Optional[ClientContext]
+        self,
+        namespace: str,
+        config_data: ConfigData,
+        result: EvaluationResult,
+        context: Optional[ClientContext | NativeContext | Context],
     ) -> None:
         if not self.events_batcher:
             return
+        context_keys = context.context_keys if isinstance(context, Context) else get_context_keys(context)
+        self.events_batcher.add_event(self._event(namespace, config_data, result, context_keys))
 
+    def _event(
+        self, namespace: str, config_data: ConfigData, result: EvaluationResult, context_keys: Sequence[ContextKey]
+    ) -> FlagEvaluationEvent:
         timestamp = Timestamp()
         timestamp.FromDatetime(datetime.utcnow())
-        event = FlagEvaluationEvent(
+        return FlagEvaluationEvent(
             repo_key=self.repository,
             commit_sha=self.store.commit_sha,
             feature_sha=config_data.config_sha,
             namespace_name=namespace,
             feature_name=config_data.config.key,
-            context_keys=get_context_keys(context),
+            context_keys=context_keys,
             result_path=result.path,
             client_event_time=timestamp,
         )
-        self.events_batcher.add_event(event)
 
-    def get(self, namespace: str, key: str, context: Dict[str, Any]) -> ProtoAny:
-        ctx = self.context | context
+    def get(self, namespace: str, key: str, context: ContextArg) -> ProtoAny:
+        return self._get_result(namespace, key, context).value
+
+    def _get_result(self, namespace: str, key: str, context: ContextArg) -> EvaluationResult:
+        self._ensure_loaded()
+        scoped = self._scoped_evaluations(context)
+        if scoped is not None:
+            result = scoped.results.get((namespace, key))
+            if result is not None:
+                return result
+            generation, commit_sha, memo = scoped.generation, scoped.commit_sha, scoped.memo
+            config_data = get_config(scoped.configs, namespace, key)
+        else:
+            # Read before the store so results evaluated against a snapshot that gets replaced aren't cached
+            generation = self.result_cache.generation if self.result_cache else 0
+            commit_sha = self.store.commit_sha
+            config_data = self.store.get(namespace, key)
+            memo = None
+        result = self._evaluate_context(namespace, key, config_data, context, generation, commit_sha, memo)
+        if scoped is not None:
+            scoped.results[(namespace, key)] = result
+        return result
+
+    def _evaluate_context(
+        self,
+        namespace: str,
+        key: str,
+        config_data: ConfigData,
+        context: ContextArg,
+        generation: int,
+        commit_sha: str,
+        memo: Optional[RuleMemo] = None,
+    ) -> EvaluationResult:
+        """Evaluates a config for a context merged into the static context, and tracks the evaluation"""
+        native_context, merged = self._merge_context(context)
+        specialized = self._holds_base_context(native_context)
+        result = self._evaluate(namespace, key, config_data, native_context, generation, commit_sha, memo, specialized)
+        self.track(namespace, config_data, result, merged if merged is not None else native_context)
+        return result
+
+    def _scoped_evaluations(self, context: ContextArg) -> Optional[_ScopedEvaluations]:
+        """Returns the snapshot and results of the current context scope if `context` is its context, taking the
+        snapshot on first use"""
+        scope = current_scope()
+        if scope is None or context is not scope.context:
+            return None
+        scoped: Optional[_ScopedEvaluations] = scope.evaluations.get(self)
+        if scoped is None:
+            generation = self.result_cache.generation if self.result_cache else 0
+            scoped = scope.evaluations.setdefault(
+                self, _ScopedEvaluations(generation, self.store.commit_sha, self.store.get_all())
+            )
+        return scoped
+
+    def _merge_context(self, context: ContextArg) -> Tuple[NativeContext, Optional[Context]]:
+        """Merges a context into the client's static context, returning its normalized values, and the merged
+        Context when given one"""
+        if isinstance(context, Context):
+            merged = context.merged(self.context)
+            return merged.native, merged
+        return normalize_context(self.context | context), None
+
+    def _evaluate(
+        self,
+        namespace: str,
+        key: str,
+        config_data: ConfigData,
+        native_context: NativeContext,
+        generation: int,
+        commit_sha: str,
+        memo: Optional[RuleMemo] = None,
+        specialized: bool = False,
+    ) -> EvaluationResult:
+        plan = config_data.plan
+        if specialized and config_data.base_plan:
+            plan = config_data.base_plan
+        if not plan:
+            # Only the interpreter needs proto Values, compiled plans evaluate native values
+            return evaluate(config_data.config, namespace, convert_context(native_context or {}))
+        if not self.result_cache or plan.constant is not None:
+            return plan.evaluate(native_context, memo)
+
+        # Specialized plans read fewer keys, their results are cached separately
+        cache_key = (
+            commit_sha,
+            namespace,
+            key,
+            plan is config_data.base_plan,
+            project_context(native_context, plan.context_keys),
+        )
+        result = self.result_cache.get(cache_key)
+        if result is None:
+            result = plan.evaluate(native_context, memo)
+            self.result_cache.put(cache_key, result, generation)
+        return result
+
+    def _holds_base_context(self, native_context: NativeContext) -> bool:
+        """Returns whether a context holds every value of the store's base context, with the same types"""
+        base_context = self.store.base_context
+        if not base_context or not native_context:
+            return False
+        for key, value in base_context.items():
+            context_value = native_context.get(key)
+            if type(context_value) is not type(value) or context_value != value:
+                return False
+            # -0.0 == 0.0, but plans folded for one don't hold for the other
+            if type(value) is float and math.copysign(1.0, value) != math.copysign(1.0, cast(float, context_value)):
+                return False
+        return True
+
+    def evaluate_namespace(self, namespace: str, context: ContextArg) -> Dict[str, ConfigValue]:
+        """Evaluates every config in a namespace for one context, returning decoded values by config key"""
+        self._ensure_loaded()
+        scoped = self._scoped_evaluations(context)
+        if scoped is not None:
+            configs = get_namespace_configs(scoped.configs, namespace)
+            return self._evaluate_configs(
+                {namespace: configs}, context, scoped.generation, scoped.commit_sha, scoped.memo
+            )[namespace]
+        generation = self.result_cache.generation if self.result_cache else 0
+        commit_sha = self.store.commit_sha
+        configs = self.store.get_namespace(namespace)
+        return self._evaluate_configs({namespace: configs}, context, generation, commit_sha)[namespace]
+
+    def evaluate_all(self, context: ContextArg) -> Dict[str, Dict[str, ConfigValue]]:
+        """Evaluates every config in the repository for one context, returning decoded values by namespace and
+        config key"""
+        self._ensure_loaded()
+        scoped = self._scoped_evaluations(context)
+        if scoped is not None:
+            return self._evaluate_configs(scoped.configs, context, scoped.generation, scoped.commit_sha, scoped.memo)
+        generation = self.result_cache.generation if self.result_cache else 0
+        commit_sha = self.store.commit_sha
+        return self._evaluate_configs(self.store.get_all(), context, generation, commit_sha)
+
+    def _evaluate_configs(
+        self,
+        namespaces: Mapping[str, Mapping[str, ConfigData]],
+        context: ContextArg,
+        generation: int,
+        commit_sha: str,
+        memo: Optional[RuleMemo] = None,
+    ) -> Dict[str, Dict[str, ConfigValue]]:
+        # The context is converted once, and atoms shared between configs are evaluated once
+        native_context, merged = self._merge_context(context)
+        specialized = self._holds_base_context(native_context)
+        if memo is None:
+            memo = {}
+        context_keys = merged.context_keys if merged is not None else get_context_keys(native_context)
+        values: Dict[str, Dict[str, ConfigValue]] = {}
+        events = []
+        for namespace, configs in namespaces.items():
+            namespace_values = values[namespace] = {}
+            for key, config_data in configs.items():
+                result = self._evaluate(
+                    namespace, key, config_data, native_context, generation, commit_sha, memo, specialized
+                )
+                namespace_values[key] = self._decode_result(result)
+                if self.events_batcher:
+                    events.append(self._event(namespace, config_data, result, context_keys))
+        if self.events_batcher and events:
+            self.events_batcher.add_events(events)
+        return values
+
+    _VALUE_TYPES: Dict[str, Type[BoolValue | Int64Value | StringValue | FloatValue | DoubleValue]] = {
+        wrapper.DESCRIPTOR.full_name: wrapper
+        for wrapper in (BoolValue, Int64Value, StringValue, FloatValue, DoubleValue)
+    }
+
+    def decode(self, value: ProtoAny) -> ConfigValue:
+        """Converts a config value to the type `get_*` would return for it"""
+        type_name = value.TypeName()
+        wrapper_type = self._VALUE_TYPES.get(type_name)
+        if wrapper_type:
+            wrapper = wrapper_type()
+            value.Unpack(wrapper)
+            return wrapper.value
+        if type_name == Value.DESCRIPTOR.full_name:
+            return_wrapper = Value()
+            value.Unpack(return_wrapper)
+            return json_value_to_python(return_wrapper)  # type: ignore[no-any-return]
+        return self._unpack_proto(value)
+
+    def _decode_result(self, result: EvaluationResult) -> ConfigValue:
+        type_name = result.value.TypeName()
+        if type_name in self._VALUE_TYPES:
+            decoded = result.decoded.get(type_name, _MISSING)
+            if decoded is _MISSING:
+                decoded = result.decoded[type_name] = self.decode(result.value)
+            return decoded  # type: ignore[no-any-return]
+        if type_name == Value.DESCRIPTOR.full_name:
+            return thaw_json(self._get_frozen_json(result))  # type: ignore[no-any-return]
+        return self._get_proto_result(result)
+
+    def evaluate_batch(self, namespace: str, key: str, columns: Mapping[str, Any]) -> BatchEvaluationResult:
+        """Evaluates a config for many contexts at once.
+
+        `columns` maps context keys to NumPy arrays or lists holding one value per context, or to a single value
+        shared by all of them. Batch evaluations are not tracked.
+        """
+        self._ensure_loaded()
         config_data = self.store.get(namespace, key)
-        client_context = convert_context(ctx)
-        result = evaluate(config_data.config, namespace, client_context)
-        self.track(namespace, config_data, result, client_context)
-        return result.value
+        plan = config_data.plan or build_plan(config_data.config, namespace)
+        return evaluate_batch(plan, config_data.config, namespace, {**self.context, **columns})
 
     ReturnType = TypeVar("ReturnType", str, float, int, bool)
 
-    def get_scalar(self, namespace: str, key: str, context: Dict[str, Any], typ: Type[ReturnType]) -> ReturnType:
-        result = self.get(namespace, key, context)
-        return_wrapper = self._TYPE_MAPPING[typ]()
-        if result.Unpack(return_wrapper):
-            return return_wrapper.value  # type: ignore
-        raise MismatchedType(f"Config {key} is of type {result.type_url} and cannot be converted to {typ}")
+    def get_scalar(self, namespace: str, key: str, context: ContextArg, typ: Type[ReturnType]) -> ReturnType:
+        return self._decode_scalar(self._get_result(namespace, key, context), key, typ)
+
+    def _decode_scalar(self, result: EvaluationResult, key: str, typ: Type[ReturnType]) -> ReturnType:
+        # Decoded once per result, including type mismatches
+        decoded = result.decoded.get(typ, _MISSING)
+        if decoded is _MISSING:
+            return_wrapper = self._TYPE_MAPPING[typ]()
+            if result.value.Unpack(return_wrapper):
+                decoded = return_wrapper.value
+            else:
+                decoded = MismatchedType(
+                    f"Config {key} is of type {result.value.type_url} and cannot be converted to {typ}"
+                )
+            result.decoded[typ] = decoded
+        if isinstance(decoded, MismatchedType):
+            raise MismatchedType(*decoded.args)
+        return decoded  # type: ignore[no-any-return]
 
-    def get_bool(self, namespace: str, key: str, context: Dict[str, Any]) -> bool:
+    def get_bool(self, namespace: str, key: str, context: ContextArg) -> bool:
         return self.get_scalar(namespace, key, context, bool)
 
-    def get_int(self, namespace: str, key: str, context: Dict[str, Any]) -> int:
+    def get_int(self, namespace: str, key: str, context: ContextArg) -> int:
         return self.get_scalar(namespace, key, context, int)
 
-    def get_float(self, namespace: str, key: str, context: Dict[str, Any]) -> float:
+    def get_float(self, namespace: str, key: str, context: ContextArg) -> float:
         return self.get_scalar(namespace, key, context, float)
 
-    def get_string(self, namespace: str, key: str, context: Dict[str, Any]) -> str:
+    def get_string(self, namespace: str, key: str, context: ContextArg) -> str:
         return self.get_scalar(namespace, key, context, str)
 
-    def get_json(self, namespace: str, key: str, context: Dict[str, Any]) -> Any:
-        result = self.get(namespace, key, context)
-        return_wrapper = Value()
-        result.Unpack(return_wrapper)
-        return json.loads(MessageToJson(return_wrapper))
-
-    def get_proto(self, namespace: str, key: str, context: Dict[str, Any]) -> ProtoMessage:
-        val = self.get(namespace, key, context)
-        db = proto_symbol_database.SymbolDatabase(pool=proto_descriptor_pool.Default())  # type: ignore
-        try:
-            ret_val = db.GetSymbol(val.type_url.split("/")[1])()
+    def get_json(self, namespace: str, key: str, context: ContextArg, read_only: bool = False) -> Any:
+        frozen = self._get_frozen_json(self._get_result(namespace, key, context))
+        return frozen if read_only else thaw_json(frozen)
+
+    def _get_frozen_json(self, result: EvaluationResult) -> Any:
+        # Decoded once per result and shared as a read-only structure, callers that can mutate get a copy
+        frozen = result.decoded.get(Value, _MISSING)
+        if frozen is _MISSING:
+            return_wrapper = Value()
+            result.value.Unpack(return_wrapper)
+            frozen = result.decoded[Value] = freeze_json(json_value_to_python(return_wrapper))
+        return frozen
+
+    def get_proto(self, namespace: str, key: str, context: ContextArg) -> ProtoMessage:
+        return self._get_proto_result(self._get_result(namespace, key, context))
+
+    def _get_proto_result(self, result: EvaluationResult) -> ProtoMessage:
+        message = self._get_message(result, get_message_class(result.value.type_url))
+        if message is None:
+            message = ProtoAny()
+            message.CopyFrom(result.value)
+        return message
+
+    def _unpack_proto(self, val: ProtoAny) -> ProtoMessage:
+        message_class = get_message_class(val.type_url)
+        if message_class:
+            ret_val = message_class()
             if val.Unpack(ret_val):
                 return ret_val
-        except (KeyError, IndexError):
-            pass
         return val
 
+    def _get_message(
+        self, result: EvaluationResult, message_class: Optional[Type[Client.ProtoType]]
+    ) -> Optional[Client.ProtoType]:
+        """Returns the result's value unpacked into `message_class`, None if it holds another type.
+
+        Messages are unpacked once per result, and every caller gets its own copy since messages are mutable.
+        """
+        if message_class is None:
+            return None
+        cache_key = (ProtoMessage, message_class)
+        message = result.decoded.get(cache_key, _MISSING)
+        if message is _MISSING:
+            message = message_class()
+            if not result.value.Unpack(message):
+                message = None
+            result.decoded[cache_key] = message
+        if message is None:
+            return None
+        ret_val = message_class()
+        ret_val.CopyFrom(message)
+        return ret_val
+
     def get_proto_by_type(
         self,
         namespace: str,
         key: str,
-        context: Dict[str, Any],
+        context: ContextArg,
         proto_message_type: Type[Client.ProtoType],
     ) -> Client.ProtoType:
-        val = self.get(namespace, key, context)
-        ret_val = proto_message_type()
-        if val.Unpack(ret_val):
+        return self._decode_message(self._get_result(namespace, key, context), proto_message_type)
+
+    def _decode_message(self, result: EvaluationResult, proto_message_type: Type[Client.ProtoType]) -> Client.ProtoType:
+        ret_val = self._get_message(result, proto_message_type)
+        if ret_val is not None:
             return ret_val
 
-        raise MismatchedProtoType(f"Error unpacking from {val.type_url} to {proto_message_type.DESCRIPTOR.name}")
+        raise MismatchedProtoType(
+            f"Error unpacking from {result.value.type_url} to {proto_message_type.DESCRIPTOR.name}"
+        )
+
+    def bind(self, namespace: str, key: str, typ: Type[HandleType]) -> ConfigHandle[HandleType]:
+        """Returns a handle reading a config as `typ`.
+
+        The handle keeps the config's store entry, and only looks it up again once the store loaded new contents.
+        """
+        return _CachedConfigHandle(self, namespace, key, typ, self._decoder(key, typ))
+
+    def get_many(self, requests: Sequence[ConfigRequest], context: ContextArg) -> List[Any]:
+        """Reads several configs for one context, returning their values in the order of `requests`.
+
+        The context is converted once, the configs are read from one store snapshot and their evaluations are
+        tracked as one batch of events.
+        """
+        decoders = [self._decoder(key, typ) for _, key, typ in requests]
+        self._ensure_loaded()
+        scoped = self._scoped_evaluations(context)
+        if scoped is not None:
+            return [
+                decode(self._get_result(namespace, key, context))
+                for (namespace, key, _), decode in zip(requests, decoders)
+            ]
+
+        generation = self.result_cache.generation if self.result_cache else 0
+        commit_sha = self.store.commit_sha
+        configs = self.store.get_all()
+        native_context, merged = self._merge_context(context)
+        specialized = self._holds_base_context(native_context)
+        memo: RuleMemo = {}
+        context_keys: Sequence[ContextKey] = ()
+        if self.events_batcher:
+            context_keys = merged.context_keys if merged is not None else get_context_keys(native_context)
+        values = []
+        events: List[FlagEvaluationEvent] = []
+        try:
+            for (namespace, key, _), decode in zip(requests, decoders):
+                config_data = get_config(configs, namespace, key)
+                result = self._evaluate(
+                    namespace, key, config_data, native_context, generation, commit_sha, memo, specialized
+                )
+                if self.events_batcher:
+                    events.append(self._event(namespace, config_data, result, context_keys))
+                values.append(decode(result))
+        finally:
+            # Reads that succeeded before an error are tracked too
+            if self.events_batcher and events:
+                self.events_batcher.add_events(events)
+        return values
+
+    def _decoder(self, key: str, typ: type) -> Callable[[EvaluationResult], Any]:
+        """Returns the function decoding the results of a config as `typ`"""
+        check_value_type(typ)
+        if typ in SCALAR_TYPES:
+            return functools.partial(self._decode_scalar, key=key, typ=cast(Any, typ))
+        return functools.partial(self._decode_message, proto_message_type=cast(Type[ProtoMessage], typ))
 
     def close(self) -> None:
         super().close()
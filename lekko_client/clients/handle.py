@@ -0,0 +1,51 @@
+from typing import Callable, Generic, Optional, Tuple, Type, TypeVar
+
+from google.protobuf.message import Message as ProtoMessage
+
+from lekko_client.context import ContextArg
+from lekko_client.exceptions import LekkoError
+
+# bool, int, float, str or a proto message type
+HandleType = TypeVar("HandleType")
+
+SCALAR_TYPES = (bool, int, float, str)
+
+# A config to read, as its namespace, key and value type
+ConfigRequest = Tuple[str, str, type]
+
+
+class ConfigHandle(Generic[HandleType]):
+    """A config bound to its namespace, key and value type, read by calling the handle with a context.
+
+    Handles are returned by `bind`, and resolve everything that doesn't depend on the context once: calling
+    `handle(context)` is equivalent to `get_int(namespace, key, context)` for an int handle, and to
+    `get_proto_by_type(namespace, key, context, typ)` for a message type.
+    """
+
+    __slots__ = ("namespace", "key", "type", "_get")
+
+    def __init__(
+        self,
+        namespace: str,
+        key: str,
+        typ: Type[HandleType],
+        get: Optional[Callable[[Optional[ContextArg]], HandleType]] = None,
+    ) -> None:
+        check_value_type(typ)
+        self.namespace = namespace
+        self.key = key
+        self.type = typ
+        self._get = get
+
+    def __call__(self, context: Optional[ContextArg] = None) -> HandleType:
+        # Handles created without `get` override this
+        assert self._get
+        return self._get(context)
+
+    def __repr__(self) -> str:
+        return f"ConfigHandle({self.namespace!r}, {self.key!r}, {self.type.__name__})"
+
+
+def check_value_type(typ: type) -> None:
+    if typ not in SCALAR_TYPES and not (isinstance(typ, type) and issubclass(typ, ProtoMessage)):
+        raise LekkoError(f"Configs can only be read as bool, int, float, str or a proto message type, not {typ}")
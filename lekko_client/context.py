@@ -0,0 +1,167 @@
+import math
+import sys
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Iterator, Mapping, Optional, Tuple, Union
+
+from lekko_client.gen.lekko.backend.v1beta1.distribution_service_pb2 import ContextKey
+from lekko_client.gen.lekko.client.v1beta1.configuration_service_pb2 import Value
+from lekko_client.helpers import convert_context, get_context_keys, normalize_value
+from lekko_client.models import NativeValue
+
+
+class Context(Mapping[str, NativeValue]):
+    """An immutable evaluation context, converted once and reusable across any number of evaluations.
+
+    Keys are interned and values are normalized like `helpers.normalize_context` does. The proto Values sent to
+    Lekko's services and the context keys reported with evaluation events are built on first use and cached.
+    A request handler that reads many configs can build one Context and pass it to every `get_*` call instead
+    of a dict.
+    """
+
+    __slots__ = ("_values", "_proto_values", "_context_keys", "_hash", "_merged")
+
+    def __init__(self, values: Optional[Mapping[str, Any]] = None) -> None:
+        if isinstance(values, Context):
+            self._values: Dict[str, NativeValue] = values._values
+        else:
+            self._values = {sys.intern(k): normalize_value(v) for k, v in (values or {}).items()}
+        self._proto_values: Optional[Dict[str, Value]] = None
+        self._context_keys: Optional[Tuple[ContextKey, ...]] = None
+        self._hash: Optional[int] = None
+        # Last merge with a base context, along with a copy of that base
+        self._merged: Optional[Tuple[Dict[str, Any], Context]] = None
+
+    def __getitem__(self, key: str) -> NativeValue:
+        return self._values[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._values
+
+    def __repr__(self) -> str:
+        return f"Context({self._values!r})"
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            self._hash = hash(self._typed_items())
+        return self._hash
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Context):
+            return NotImplemented
+        # Unlike dicts, 1, 1.0 and True are different context values
+        return self is other or (hash(self) == hash(other) and self._typed_items() == other._typed_items())
+
+    def _typed_items(self) -> FrozenSet[Tuple[str, type, NativeValue]]:
+        return frozenset((k, type(v), v) for k, v in self._values.items())
+
+    @property
+    def native(self) -> Dict[str, NativeValue]:
+        """The normalized values, as compiled plans evaluate them. Must not be mutated"""
+        return self._values
+
+    @property
+    def proto_values(self) -> Dict[str, Value]:
+        """The values as the proto Values sent to Lekko's services. Must not be mutated"""
+        if self._proto_values is None:
+            self._proto_values = convert_context(self._values) or {}
+        return self._proto_values
+
+    @property
+    def context_keys(self) -> Tuple[ContextKey, ...]:
+        """The keys and value types reported with evaluation events"""
+        if self._context_keys is None:
+            self._context_keys = tuple(get_context_keys(self._values))
+        return self._context_keys
+
+    def merged(self, base: Mapping[str, Any]) -> "Context":
+        """Returns this context on top of `base`, whose values it overrides, with the key order of `base | self`.
+
+        The last result is cached, so merging again with the same base values, such as a client's static context,
+        doesn't convert anything.
+        """
+        if not base:
+            return self
+        cached = self._merged
+        if cached is not None and _same_values(cached[0], base):
+            return cached[1]
+
+        values = self._values
+        merged_values: Dict[str, NativeValue] = {}
+        for k, v in base.items():
+            merged_values[sys.intern(k)] = values[k] if k in values else normalize_value(v)
+        merged_values.update(values)
+        merged = Context._from_native(merged_values)
+        self._merged = (dict(base), merged)
+        return merged
+
+    @classmethod
+    def _from_native(cls, values: Dict[str, NativeValue]) -> "Context":
+        context = cls()
+        context._values = values
+        return context
+
+
+def _same_values(a: Mapping[str, Any], b: Mapping[str, Any]) -> bool:
+    """Returns whether two contexts hold the same values, telling 1, 1.0 and True, as well as 0.0 and -0.0, apart"""
+    if len(a) != len(b):
+        return False
+    for k, v in a.items():
+        if k not in b:
+            return False
+        other = b[k]
+        if v is other:
+            continue
+        if type(v) is not type(other) or v != other:
+            return False
+        if type(v) is float and math.copysign(1.0, v) != math.copysign(1.0, other):
+            return False
+    return True
+
+
+# Evaluation contexts: plain dicts are converted on every call, Context objects once
+ContextArg = Union[Dict[str, Any], Context]
+
+
+@dataclass
+class ContextScope:
+    """The state of a `context_scope`: its context, and what clients evaluated for it"""
+
+    context: Context
+    # Store snapshots that cached clients evaluate the scope against, along with their results, by client
+    evaluations: Dict[Any, Any] = field(default_factory=dict)
+
+
+_current_scope: ContextVar[Optional[ContextScope]] = ContextVar("lekko_context_scope", default=None)
+
+
+def current_scope() -> Optional[ContextScope]:
+    """Returns the innermost `context_scope` of the current thread or asyncio task, None outside of any"""
+    return _current_scope.get()
+
+
+@contextmanager
+def context_scope(context: Optional[Mapping[str, Any]] = None, /, **values: Any) -> Iterator[Context]:
+    """Sets the context that the top level `get_*` functions use when they're called without one.
+
+    The scope's context holds the values of the enclosing scope, overridden by `context` and then by keyword
+    values. Scopes are kept in a ContextVar, so each thread and asyncio task sees its own, and tasks inherit the
+    scope they were created in.
+
+    Cached clients evaluate every config read through the scope's context against the store snapshot that was
+    current on first use, and only once: later reads return the same result, even if the store was reloaded.
+    """
+    parent = _current_scope.get()
+    scope = ContextScope(Context({**(parent.context if parent else {}), **(context or {}), **values}))
+    token = _current_scope.set(scope)
+    try:
+        yield scope.context
+    finally:
+        _current_scope.reset(token)
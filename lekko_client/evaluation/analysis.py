@@ -0,0 +1,59 @@
+from typing import Set
+
+from lekko_client.gen.lekko.rules.v1beta3.rules_pb2 import (
+    ComparisonOperator,
+    LogicalOperator,
+    Rule,
+)
+
+
+def rule_context_keys(rule: Rule) -> Set[str]:
+    """Returns the context keys that can influence the result of evaluating a rule"""
+    rule_type = rule.WhichOneof("rule")
+    if rule_type == "atom":
+        return {rule.atom.context_key}
+    elif rule_type == "not":
+        return rule_context_keys(getattr(rule, rule_type))
+    elif rule_type == "logical_expression":
+        return set().union(*(rule_context_keys(r) for r in rule.logical_expression.rules))
+    elif rule_type == "call_expression" and rule.call_expression.WhichOneof("function") == "bucket":
+        return {rule.call_expression.bucket.context_key}
+    return set()
+
+
+def rule_required_keys(rule: Rule) -> Set[str]:
+    """Returns the context keys whose absence guarantees that a rule evaluates to False without raising.
+
+    Atoms and buckets are False when their key is missing. An AND only requires the keys of the children that
+    are evaluated before any child that could raise, so that skipping it never hides an error.
+    """
+    rule_type = rule.WhichOneof("rule")
+    if rule_type == "atom":
+        return {rule.atom.context_key}
+    elif rule_type == "logical_expression" and rule.logical_expression.rules:
+        rules = rule.logical_expression.rules
+        if rule.logical_expression.logical_operator == LogicalOperator.LOGICAL_OPERATOR_AND:
+            required: Set[str] = set()
+            for r in rules:
+                required |= rule_required_keys(r)
+                if not rule_never_raises(r):
+                    break
+            return required
+        return set.intersection(*(rule_required_keys(r) for r in rules))
+    elif rule_type == "call_expression" and rule.call_expression.WhichOneof("function") == "bucket":
+        return {rule.call_expression.bucket.context_key}
+    return set()
+
+
+def rule_never_raises(rule: Rule) -> bool:
+    """Returns whether evaluating a rule can't raise, whatever the context"""
+    rule_type = rule.WhichOneof("rule")
+    if rule_type == "bool_const":
+        return True
+    elif rule_type == "atom":
+        return rule.atom.comparison_operator == ComparisonOperator.COMPARISON_OPERATOR_PRESENT
+    elif rule_type == "not":
+        return rule_never_raises(getattr(rule, rule_type))
+    elif rule_type == "logical_expression":
+        return bool(rule.logical_expression.rules) and all(rule_never_raises(r) for r in rule.logical_expression.rules)
+    return False
@@ -0,0 +1,520 @@
+"""Column-wise evaluation of one config over many contexts.
+
+Rows are evaluated as if each element, converted to its Python equivalent, was passed to `get` as the value of
+its column's context key. `None` elements are treated as the key being absent from that row's context.
+Atoms on typed columns are evaluated as NumPy masks; everything else (object columns, type mismatches, error
+cases) falls back to the scalar predicate for the affected rows only, so results and errors match scalar
+evaluation exactly. Bucket rules hash whole columns at once with a vectorized xxh32, which is also available on its
+own through `bucket_values` and `bucket_mask`.
+
+Requires NumPy, available with the `batch` extra.
+"""
+
+import struct
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from google.protobuf.any_pb2 import Any as ProtoAny
+from google.protobuf.struct_pb2 import Value
+
+from lekko_client.evaluation.compiler import compile_rule
+from lekko_client.evaluation.plan import EvaluationPlan
+from lekko_client.exceptions import EvaluationError, LekkoError
+from lekko_client.gen.lekko.feature.v1beta1.feature_pb2 import Constraint, Feature
+from lekko_client.gen.lekko.rules.v1beta3.rules_pb2 import (
+    Atom,
+    CallExpression,
+    ComparisonOperator,
+    LogicalOperator,
+    Rule,
+)
+from lekko_client.helpers import normalize_value
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None  # type: ignore
+
+
+@dataclass
+class Column:
+    # One of "bool", "int", "double", "string", or "object" for anything that isn't a homogeneous typed array
+    kind: str
+    values: "np.ndarray[Any, Any]"
+    # Rows that have a value, None if all of them do
+    present: "Optional[np.ndarray[Any, Any]]" = None
+    _items: Optional[List[Any]] = None
+
+    @property
+    def items(self) -> List[Any]:
+        if self._items is None:
+            self._items = self.values.tolist()
+        return self._items
+
+
+class Batch:
+    def __init__(self, columns: Mapping[str, Any]) -> None:
+        if np is None:  # pragma: no cover
+            raise LekkoError("numpy is required for batch evaluation, install lekko_client[batch]")
+
+        sizes = {len(v) for v in columns.values() if _is_sequence(v)}
+        if len(sizes) > 1:
+            raise LekkoError("All context columns must have the same length")
+        self.size = sizes.pop() if sizes else 1
+        self.columns = {k: _to_column(v, self.size) for k, v in columns.items()}
+
+    def all_rows(self) -> "np.ndarray[Any, Any]":
+        return np.ones(self.size, dtype=bool)
+
+    def no_rows(self) -> "np.ndarray[Any, Any]":
+        return np.zeros(self.size, dtype=bool)
+
+
+@dataclass
+class BatchEvaluationResult:
+    values: List[ProtoAny]
+    # Stores, for each row, the path of the tree node that returned its value.
+    paths: List[List[int]]
+
+
+BatchPredicate = Callable[[Batch, "np.ndarray[Any, Any]"], "np.ndarray[Any, Any]"]
+
+
+def evaluate_batch(
+    plan: EvaluationPlan, config: Feature, namespace: str, columns: Mapping[str, Any]
+) -> BatchEvaluationResult:
+    """Evaluates a config for every row of the given context columns, with masked first-match semantics"""
+    if plan.default is None:
+        raise EvaluationError("Unable to evaluate config: rule tree is empty")
+
+    batch = Batch(columns)
+    if plan.batch_predicates is None:
+        plan.batch_predicates = _compile_batch_predicates(config, namespace)
+    predicates = plan.batch_predicates
+    result_index = np.full(batch.size, -1)
+
+    def visit(first: int, active: "np.ndarray[Any, Any]") -> None:
+        i = first
+        while i >= 0 and active.any():
+            passed = predicates[i](batch, active)
+            if passed.any():
+                result_index[passed] = i
+                if plan.first_child[i] >= 0:
+                    visit(plan.first_child[i], passed)
+                active = active & ~passed
+            i = plan.next_sibling[i]
+
+    visit(plan.start, batch.all_rows())
+
+    results = [plan.results[i] if i >= 0 else plan.default for i in result_index.tolist()]
+    return BatchEvaluationResult([r.value for r in results], [r.path for r in results])
+
+
+def _compile_batch_predicates(config: Feature, namespace: str) -> List[BatchPredicate]:
+    # Same pre-order as the plan's node table
+    predicates: List[BatchPredicate] = []
+
+    def add(constraints: List[Constraint]) -> None:
+        for constraint in constraints:
+            predicates.append(compile_batch_rule(constraint.rule_ast_new, namespace, config.key))
+            add(list(constraint.constraints))
+
+    add(list(config.tree.constraints))
+    return predicates
+
+
+def compile_batch_rule(rule: Rule, namespace: str, config_name: str) -> BatchPredicate:
+    """Compiles a rule into a function of (batch, active rows) returning the active rows for which it passes"""
+    rule_type = rule.WhichOneof("rule")
+    if rule_type == "bool_const":
+        const = rule.bool_const
+        return lambda batch, active: active.copy() if const else batch.no_rows()
+    elif rule_type == "not":
+        inner = compile_batch_rule(getattr(rule, rule_type), namespace, config_name)
+        return lambda batch, active: active & ~inner(batch, active)
+    elif rule_type == "logical_expression" and rule.logical_expression.rules:
+        children = [compile_batch_rule(r, namespace, config_name) for r in rule.logical_expression.rules]
+        if rule.logical_expression.logical_operator == LogicalOperator.LOGICAL_OPERATOR_AND:
+            return _batch_and(children)
+        return _batch_or(children)
+    elif rule_type == "atom":
+        return _compile_batch_atom(rule.atom, _rowwise(rule, rule.atom.context_key, namespace, config_name))
+    elif rule_type == "call_expression" and rule.call_expression.WhichOneof("function") == "bucket":
+        bucket_f = rule.call_expression.bucket
+        return _compile_batch_bucket(
+            bucket_f, namespace, config_name, _rowwise(rule, bucket_f.context_key, namespace, config_name)
+        )
+
+    # Invalid rules raise as soon as any row reaches them
+    predicate = compile_rule(rule, namespace, config_name)
+
+    def invalid(batch: Batch, active: "np.ndarray[Any, Any]") -> "np.ndarray[Any, Any]":
+        if active.any():
+            predicate({}, None)
+        return batch.no_rows()
+
+    return invalid
+
+
+def _batch_and(children: List[BatchPredicate]) -> BatchPredicate:
+    def predicate(batch: Batch, active: "np.ndarray[Any, Any]") -> "np.ndarray[Any, Any]":
+        for child in children:
+            active = child(batch, active)
+        return active
+
+    return predicate
+
+
+def _batch_or(children: List[BatchPredicate]) -> BatchPredicate:
+    def predicate(batch: Batch, active: "np.ndarray[Any, Any]") -> "np.ndarray[Any, Any]":
+        passed = batch.no_rows()
+        for child in children:
+            child_passed = child(batch, active)
+            passed |= child_passed
+            active = active & ~child_passed
+        return passed
+
+    return predicate
+
+
+def _rowwise(rule: Rule, context_key: str, namespace: str, config_name: str) -> BatchPredicate:
+    """Evaluates a single-key rule with its scalar predicate, one active row at a time"""
+    predicate = compile_rule(rule, namespace, config_name)
+
+    def rowwise(batch: Batch, active: "np.ndarray[Any, Any]") -> "np.ndarray[Any, Any]":
+        column = batch.columns.get(context_key)
+        passed = batch.no_rows()
+        if column is None:
+            return passed
+        items = column.items
+        for i in np.flatnonzero(active).tolist():
+            value = items[i]
+            if value is not None:
+                passed[i] = predicate({context_key: value}, None)
+        return passed
+
+    return rowwise
+
+
+ColumnMask = Callable[[Column], Optional["np.ndarray[Any, Any]"]]
+
+
+def _compile_batch_atom(atom: Atom, rowwise: BatchPredicate) -> BatchPredicate:
+    context_key = atom.context_key
+    mask = _compile_atom_mask(atom)
+
+    def predicate(batch: Batch, active: "np.ndarray[Any, Any]") -> "np.ndarray[Any, Any]":
+        column = batch.columns.get(context_key)
+        if column is None:
+            return batch.no_rows()
+        rows = active if column.present is None else active & column.present
+        if not rows.any():
+            return rows
+        result = mask(column) if mask else None
+        if result is None:
+            return rowwise(batch, rows)
+        return rows & result
+
+    return predicate
+
+
+def _compile_atom_mask(atom: Atom) -> Optional[ColumnMask]:
+    """Returns a function computing the atom over a whole column of values, or None if there is no vectorized
+    equivalent. The function itself returns None for columns it can't handle"""
+    comparison_operator = atom.comparison_operator
+    rule_value = atom.comparison_value
+    rule_kind = rule_value.WhichOneof("kind")
+
+    if comparison_operator == ComparisonOperator.COMPARISON_OPERATOR_PRESENT:
+        return lambda column: np.ones(len(column.values), dtype=bool)
+    elif comparison_operator == ComparisonOperator.COMPARISON_OPERATOR_EQUALS:
+        return _equals_mask(rule_kind, [rule_value])
+    elif comparison_operator == ComparisonOperator.COMPARISON_OPERATOR_NOT_EQUALS:
+        return _not_mask(_equals_mask(rule_kind, [rule_value]))
+    elif comparison_operator == ComparisonOperator.COMPARISON_OPERATOR_CONTAINED_WITHIN and rule_kind == "list_value":
+        elements = list(rule_value.list_value.values)
+        element_kinds = {e.WhichOneof("kind") for e in elements}
+        # Mixed lists raise or not depending on the order of their elements, leave them to the scalar path
+        if len(element_kinds) == 1:
+            return _equals_mask(element_kinds.pop(), elements)
+    elif comparison_operator in _NUMBER_OPERATORS and rule_kind == "number_value":
+        return _number_mask(_NUMBER_OPERATORS[comparison_operator], rule_value.number_value)
+    elif comparison_operator in _STRING_OPERATORS and rule_kind == "string_value":
+        return _string_mask(_STRING_OPERATORS[comparison_operator], rule_value.string_value)
+    return None
+
+
+def _equals_mask(rule_kind: Optional[str], rule_values: List[Value]) -> ColumnMask:
+    def mask(column: Column) -> Optional["np.ndarray[Any, Any]"]:
+        if rule_kind == "string_value" and column.kind == "string":
+            return np.isin(column.values, [v.string_value for v in rule_values])
+        if rule_kind == "bool_value" and column.kind == "bool":
+            return np.isin(column.values, [v.bool_value for v in rule_values])
+        if rule_kind == "number_value" and column.kind == "double":
+            return np.isin(column.values, [v.number_value for v in rule_values])
+        if rule_kind == "number_value" and column.kind == "int":
+            # Compare integers exactly, a number that isn't an int64 can't equal any of them
+            targets = [int(v.number_value) for v in rule_values if _is_int64(v.number_value)]
+            return np.isin(column.values, targets)
+        return None
+
+    return mask
+
+
+def _not_mask(inner: ColumnMask) -> ColumnMask:
+    def mask(column: Column) -> Optional["np.ndarray[Any, Any]"]:
+        result = inner(column)
+        return None if result is None else ~result
+
+    return mask
+
+
+def _number_mask(compare: Callable[[Any, float], Any], rule_num: float) -> ColumnMask:
+    def mask(column: Column) -> Optional["np.ndarray[Any, Any]"]:
+        if column.kind not in ("int", "double"):
+            return None
+        return compare(column.values.astype(np.float64), rule_num)  # type: ignore[no-any-return]
+
+    return mask
+
+
+def _string_mask(compare: Callable[[Any, str], Any], rule_str: str) -> ColumnMask:
+    def mask(column: Column) -> Optional["np.ndarray[Any, Any]"]:
+        if column.kind != "string":
+            return None
+        return compare(column.values, rule_str)  # type: ignore[no-any-return]
+
+    return mask
+
+
+def _is_int64(number: float) -> bool:
+    return number.is_integer() and -(2.0**63) <= number < 2.0**63
+
+
+_NUMBER_OPERATORS: Dict[ComparisonOperator.ValueType, Callable[[Any, float], Any]] = {
+    ComparisonOperator.COMPARISON_OPERATOR_LESS_THAN: lambda a, b: a < b,
+    ComparisonOperator.COMPARISON_OPERATOR_LESS_THAN_OR_EQUALS: lambda a, b: a <= b,
+    ComparisonOperator.COMPARISON_OPERATOR_GREATER_THAN: lambda a, b: a > b,
+    ComparisonOperator.COMPARISON_OPERATOR_GREATER_THAN_OR_EQUALS: lambda a, b: a >= b,
+}
+
+_STRING_OPERATORS: Dict[ComparisonOperator.ValueType, Callable[[Any, str], Any]] = {
+    ComparisonOperator.COMPARISON_OPERATOR_STARTS_WITH: lambda a, s: np.char.startswith(a, s),
+    ComparisonOperator.COMPARISON_OPERATOR_ENDS_WITH: lambda a, s: np.char.endswith(a, s),
+    ComparisonOperator.COMPARISON_OPERATOR_CONTAINS: lambda a, s: np.char.find(a, s) >= 0,
+}
+
+
+def _compile_batch_bucket(
+    bucket_f: CallExpression.Bucket, namespace: str, config_name: str, rowwise: BatchPredicate
+) -> BatchPredicate:
+    context_key = bucket_f.context_key
+    threshold = bucket_f.threshold
+    prefix = _bucket_prefix(namespace, config_name, context_key)
+
+    def predicate(batch: Batch, active: "np.ndarray[Any, Any]") -> "np.ndarray[Any, Any]":
+        column = batch.columns.get(context_key)
+        if column is None:
+            return batch.no_rows()
+        rows = active if column.present is None else active & column.present
+        if not rows.any():
+            return rows
+        values = column.values[rows]
+        # Negative ints and bools raise in the scalar path, let it raise the same errors
+        if column.kind not in ("string", "int", "double") or (column.kind == "int" and (values < 0).any()):
+            return rowwise(batch, rows)
+        passed = batch.no_rows()
+        passed[rows] = _hash_column(prefix, column.kind, values) % _BUCKET_COUNT <= threshold
+        return passed
+
+    return predicate
+
+
+def bucket_values(namespace: str, config_name: str, context_key: str, ids: Any) -> "np.ndarray[Any, Any]":
+    """Returns the bucket (0-99999) that each id falls into for a bucket rule on `context_key` in the given config.
+
+    Ids can be a NumPy array or a list of strings, ints or floats, and are hashed exactly as scalar evaluation
+    hashes them. `None` ids get bucket -1. Raises the same errors as scalar evaluation for ids that can't be
+    bucketed (bools, negative ints).
+    """
+    if np is None:  # pragma: no cover
+        raise LekkoError("numpy is required for batch evaluation, install lekko_client[batch]")
+
+    column = _to_column(ids if _is_sequence(ids) else list(ids), 0)
+    prefix = _bucket_prefix(namespace, config_name, context_key)
+    if column.kind == "bool":
+        raise EvaluationError("Unsupported value type for bucket")
+    if column.kind == "int" and (column.values < 0).any():
+        raise OverflowError("can't convert negative int to unsigned")
+    if column.kind != "object":
+        return (_hash_column(prefix, column.kind, column.values) % _BUCKET_COUNT).astype(np.int64)
+
+    buckets = np.full(len(column.values), -1, dtype=np.int64)
+    rows = [i for i, item in enumerate(column.items) if item is not None]
+    bodies = [_bucket_bytes(column.items[i]) for i in rows]
+    buckets[rows] = _hash_messages(prefix, bodies) % _BUCKET_COUNT
+    return buckets
+
+
+def bucket_mask(namespace: str, config_name: str, context_key: str, ids: Any, threshold: int) -> "np.ndarray[Any, Any]":
+    """Returns, for each id, whether a bucket rule with the given threshold passes. `None` ids never pass"""
+    buckets = bucket_values(namespace, config_name, context_key, ids)
+    return (buckets >= 0) & (buckets <= threshold)
+
+
+_BUCKET_COUNT = 100000
+
+
+def _bucket_prefix(namespace: str, config_name: str, context_key: str) -> bytes:
+    return b"".join([bytes(namespace, "utf-8"), bytes(config_name, "utf-8"), bytes(context_key, "utf-8")])
+
+
+def _bucket_bytes(value: Any) -> bytes:
+    if isinstance(value, str):
+        return bytes(value, "utf-8")
+    if isinstance(value, bool):
+        raise EvaluationError("Unsupported value type for bucket")
+    if isinstance(value, int):
+        return value.to_bytes(8, byteorder="big")
+    if isinstance(value, float):
+        return struct.pack(">d", value)
+    raise EvaluationError("Unsupported value type for bucket")
+
+
+def _hash_column(prefix: bytes, kind: str, values: "np.ndarray[Any, Any]") -> "np.ndarray[Any, Any]":
+    """xxh32 of prefix + value bytes for every value of a string, non-negative int or double column"""
+    if kind == "string":
+        if len(values) == 0:
+            return np.zeros(0, dtype=np.uint32)
+        # NUL padded UCS4 code points, which are the UTF-8 bytes when every string is ASCII
+        codes = values.view(np.uint32).reshape(len(values), -1)
+        if codes.max() < 0x80:
+            return _hash_padded(prefix, codes.astype(np.uint8), np.char.str_len(values))
+        return _hash_messages(prefix, [bytes(v, "utf-8") for v in values.tolist()])
+    # Same big-endian encodings as `int.to_bytes(8, "big")` and `struct.pack(">d")`
+    dtype = ">i8" if kind == "int" else ">f8"
+    bodies = np.ascontiguousarray(values.astype(dtype)).view(np.uint8).reshape(-1, 8)
+    return _xxh32(_with_prefix(prefix, bodies))
+
+
+def _hash_padded(
+    prefix: bytes, bodies: "np.ndarray[Any, Any]", lengths: "np.ndarray[Any, Any]"
+) -> "np.ndarray[Any, Any]":
+    hashes = np.zeros(len(bodies), dtype=np.uint32)
+    for length, rows in _length_groups(lengths):
+        hashes[rows] = _xxh32(_with_prefix(prefix, bodies[rows, :length]))
+    return hashes
+
+
+def _hash_messages(prefix: bytes, bodies: List[bytes]) -> "np.ndarray[Any, Any]":
+    hashes = np.zeros(len(bodies), dtype=np.uint32)
+    lengths = np.fromiter(map(len, bodies), dtype=np.int64, count=len(bodies))
+    for length, rows in _length_groups(lengths):
+        group = np.frombuffer(b"".join([bodies[i] for i in rows.tolist()]), dtype=np.uint8)
+        hashes[rows] = _xxh32(_with_prefix(prefix, group.reshape(len(rows), length)))
+    return hashes
+
+
+def _length_groups(lengths: "np.ndarray[Any, Any]") -> Iterator[Tuple[int, "np.ndarray[Any, Any]"]]:
+    # Rows are hashed in groups of equal length, the hash of each group is fully vectorized
+    order = np.argsort(lengths, kind="stable")
+    sorted_lengths = lengths[order]
+    starts = np.flatnonzero(np.diff(sorted_lengths, prepend=-1))
+    ends = [*starts[1:].tolist(), len(order)]
+    for start, end in zip(starts.tolist(), ends):
+        yield int(sorted_lengths[start]), order[start:end]
+
+
+def _with_prefix(prefix: bytes, bodies: "np.ndarray[Any, Any]") -> "np.ndarray[Any, Any]":
+    prefix_bytes = np.broadcast_to(np.frombuffer(prefix, dtype=np.uint8), (len(bodies), len(prefix)))
+    return np.concatenate([prefix_bytes, bodies], axis=1)
+
+
+_PRIME32_1 = 2654435761
+_PRIME32_2 = 2246822519
+_PRIME32_3 = 3266489917
+_PRIME32_4 = 668265263
+_PRIME32_5 = 374761393
+
+
+def _xxh32(messages: "np.ndarray[Any, Any]", seed: int = 0) -> "np.ndarray[Any, Any]":
+    """xxh32 of every row of a (rows, length) uint8 array, identical to `xxhash.xxh32(row, seed).intdigest()`"""
+    rows, length = messages.shape
+    # Little-endian 32 bit words over the part of each row that has whole words
+    word_count = length // 4
+    words = np.ascontiguousarray(messages[:, : word_count * 4]).view("<u4").astype(np.uint32)
+
+    def full(value: int) -> "np.ndarray[Any, Any]":
+        return np.full(rows, value & 0xFFFFFFFF, dtype=np.uint32)
+
+    def rotl(x: "np.ndarray[Any, Any]", r: int) -> "np.ndarray[Any, Any]":
+        return (x << np.uint32(r)) | (x >> np.uint32(32 - r))
+
+    p1, p2, p3, p4, p5 = (np.uint32(p) for p in (_PRIME32_1, _PRIME32_2, _PRIME32_3, _PRIME32_4, _PRIME32_5))
+    word = 0
+    if length >= 16:
+        accumulators = [
+            full(seed + _PRIME32_1 + _PRIME32_2),
+            full(seed + _PRIME32_2),
+            full(seed),
+            full(seed - _PRIME32_1),
+        ]
+        while word + 4 <= word_count:
+            for lane in range(4):
+                accumulators[lane] = rotl(accumulators[lane] + words[:, word + lane] * p2, 13) * p1
+            word += 4
+        v1, v2, v3, v4 = accumulators
+        h = rotl(v1, 1) + rotl(v2, 7) + rotl(v3, 12) + rotl(v4, 18)
+    else:
+        h = full(seed + _PRIME32_5)
+
+    h += np.uint32(length & 0xFFFFFFFF)
+    for i in range(word, word_count):
+        h = rotl(h + words[:, i] * p3, 17) * p4
+    for i in range(word_count * 4, length):
+        h = rotl(h + messages[:, i].astype(np.uint32) * p5, 11) * p1
+
+    h ^= h >> np.uint32(15)
+    h *= p2
+    h ^= h >> np.uint32(13)
+    h *= p3
+    h ^= h >> np.uint32(16)
+    return h  # type: ignore[no-any-return]
+
+
+def _is_sequence(value: Any) -> bool:
+    return isinstance(value, (list, tuple)) or (np is not None and isinstance(value, np.ndarray))
+
+
+def _to_column(value: Any, size: int) -> Column:
+    if not _is_sequence(value):
+        # Scalars apply to every row
+        value = [value] * size
+
+    if isinstance(value, np.ndarray):
+        kind = value.dtype.kind
+        if kind == "b":
+            return Column("bool", value)
+        if kind == "i" or (kind == "u" and value.dtype.itemsize < 8):
+            return Column("int", value.astype(np.int64))
+        if kind == "f":
+            return Column("double", value.astype(np.float64))
+        if kind == "U":
+            return Column("string", value)
+        value = value.tolist()
+
+    types = {type(v) for v in value}
+    # NumPy strings drop trailing NULs
+    if types == {str} and not any(v.endswith("\x00") for v in value):
+        return Column("string", np.array(value, dtype=str))
+    if types == {bool}:
+        return Column("bool", np.array(value, dtype=bool))
+    if types == {float}:
+        return Column("double", np.array(value, dtype=np.float64))
+    if types == {int} and all(-(2**63) <= v < 2**63 for v in value):
+        return Column("int", np.array(value, dtype=np.int64))
+
+    items = [None if v is None else normalize_value(v) for v in value]
+    values = np.empty(len(items), dtype=object)
+    values[:] = items
+    return Column("object", values, np.array([v is not None for v in items], dtype=bool), items)
@@ -0,0 +1,76 @@
+import math
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Hashable, List, NamedTuple, Optional, Sequence, Tuple
+
+from lekko_client.evaluation.evaluation import EvaluationResult
+from lekko_client.models import NativeContext
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class ResultCache:
+    """A bounded LRU cache of evaluation results.
+
+    Entries are keyed on `(commit_sha, namespace, key, projected context values)`, where the projection only
+    contains the context keys the config actually reads. Calling `clear` whenever the store loads new contents
+    bumps the cache generation, and results computed against an older generation are never inserted.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._lock = Lock()
+        self._entries: OrderedDict[Hashable, EvaluationResult] = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[EvaluationResult]:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: Hashable, result: EvaluationResult, generation: int) -> None:
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+
+def project_context(context: NativeContext, keys: Sequence[str]) -> Tuple[Any, ...]:
+    """Projects a normalized context onto the given keys, in a form that can be used as part of a cache key"""
+    projection: List[Any] = []
+    for k in keys:
+        if not context or k not in context:
+            projection.append(None)
+            continue
+        value = context[k]
+        # Tag values with their type, since e.g. True == 1 but they evaluate differently
+        if type(value) is float:
+            # -0.0 == 0.0, but bucketing hashes their bytes
+            projection.append((float, value, math.copysign(1.0, value)))
+        else:
+            projection.append((type(value), value))
+    return tuple(projection)
@@ -0,0 +1,423 @@
+import itertools
+import operator
+import re
+import struct
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    assert_never,
+)
+
+from google.protobuf.struct_pb2 import Value
+from xxhash import xxh32_intdigest
+
+from lekko_client.exceptions import EvaluationError
+from lekko_client.gen.lekko.rules.v1beta3.rules_pb2 import (
+    Atom,
+    CallExpression,
+    ComparisonOperator,
+    LogicalOperator,
+    Rule,
+)
+from lekko_client.helpers import get_value_kind
+from lekko_client.models import NativeContext, NativeValue
+
+# Rule results for one context, keyed by the memo slot of each interned rule, along with the context values
+# encoded by buckets, keyed by the slot of their context key. A memo can be shared by every evaluation against
+# the same context, across configs.
+RuleMemo = Dict[int, Any]
+
+# A compiled rule. Compilation resolves everything that only depends on the rule itself (operator dispatch,
+# comparison values, bucket key prefixes) so that evaluation only has to look at the context. Contexts hold
+# native values, as normalized by `helpers.normalize_context`, instead of proto Values.
+RulePredicate = Callable[[NativeContext, Optional[RuleMemo]], bool]
+
+_NUMBER_COMPARATORS = {
+    ComparisonOperator.COMPARISON_OPERATOR_LESS_THAN: operator.lt,
+    ComparisonOperator.COMPARISON_OPERATOR_LESS_THAN_OR_EQUALS: operator.le,
+    ComparisonOperator.COMPARISON_OPERATOR_GREATER_THAN: operator.gt,
+    ComparisonOperator.COMPARISON_OPERATOR_GREATER_THAN_OR_EQUALS: operator.ge,
+}
+
+_STRING_COMPARATORS: dict[ComparisonOperator.ValueType, Callable[[str, str], bool]] = {
+    ComparisonOperator.COMPARISON_OPERATOR_STARTS_WITH: str.startswith,
+    ComparisonOperator.COMPARISON_OPERATOR_ENDS_WITH: str.endswith,
+    ComparisonOperator.COMPARISON_OPERATOR_CONTAINS: lambda context_str, rule_str: rule_str in context_str,
+}
+
+# Memo slots are unique across tables, so plans compiled with different tables can share a memo
+_memo_slots = itertools.count()
+
+
+def compile_rule(rule: Rule, namespace: str, config_name: str) -> RulePredicate:
+    """Compile a v1beta3 rule into a predicate over a client context.
+
+    The predicate is equivalent to `rules.evaluate_rule` on the same context converted to proto Values, including
+    the errors it raises: problems with the rule itself are reported when the offending node is evaluated, not
+    when it is compiled.
+    """
+    return RuleTable().compile(rule, namespace, config_name)
+
+
+class RuleTable:
+    """Interns compiled rules by their serialized form.
+
+    Identical subtrees of every rule compiled with the same table share one predicate and one memo slot. Subtrees
+    that call bucket depend on the namespace and config they're in, and are only shared within a config.
+    """
+
+    def __init__(self) -> None:
+        self._predicates: Dict[Union[bytes, Tuple[str, str, bytes]], RulePredicate] = {}
+
+    def __len__(self) -> int:
+        return len(self._predicates)
+
+    def compile(self, rule: Rule, namespace: str, config_name: str) -> RulePredicate:
+        return self._intern(rule, namespace, config_name)[0]
+
+    def _intern(self, rule: Rule, namespace: str, config_name: str) -> Tuple[RulePredicate, bool]:
+        """Returns the predicate for a rule, and whether it depends on the config"""
+        serialized = rule.SerializeToString(deterministic=True)
+        predicate = self._predicates.get(serialized)
+        if predicate is not None:
+            return predicate, False
+        config_key = (namespace, config_name, serialized)
+        predicate = self._predicates.get(config_key)
+        if predicate is not None:
+            return predicate, True
+
+        predicate, config_dependent = self._compile(rule, namespace, config_name)
+        self._predicates[config_key if config_dependent else serialized] = predicate
+        return predicate, config_dependent
+
+    def _compile(self, rule: Rule, namespace: str, config_name: str) -> Tuple[RulePredicate, bool]:
+        rule_type = rule.WhichOneof("rule")
+        if not rule_type:
+            return _raises("Empty rule"), False
+
+        if rule_type == "bool_const":
+            const = rule.bool_const
+            return (lambda context, memo: const), False
+        elif rule_type == "not":
+            # have to use `getattr` because `not` is a reserved keyword
+            inner, config_dependent = self._intern(getattr(rule, rule_type), namespace, config_name)
+            return _memoized(lambda context, memo: not inner(context, memo)), config_dependent
+        elif rule_type == "logical_expression":
+            logical_expression = rule.logical_expression
+            if not logical_expression.rules:
+                return _raises("No rules found in logical expression"), False
+
+            if logical_expression.logical_operator != LogicalOperator.LOGICAL_OPERATOR_AND:
+                string_chain = _compile_string_chain(logical_expression.rules)
+                if string_chain:
+                    return _memoized(string_chain), False
+
+            interned = [self._intern(r, namespace, config_name) for r in logical_expression.rules]
+            children = tuple(child for child, _ in interned)
+            config_dependent = any(dependent for _, dependent in interned)
+            if logical_expression.logical_operator == LogicalOperator.LOGICAL_OPERATOR_AND:
+                return _memoized(lambda context, memo: all(c(context, memo) for c in children)), config_dependent
+            return _memoized(lambda context, memo: any(c(context, memo) for c in children)), config_dependent
+        elif rule_type == "atom":
+            return _compile_atom(rule.atom), False
+        elif rule_type == "call_expression":
+            fn_type = rule.call_expression.WhichOneof("function")
+            if fn_type is None:
+                return _raises("Empty call expression"), False
+            return _memoized(_compile_bucket(rule.call_expression.bucket, namespace, config_name)), True
+        else:
+            assert_never(rule_type)
+
+
+def _memoized(evaluate: RulePredicate) -> RulePredicate:
+    slot = next(_memo_slots)
+
+    def predicate(context: NativeContext, memo: Optional[RuleMemo]) -> bool:
+        if memo is None:
+            return evaluate(context, memo)
+        result: Optional[bool] = memo.get(slot)
+        if result is None:
+            result = memo[slot] = evaluate(context, memo)
+        return result
+
+    return predicate
+
+
+def _raises(message: str) -> RulePredicate:
+    def predicate(context: NativeContext, memo: Optional[RuleMemo]) -> bool:
+        raise EvaluationError(message)
+
+    return predicate
+
+
+def _compile_atom(atom: Atom) -> RulePredicate:
+    context_key = atom.context_key
+    comparison_operator = atom.comparison_operator
+
+    if comparison_operator == ComparisonOperator.COMPARISON_OPERATOR_PRESENT:
+
+        def present(context: NativeContext, memo: Optional[RuleMemo]) -> bool:
+            return bool(context) and context.get(context_key) is not None  # type: ignore[union-attr]
+
+        return present
+
+    if comparison_operator == ComparisonOperator.COMPARISON_OPERATOR_EQUALS:
+        test = _compile_equals(atom.comparison_value)
+    elif comparison_operator == ComparisonOperator.COMPARISON_OPERATOR_NOT_EQUALS:
+        equals = _compile_equals(atom.comparison_value)
+
+        def test(context_value: NativeValue) -> bool:
+            return not equals(context_value)
+
+    elif comparison_operator in _NUMBER_COMPARATORS:
+        test = _compile_number_comparator(_NUMBER_COMPARATORS[comparison_operator], atom.comparison_value)
+    elif comparison_operator == ComparisonOperator.COMPARISON_OPERATOR_CONTAINED_WITHIN:
+        test = _compile_contained_within(atom.comparison_value)
+    elif comparison_operator in _STRING_COMPARATORS:
+        test = _compile_string_comparator(_STRING_COMPARATORS[comparison_operator], atom.comparison_value)
+    else:
+        test = _fails("Unknown comparison operator")
+    slot = next(_memo_slots)
+
+    def predicate(context: NativeContext, memo: Optional[RuleMemo]) -> bool:
+        context_value = context.get(context_key) if context else None
+        if context_value is None:
+            return False
+        if memo is None:
+            return test(context_value)
+        result: Optional[bool] = memo.get(slot)
+        if result is None:
+            result = memo[slot] = test(context_value)
+        return result
+
+    return predicate
+
+
+ValueTest = Callable[[NativeValue], bool]
+
+
+def _fails(message: str) -> ValueTest:
+    def test(_: NativeValue) -> bool:
+        raise EvaluationError(message)
+
+    return test
+
+
+# Types of the context values that can be compared with each kind of rule value
+_COMPARABLE_TYPES: Dict[str, Tuple[type, ...]] = {
+    "bool_value": (bool,),
+    "string_value": (str,),
+    "number_value": (float, int),
+}
+
+
+def _compile_equals(rule_value: Value) -> ValueTest:
+    rule_kind = rule_value.WhichOneof("kind")
+    if rule_kind not in _COMPARABLE_TYPES:
+        return _fails("Unsupported rule type for equals operator")
+
+    expected = getattr(rule_value, rule_kind)
+    comparable = _COMPARABLE_TYPES[rule_kind]
+
+    def test(context_value: NativeValue) -> bool:
+        if type(context_value) in comparable:
+            return bool(context_value == expected)
+        raise EvaluationError(f"Type mismatch in equals operator rule: {rule_kind} and {get_value_kind(context_value)}")
+
+    return test
+
+
+def number_comparison(rule: Rule) -> Optional[Tuple[str, Callable[[float, float], bool], Optional[float]]]:
+    """Returns the context key, comparator and rule number of a numeric comparison atom, None for any other rule.
+
+    The rule number is None if the rule value isn't a number, in which case the atom raises for any context value.
+    """
+    if rule.WhichOneof("rule") != "atom" or rule.atom.comparison_operator not in _NUMBER_COMPARATORS:
+        return None
+    atom = rule.atom
+    rule_num = None
+    if atom.comparison_value.WhichOneof("kind") == "number_value":
+        rule_num = float(atom.comparison_value.number_value)
+    return atom.context_key, _NUMBER_COMPARATORS[atom.comparison_operator], rule_num
+
+
+def _get_context_number(context_value: NativeValue) -> float:
+    if isinstance(context_value, (float, int)) and not isinstance(context_value, bool):
+        return float(context_value)
+    raise EvaluationError("get_number caled with non-numeric Value")
+
+
+def _compile_number_comparator(compare: Callable[[float, float], bool], rule_value: Value) -> ValueTest:
+    if rule_value.WhichOneof("kind") != "number_value":
+        return _fails("get_number caled with non-numeric Value")
+    rule_num = float(rule_value.number_value)
+    return lambda context_value: compare(_get_context_number(context_value), rule_num)
+
+
+# For each context value type, the values an equality test passes for, and the error it raises for any other
+# value (None if it just fails)
+EqualityLookups = Dict[type, Tuple[FrozenSet[NativeValue], Optional[str]]]
+
+
+def equality_lookups(rule: Rule) -> Optional[Tuple[str, EqualityLookups]]:
+    """Returns the context key and lookups of an EQUALS or CONTAINED_WITHIN atom, None for any other rule"""
+    if rule.WhichOneof("rule") != "atom":
+        return None
+    atom = rule.atom
+    if atom.comparison_operator == ComparisonOperator.COMPARISON_OPERATOR_EQUALS:
+        return atom.context_key, _equality_lookups([atom.comparison_value])
+    if (
+        atom.comparison_operator == ComparisonOperator.COMPARISON_OPERATOR_CONTAINED_WITHIN
+        and atom.comparison_value.WhichOneof("kind") == "list_value"
+    ):
+        return atom.context_key, _equality_lookups(atom.comparison_value.list_value.values)
+    return None
+
+
+def _equality_lookups(elements: Sequence[Value]) -> EqualityLookups:
+    # Elements are compared in order and the first one that can't be compared with the context value raises.
+    # So, for each context value type, the result only depends on the elements before the first one that
+    # can't, which are precomputed as a set, and on the error that one raises.
+    lookups: EqualityLookups = {}
+    for context_type, context_kind in _CONTEXT_KINDS.items():
+        members = set()
+        error = None
+        for element in elements:
+            rule_kind = element.WhichOneof("kind")
+            if rule_kind not in _COMPARABLE_TYPES:
+                error = "Unsupported rule type for equals operator"
+                break
+            if context_type not in _COMPARABLE_TYPES[rule_kind]:
+                error = f"Type mismatch in equals operator rule: {rule_kind} and {context_kind}"
+                break
+            members.add(getattr(element, rule_kind))
+        lookups[context_type] = (frozenset(members), error)
+    return lookups
+
+
+def _compile_contained_within(rule_value: Value) -> ValueTest:
+    if rule_value.WhichOneof("kind") != "list_value":
+        return _fails("Contained within operator must use a list value")
+    lookups = _equality_lookups(rule_value.list_value.values)
+
+    def test(context_value: NativeValue) -> bool:
+        members, error = lookups[type(context_value)]
+        # Sets compare ints and floats by value, like `==`
+        if context_value in members:
+            return True
+        if error:
+            raise EvaluationError(error)
+        return False
+
+    return test
+
+
+_CONTEXT_KINDS = {bool: "bool_value", str: "string_value", float: "double_value", int: "int_value"}
+
+
+def _compile_string_comparator(compare: Callable[[str, str], bool], rule_value: Value) -> ValueTest:
+    if rule_value.WhichOneof("kind") != "string_value":
+        return _fails("get_string called with non-string Value")
+    rule_str = rule_value.string_value
+
+    def test(context_value: NativeValue) -> bool:
+        if type(context_value) is not str:
+            raise EvaluationError("get_string called with non-string Value")
+        return compare(context_value, rule_str)
+
+    return test
+
+
+# Shortest OR of string comparisons compiled by `_compile_string_chain`
+_MIN_STRING_CHAIN = 2
+
+
+def _compile_string_chain(rules: Sequence[Rule]) -> Optional[RulePredicate]:
+    """Compiles an OR of STARTS_WITH, ENDS_WITH and CONTAINS atoms on one context key into a single predicate.
+
+    Prefixes and suffixes are checked with one `str.startswith`/`str.endswith` call on a tuple and substrings
+    with one regex alternation, instead of one atom at a time. Returns None if `rules` isn't such a chain.
+    """
+    if len(rules) < _MIN_STRING_CHAIN:
+        return None
+    atoms = [rule.atom for rule in rules if rule.WhichOneof("rule") == "atom"]
+    if len(atoms) < len(rules) or any(atom.comparison_operator not in _STRING_COMPARATORS for atom in atoms):
+        return None
+    context_key = atoms[0].context_key
+    if any(atom.context_key != context_key for atom in atoms):
+        return None
+
+    # Atoms after the first one without a string value are never evaluated, since it raises
+    patterns: Dict[ComparisonOperator.ValueType, List[str]] = {
+        comparison_operator: [] for comparison_operator in _STRING_COMPARATORS
+    }
+    raises = False
+    for atom in atoms:
+        if atom.comparison_value.WhichOneof("kind") != "string_value":
+            raises = True
+            break
+        patterns[atom.comparison_operator].append(atom.comparison_value.string_value)
+    prefixes = tuple(patterns[ComparisonOperator.COMPARISON_OPERATOR_STARTS_WITH])
+    suffixes = tuple(patterns[ComparisonOperator.COMPARISON_OPERATOR_ENDS_WITH])
+    substrings = patterns[ComparisonOperator.COMPARISON_OPERATOR_CONTAINS]
+    contains = re.compile("|".join(map(re.escape, substrings))).search if substrings else None
+
+    def predicate(context: NativeContext, memo: Optional[RuleMemo]) -> bool:
+        context_value = context.get(context_key) if context else None
+        if context_value is None:
+            return False
+        if type(context_value) is not str:
+            raise EvaluationError("get_string called with non-string Value")
+        if context_value.startswith(prefixes) or context_value.endswith(suffixes):
+            return True
+        if contains and contains(context_value):
+            return True
+        if raises:
+            raise EvaluationError("get_string called with non-string Value")
+        return False
+
+    return predicate
+
+
+# Memo slots of the context keys used by buckets, shared by every bucket on the same key
+_bucket_value_slots: Dict[str, int] = {}
+
+
+def _compile_bucket(bucket_f: CallExpression.Bucket, namespace: str, config_name: str) -> RulePredicate:
+    ctx_key = bucket_f.context_key
+    threshold = bucket_f.threshold
+    prefix = b"".join([bytes(namespace, "utf-8"), bytes(config_name, "utf-8"), bytes(ctx_key, "utf-8")])
+    value_slot = _bucket_value_slots.get(ctx_key)
+    if value_slot is None:
+        value_slot = _bucket_value_slots[ctx_key] = next(_memo_slots)
+
+    def predicate(context: NativeContext, memo: Optional[RuleMemo]) -> bool:
+        value = context.get(ctx_key) if context else None
+        if value is None:
+            return False
+
+        bytes_buffer: Optional[bytes] = memo.get(value_slot) if memo is not None else None
+        if bytes_buffer is None:
+            bytes_buffer = _bucket_bytes(value)
+            if memo is not None:
+                memo[value_slot] = bytes_buffer
+        return bool(xxh32_intdigest(prefix + bytes_buffer) % 100000 <= threshold)
+
+    return predicate
+
+
+def _bucket_bytes(value: NativeValue) -> bytes:
+    if isinstance(value, bool):
+        raise EvaluationError("Unsupported value type for bucket")
+    if isinstance(value, str):
+        return bytes(value, "utf-8")
+    elif isinstance(value, int):
+        return value.to_bytes(8, byteorder="big")
+    return struct.pack(">d", value)
@@ -1,5 +1,5 @@
-from dataclasses import dataclass
-from typing import List, Optional
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
 
 from google.protobuf.any_pb2 import Any as ProtoAny
 
@@ -16,6 +16,9 @@ class EvaluationResult:
     # Stores the path of the tree node that returned the final value
     # after successful evaluation.
     path: List[int]
+    # Decoded forms of `value`, filled lazily by clients. Results prebuilt by evaluation plans are shared between
+    # evaluations, so a value is only decoded once per loaded config.
+    decoded: Dict[Any, Any] = field(default_factory=dict, compare=False, repr=False)
 
 
 @dataclass
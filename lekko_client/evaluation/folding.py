@@ -0,0 +1,75 @@
+from typing import List, Optional
+
+from lekko_client.evaluation.analysis import rule_context_keys, rule_never_raises
+from lekko_client.evaluation.compiler import compile_rule
+from lekko_client.gen.lekko.rules.v1beta3.rules_pb2 import (
+    LogicalExpression,
+    LogicalOperator,
+    Rule,
+)
+from lekko_client.models import NativeContext
+
+
+def fold_rule(rule: Rule, base_context: NativeContext, namespace: str, config_name: str) -> Rule:
+    """Partially evaluates a rule for the contexts that hold every value of `base_context`.
+
+    Atoms and buckets that only read base keys are replaced by their result, and logical expressions are
+    simplified around constants. Subtrees that raise are kept as they are, so that the folded rule raises the
+    same errors as the original one. Returns `rule` itself when nothing can be folded.
+    """
+    rule_type = rule.WhichOneof("rule")
+    if rule_type == "atom" or rule_type == "call_expression":
+        keys = rule_context_keys(rule)
+        if not keys or not base_context or not keys <= base_context.keys():
+            return rule
+        try:
+            return Rule(bool_const=compile_rule(rule, namespace, config_name)(base_context, None))
+        except Exception:
+            # Left for evaluation to raise
+            return rule
+    elif rule_type == "not":
+        inner = getattr(rule, rule_type)
+        folded = fold_rule(inner, base_context, namespace, config_name)
+        if folded is inner:
+            return rule
+        value = rule_constant(folded)
+        if value is not None:
+            return Rule(bool_const=not value)
+        negation = Rule()
+        getattr(negation, rule_type).CopyFrom(folded)
+        return negation
+    elif rule_type == "logical_expression" and rule.logical_expression.rules:
+        return _fold_logical_expression(rule, base_context, namespace, config_name)
+    return rule
+
+
+def rule_constant(rule: Rule) -> Optional[bool]:
+    """Returns the result of a rule that is a constant, None otherwise"""
+    return rule.bool_const if rule.WhichOneof("rule") == "bool_const" else None
+
+
+def _fold_logical_expression(rule: Rule, base_context: NativeContext, namespace: str, config_name: str) -> Rule:
+    logical_expression = rule.logical_expression
+    # Anything but AND is evaluated as OR. A child equal to `short_circuit` decides the result, the opposite
+    # constant doesn't change it
+    short_circuit = logical_expression.logical_operator != LogicalOperator.LOGICAL_OPERATOR_AND
+    rules: List[Rule] = []
+    for child in logical_expression.rules:
+        folded = fold_rule(child, base_context, namespace, config_name)
+        value = rule_constant(folded)
+        if value is None:
+            rules.append(folded)
+        elif value == short_circuit:
+            rules.append(folded)
+            # Later children are never evaluated
+            break
+
+    if not rules:
+        return Rule(bool_const=not short_circuit)
+    if rule_constant(rules[-1]) is not None and all(rule_never_raises(r) for r in rules[:-1]):
+        return rules[-1]
+    if len(rules) == 1:
+        return rules[0]
+    if len(rules) == len(logical_expression.rules) and all(a is b for a, b in zip(rules, logical_expression.rules)):
+        return rule
+    return Rule(logical_expression=LogicalExpression(rules=rules, logical_operator=logical_expression.logical_operator))
@@ -0,0 +1,336 @@
+import itertools
+import math
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+from google.protobuf.any_pb2 import Any as ProtoAny
+
+from lekko_client.evaluation.analysis import rule_context_keys, rule_required_keys
+from lekko_client.evaluation.compiler import (
+    EqualityLookups,
+    RuleMemo,
+    RulePredicate,
+    RuleTable,
+    equality_lookups,
+    number_comparison,
+)
+from lekko_client.evaluation.evaluation import EvaluationResult
+from lekko_client.evaluation.folding import fold_rule, rule_constant
+from lekko_client.exceptions import EvaluationError
+from lekko_client.gen.lekko.feature.v1beta1.feature_pb2 import Any as LekkoAny
+from lekko_client.gen.lekko.feature.v1beta1.feature_pb2 import Constraint, Feature
+from lekko_client.gen.lekko.rules.v1beta3.rules_pb2 import Rule
+from lekko_client.models import NativeContext, NativeValue
+
+# Shortest runs of sibling equality tests and numeric comparisons that get an index. See benchmarks/plan_indexes.py
+_MIN_DISPATCH_RUN = 3
+_MIN_INTERVAL_RUN = 3
+
+
+@dataclass
+class DispatchIndex:
+    """A run of sibling nodes that only test one context key for equality, indexed by context value.
+
+    For each context value type, `lookups` maps values to the first node of the run that passes for them, and
+    holds the first node that raises for any other value (-1 if none). Nodes before it don't raise for that type.
+    """
+
+    context_key: str
+    lookups: Dict[type, Tuple[Dict[NativeValue, int], int]]
+    # Node to visit when no node of the run passes
+    end: int
+
+    def find(self, context: NativeContext) -> int:
+        """Returns the first node of the run that passes or raises for a context, -1 if none does"""
+        value = context.get(self.context_key) if context else None
+        if value is None:
+            return -1
+        matches, error = self.lookups[type(value)]
+        return matches.get(value, error)
+
+
+@dataclass
+class IntervalIndex:
+    """A run of sibling nodes that only compare one context key with numbers, indexed by the numbers they use.
+
+    `boundaries` holds the sorted rule numbers, which split the number line into intervals: numbers below the first
+    boundary, equal to it, between it and the next one, and so on. `nodes` holds the first node of the run that
+    passes or raises for the numbers in each interval (-1 if none).
+    """
+
+    context_key: str
+    boundaries: List[float]
+    nodes: List[int]
+    # First node of the run, which raises for non-numeric values
+    start: int
+    # First node that raises for NaN, which fails every comparison (-1 if none)
+    nan: int
+    # Node to visit when no node of the run passes
+    end: int
+
+    def find(self, context: NativeContext) -> int:
+        """Returns the first node of the run that passes or raises for a context, -1 if none does"""
+        value = context.get(self.context_key) if context else None
+        if value is None:
+            return -1
+        if type(value) is not int and type(value) is not float:
+            return self.start
+        # Context numbers are compared as floats
+        number = float(value)
+        if number != number:
+            return self.nan
+        i = bisect_left(self.boundaries, number)
+        if i < len(self.boundaries) and self.boundaries[i] == number:
+            return self.nodes[2 * i + 1]
+        return self.nodes[2 * i]
+
+
+@dataclass
+class EvaluationPlan:
+    """A config's constraint tree lowered into a flat node table.
+
+    Nodes are stored in pre-order. For every node, `first_child` and `next_sibling` hold the index of the
+    node to visit when its rule passes or fails respectively (-1 when there is none), and `results` holds
+    the prebuilt result returned when evaluation stops at that node. Results are shared between
+    evaluations and must not be mutated.
+
+    `required` holds, for every node, a bitmask over `key_bits` of the context keys whose absence
+    guarantees that its rule fails. Nodes missing one of them are skipped without calling their predicate.
+    Runs of siblings that test the same key for equality, or compare it with numbers, are looked up in the
+    `dispatch` index of their first node instead of being tried one by one.
+
+    Rules are folded before they are compiled, against the base context the plan was built for if any.
+    Nodes whose rule can't pass, and the siblings after a node whose rule always passes, stay in the table
+    but are unlinked. When evaluation can only end at one node, its result is kept in `constant`.
+    """
+
+    key: str
+    # Result returned when no top level constraint passes, None if the config has no rule tree
+    default: Optional[EvaluationResult]
+    predicates: List[RulePredicate] = field(default_factory=list)
+    first_child: List[int] = field(default_factory=list)
+    next_sibling: List[int] = field(default_factory=list)
+    results: List[EvaluationResult] = field(default_factory=list)
+    required: List[int] = field(default_factory=list)
+    # Every context key that can influence the result, sorted
+    context_keys: Tuple[str, ...] = ()
+    # Bit of each context key in `required`, empty if no node requires any key
+    key_bits: Dict[str, int] = field(default_factory=dict)
+    dispatch: Dict[int, Union[DispatchIndex, IntervalIndex]] = field(default_factory=dict)
+    # First node to visit, -1 if none
+    start: int = -1
+    # Result of every evaluation, for configs that don't depend on the context
+    constant: Optional[EvaluationResult] = None
+    # Column-wise predicates, compiled on first use by `batch.evaluate_batch`
+    batch_predicates: Optional[List[Any]] = field(default=None, repr=False, compare=False)
+
+    def evaluate(self, context: NativeContext = None, memo: Optional[RuleMemo] = None) -> EvaluationResult:
+        if self.constant is not None:
+            return self.constant
+        result = self.default
+        if result is None:
+            raise EvaluationError("Unable to evaluate config: rule tree is empty")
+
+        predicates, first_child, next_sibling = self.predicates, self.first_child, self.next_sibling
+        required, missing = self.required, self._missing_keys(context)
+        dispatch = self.dispatch
+        i = self.start
+        while i >= 0:
+            if dispatch and i in dispatch:
+                index = dispatch[i]
+                found = index.find(context)
+                if found < 0:
+                    i = index.end
+                    continue
+                i = found
+            elif required[i] & missing:
+                i = next_sibling[i]
+                continue
+            if predicates[i](context, memo):
+                result = self.results[i]
+                i = first_child[i]
+            else:
+                i = next_sibling[i]
+        return result
+
+    def _missing_keys(self, context: NativeContext) -> int:
+        """Returns the bitmask of the keys in `key_bits` that are missing from a context"""
+        key_bits = self.key_bits
+        missing = (1 << len(key_bits)) - 1
+        if missing and context:
+            # Checked key by key, so that evaluating doesn't build a set of the keys found
+            for key, bit in key_bits.items():
+                if key in context:
+                    missing ^= bit
+        return missing
+
+
+def build_plan(
+    config: Feature, namespace: str, table: Optional[RuleTable] = None, base_context: NativeContext = None
+) -> EvaluationPlan:
+    """Builds the plan of a config. Rules are interned in `table`, which can be shared by all the configs of a store.
+
+    A plan built with a `base_context` is specialized for it, and must only evaluate contexts holding all of its
+    values.
+    """
+    if not config.HasField("tree"):
+        return EvaluationPlan(config.key, None)
+
+    if table is None:
+        table = RuleTable()
+    plan = EvaluationPlan(config.key, EvaluationResult(_get_any(config.tree.default, config.tree.default_new), []))
+    context_keys: Set[str] = set()
+    required_keys: List[Set[str]] = []
+    plan.start = _add_nodes(
+        plan, table, config.tree.constraints, namespace, config.key, [], context_keys, required_keys, base_context
+    )
+    plan.context_keys = tuple(sorted(context_keys))
+    if any(required_keys):
+        plan.key_bits = {key: 1 << i for i, key in enumerate(plan.context_keys)}
+    plan.required = [sum(plan.key_bits[key] for key in keys) for keys in required_keys]
+
+    result, i = plan.default, plan.start
+    while i >= 0 and plan.predicates[i] is _always_passes:
+        result, i = plan.results[i], plan.first_child[i]
+    if i < 0:
+        plan.constant = result
+    return plan
+
+
+def _add_nodes(
+    plan: EvaluationPlan,
+    table: RuleTable,
+    constraints: Sequence[Constraint],
+    namespace: str,
+    config_name: str,
+    parent_path: List[int],
+    context_keys: Set[str],
+    required_keys: List[Set[str]],
+    base_context: NativeContext,
+) -> int:
+    """Adds the nodes of sibling constraints, returning the first one that can be visited (-1 if none)"""
+    first = previous = -1
+    reachable = True
+    siblings: List[int] = []
+    rules: List[Rule] = []
+    for i, constraint in enumerate(constraints):
+        index = len(plan.predicates)
+        path = [*parent_path, i]
+        rule = fold_rule(constraint.rule_ast_new, base_context, namespace, config_name)
+        passes = rule_constant(rule)
+        if not reachable or passes is False:
+            _add_unreachable_nodes(plan, constraint, path, required_keys)
+            continue
+
+        if previous >= 0:
+            plan.next_sibling[previous] = index
+        else:
+            first = index
+        plan.predicates.append(_always_passes if passes else table.compile(rule, namespace, config_name))
+        context_keys.update(rule_context_keys(rule))
+        required_keys.append(rule_required_keys(rule))
+        plan.first_child.append(-1)
+        plan.next_sibling.append(-1)
+        plan.results.append(EvaluationResult(_get_any(constraint.value, constraint.value_new), path))
+        plan.first_child[index] = _add_nodes(
+            plan, table, constraint.constraints, namespace, config_name, path, context_keys, required_keys, base_context
+        )
+        siblings.append(index)
+        rules.append(rule)
+        previous = index
+        # Siblings after a rule that always passes are never visited
+        reachable = not passes
+    _add_dispatch(plan, rules, siblings)
+    return first
+
+
+def _add_unreachable_nodes(
+    plan: EvaluationPlan, constraint: Constraint, path: List[int], required_keys: List[Set[str]]
+) -> None:
+    """Adds unlinked nodes for a constraint and its children, which keeps the table in pre-order"""
+    plan.predicates.append(_never_passes)
+    required_keys.append(set())
+    plan.first_child.append(-1)
+    plan.next_sibling.append(-1)
+    plan.results.append(EvaluationResult(_get_any(constraint.value, constraint.value_new), path))
+    for i, child in enumerate(constraint.constraints):
+        _add_unreachable_nodes(plan, child, [*path, i], required_keys)
+
+
+def _always_passes(context: NativeContext, memo: Optional[RuleMemo]) -> bool:
+    return True
+
+
+def _never_passes(context: NativeContext, memo: Optional[RuleMemo]) -> bool:
+    return False
+
+
+def _add_dispatch(plan: EvaluationPlan, rules: Sequence[Rule], siblings: List[int]) -> None:
+    """Indexes the runs of sibling constraints that test the same context key for equality or compare it with numbers"""
+    tests: List[Tuple[int, Optional[Tuple[str, str]], Any]] = []
+    for node, rule in zip(siblings, rules):
+        lookups = equality_lookups(rule)
+        comparison = number_comparison(rule)
+        if lookups:
+            tests.append((node, ("equality", lookups[0]), lookups[1]))
+        elif comparison:
+            tests.append((node, ("number", comparison[0]), comparison[1:]))
+        else:
+            tests.append((node, None, None))
+
+    for kind, group in itertools.groupby(tests, lambda test: test[1]):
+        run = list(group)
+        nodes = [node for node, _, _ in run]
+        details = [detail for _, _, detail in run]
+        if kind and kind[0] == "equality" and len(run) >= _MIN_DISPATCH_RUN:
+            plan.dispatch[nodes[0]] = _build_dispatch_index(plan, kind[1], nodes, details)
+        elif kind and kind[0] == "number" and len(run) >= _MIN_INTERVAL_RUN:
+            plan.dispatch[nodes[0]] = _build_interval_index(plan, kind[1], nodes, details)
+
+
+def _build_dispatch_index(
+    plan: EvaluationPlan, context_key: str, run: List[int], run_lookups: List[EqualityLookups]
+) -> DispatchIndex:
+    lookups: Dict[type, Tuple[Dict[NativeValue, int], int]] = {}
+    for context_type in run_lookups[0]:
+        matches: Dict[NativeValue, int] = {}
+        error = -1
+        for node, node_lookups in zip(run, run_lookups):
+            members, message = node_lookups[context_type]
+            for member in members:
+                matches.setdefault(member, node)
+            if message:
+                error = node
+                break
+        lookups[context_type] = (matches, error)
+    return DispatchIndex(context_key, lookups, plan.next_sibling[run[-1]])
+
+
+def _build_interval_index(
+    plan: EvaluationPlan,
+    context_key: str,
+    run: List[int],
+    comparisons: List[Tuple[Callable[[float, float], bool], Optional[float]]],
+) -> IntervalIndex:
+    # A NaN rule number fails every comparison, so it doesn't delimit anything
+    boundaries = sorted({rule_num for _, rule_num in comparisons if rule_num is not None and rule_num == rule_num})
+
+    def first_node(number: float) -> int:
+        for node, (compare, rule_num) in zip(run, comparisons):
+            if rule_num is None or compare(number, rule_num):
+                return node
+        return -1
+
+    # Any number strictly inside an interval compares the same way with every boundary
+    nodes = [first_node(math.nextafter(boundaries[0], -math.inf) if boundaries else 0.0)]
+    for boundary in boundaries:
+        nodes.append(first_node(boundary))
+        nodes.append(first_node(math.nextafter(boundary, math.inf)))
+    return IntervalIndex(context_key, boundaries, nodes, run[0], first_node(math.nan), plan.next_sibling[run[-1]])
+
+
+def _get_any(val: ProtoAny, val_new: LekkoAny) -> ProtoAny:
+    if val_new.type_url:
+        return ProtoAny(type_url=val_new.type_url, value=val_new.value)
+    return val
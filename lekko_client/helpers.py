@@ -1,12 +1,18 @@
-from typing import Any, Callable, Dict, List, Optional, Tuple
+import math
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
 
 import grpc
+from google.protobuf import descriptor_pool as proto_descriptor_pool
+from google.protobuf import symbol_database as proto_symbol_database
+from google.protobuf.message import Message as ProtoMessage
+from google.protobuf.struct_pb2 import Value as JSONValue
 from grpc_interceptor import ClientCallDetails, ClientInterceptor
 from grpc_interceptor.client import ClientInterceptorReturnType
 
 from lekko_client.gen.lekko.backend.v1beta1.distribution_service_pb2 import ContextKey
 from lekko_client.gen.lekko.client.v1beta1.configuration_service_pb2 import Value
-from lekko_client.models import ClientContext
+from lekko_client.models import ClientContext, NativeContext, NativeValue
 
 
 def convert_context(context: dict[str, Any]) -> ClientContext:
@@ -23,17 +29,93 @@ def convert_context(context: dict[str, Any]) -> ClientContext:
     return {k: convert_value(v) for k, v in context.items()}
 
 
-def get_value_type(val: Value) -> str:
-    return (val.WhichOneof("kind") or "").removesuffix("_value")
+def normalize_value(val: Any) -> NativeValue:
+    """Normalizes a context value the same way `convert_context` does, without building a proto Value.
 
+    Raises the same errors as `convert_context` for values a Value can't hold.
+    """
+    if isinstance(val, bool):
+        return val
+    elif isinstance(val, int):
+        if not _INT64_MIN <= val <= _INT64_MAX:
+            raise ValueError(f"Value out of range: {val}")
+        return int(val)
+    elif isinstance(val, float):
+        return float(val)
+    else:
+        str_val = str(val)
+        if not str_val.isascii():
+            # Values only hold valid UTF-8
+            str_val.encode("utf-8")
+        return str_val
 
-def get_context_keys(context: Optional[ClientContext] = None) -> List[ContextKey]:
+
+_INT64_MIN = -(2**63)
+_INT64_MAX = 2**63 - 1
+
+
+def normalize_context(context: dict[str, Any]) -> NativeContext:
+    return {k: normalize_value(v) for k, v in context.items()}
+
+
+_NATIVE_VALUE_KINDS = {bool: "bool_value", int: "int_value", float: "double_value", str: "string_value"}
+
+
+def get_value_kind(val: Value | NativeValue) -> Optional[str]:
+    """Returns the kind of Value that holds a context value"""
+    if isinstance(val, Value):
+        return val.WhichOneof("kind")
+    return _NATIVE_VALUE_KINDS.get(type(val))
+
+
+def get_value_type(val: Value | NativeValue) -> str:
+    return (get_value_kind(val) or "").removesuffix("_value")
+
+
+def get_context_keys(context: Optional[ClientContext | NativeContext] = None) -> List[ContextKey]:
     if not context:
         return []
 
     return [ContextKey(key=k, type=get_value_type(v)) for k, v in context.items()]
 
 
+def json_value_to_python(value: JSONValue) -> Any:
+    """Converts a JSON config value to the object `json.loads(MessageToJson(value))` returns, without the roundtrip"""
+    kind = value.WhichOneof("kind")
+    if kind == "struct_value":
+        return {k: json_value_to_python(v) for k, v in value.struct_value.fields.items()}
+    elif kind == "list_value":
+        return [json_value_to_python(v) for v in value.list_value.values]
+    elif kind == "number_value":
+        number = value.number_value
+        if math.isinf(number):
+            raise ValueError("Fail to serialize Infinity for Value.number_value, which would parse as string_value")
+        if math.isnan(number):
+            raise ValueError("Fail to serialize NaN for Value.number_value, which would parse as string_value")
+        return number
+    elif kind is None or kind == "null_value":
+        return None
+    return getattr(value, kind)
+
+
+def freeze_json(obj: Any) -> Any:
+    """Returns a read-only view of a decoded JSON value, with dicts as MappingProxyType and lists as tuples"""
+    if isinstance(obj, dict):
+        return MappingProxyType({k: freeze_json(v) for k, v in obj.items()})
+    elif isinstance(obj, list):
+        return tuple(freeze_json(v) for v in obj)
+    return obj
+
+
+def thaw_json(obj: Any) -> Any:
+    """Returns a mutable copy of a value returned by `freeze_json`"""
+    if isinstance(obj, MappingProxyType):
+        return {k: thaw_json(v) for k, v in obj.items()}
+    elif isinstance(obj, tuple):
+        return [thaw_json(v) for v in obj]
+    return obj
+
+
 class ApiKeyInterceptor(ClientInterceptor):
     """A test interceptor that injects invocation metadata."""
 
@@ -77,3 +159,23 @@ def get_grpc_channel(
         _CHANNELS[(url, api_key)] = channel
 
     return _CHANNELS[(url, api_key)]
+
+
+_MESSAGE_CLASSES: Dict[str, Type[ProtoMessage]] = {}
+
+
+def get_message_class(type_url: str) -> Optional[Type[ProtoMessage]]:
+    """Returns the message class of a type URL from the default descriptor pool, None if it isn't imported.
+
+    Classes are cached for the lifetime of the process. Missing types are looked up again on every call, since they
+    can be imported later.
+    """
+    message_class = _MESSAGE_CLASSES.get(type_url)
+    if message_class is None:
+        db = proto_symbol_database.SymbolDatabase(pool=proto_descriptor_pool.Default())  # type: ignore
+        try:
+            message_class = db.GetSymbol(type_url.split("/")[1])
+        except (KeyError, IndexError):
+            return None
+        _MESSAGE_CLASSES[type_url] = message_class
+    return message_class
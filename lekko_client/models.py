@@ -1,13 +1,30 @@
 from dataclasses import dataclass
-from typing import Dict, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
+
+from google.protobuf.message import Message as ProtoMessage
 
 from lekko_client.gen.lekko.client.v1beta1.configuration_service_pb2 import Value
 from lekko_client.gen.lekko.feature.v1beta1.feature_pb2 import Feature
 
+if TYPE_CHECKING:  # pragma: no cover
+    from lekko_client.evaluation.plan import EvaluationPlan
+
 ClientContext = Optional[Dict[str, Value]]
 
+# Context values as Python values, with the types `helpers.normalize_value` produces
+NativeValue = Union[bool, int, float, str]
+NativeContext = Optional[Dict[str, NativeValue]]
+
+# A decoded config value: the Python value of bool, int, float and string configs, the JSON value of JSON configs
+# and the message of proto configs
+ConfigValue = Union[None, bool, int, float, str, List[Any], Dict[str, Any], ProtoMessage]
+
 
 @dataclass
 class ConfigData:
     config_sha: str
     config: Feature
+    # Set by stores that compile configs at load time, otherwise the config is interpreted on every evaluation
+    plan: Optional["EvaluationPlan"] = None
+    # Plan specialized for the store's base context, only valid for contexts holding all of its values
+    base_plan: Optional["EvaluationPlan"] = None
@@ -1,34 +1,71 @@
-from typing import Dict
+from typing import Dict, Mapping, Optional
 
+from lekko_client.evaluation.compiler import RuleTable
+from lekko_client.evaluation.plan import build_plan
 from lekko_client.exceptions import ConfigNotFoundError, NamespaceNotFound
 from lekko_client.gen.lekko.backend.v1beta1.distribution_service_pb2 import (
     GetRepositoryContentsResponse,
 )
-from lekko_client.models import ConfigData
-from lekko_client.stores.store import Store
+from lekko_client.models import ConfigData, NativeValue
+from lekko_client.stores.store import Store, is_unchanged
 
 
 class MemoryStore(Store):
     def __init__(self) -> None:
         super().__init__()
         self.configs: Dict[str, Dict[str, ConfigData]] = {}
+        self._compiled_base_context: Optional[Dict[str, NativeValue]] = None
 
     def get(self, namespace: str, config_key: str) -> ConfigData:
-        namespace_map = self.configs.get(namespace)
-        if not namespace_map:
-            raise NamespaceNotFound(f"Namespace {namespace} not found")
-        result = namespace_map.get(config_key)
-        if not result:
-            raise ConfigNotFoundError(f"Config {config_key} not found in namespace {namespace}")
-        return result
+        return get_config(self.configs, namespace, config_key)
+
+    def get_namespace(self, namespace: str) -> Mapping[str, ConfigData]:
+        return get_namespace_configs(self.configs, namespace)
+
+    def get_all(self) -> Mapping[str, Mapping[str, ConfigData]]:
+        return self.configs
 
     def load_impl(self, contents: GetRepositoryContentsResponse) -> bool:
         new_configs = {}
+        # Identical rules across configs are compiled once
+        table = RuleTable()
+        # Configs whose sha didn't change are reused along with their plans, unless the plans were specialized for
+        # another base context
+        reusable = self.configs if self._compiled_base_context is self.base_context else {}
         for ns in contents.namespaces:
             namespace_map = {}
+            loaded = reusable.get(ns.name, {})
             for cfg in ns.features:
                 if cfg.feature:
-                    namespace_map[cfg.name] = ConfigData(cfg.sha, cfg.feature)
+                    config_data = loaded.get(cfg.name)
+                    if config_data is not None and is_unchanged(config_data, cfg):
+                        namespace_map[cfg.name] = config_data
+                        continue
+                    plan = build_plan(cfg.feature, ns.name, table)
+                    # Only specialized for a base context it reads, otherwise the generic plan is just as good
+                    base_plan = None
+                    if not self.base_context.keys().isdisjoint(plan.context_keys):
+                        base_plan = build_plan(cfg.feature, ns.name, table, self.base_context)
+                    namespace_map[cfg.name] = ConfigData(cfg.sha, cfg.feature, plan, base_plan)
             new_configs[ns.name] = namespace_map
+        # Replaced rather than updated, so that the configs returned by `get_all` are a consistent snapshot
         self.configs = new_configs
+        self._compiled_base_context = self.base_context
         return True
+
+
+def get_config(configs: Mapping[str, Mapping[str, ConfigData]], namespace: str, config_key: str) -> ConfigData:
+    namespace_map = configs.get(namespace)
+    if not namespace_map:
+        raise NamespaceNotFound(f"Namespace {namespace} not found")
+    result = namespace_map.get(config_key)
+    if not result:
+        raise ConfigNotFoundError(f"Config {config_key} not found in namespace {namespace}")
+    return result
+
+
+def get_namespace_configs(configs: Mapping[str, Mapping[str, ConfigData]], namespace: str) -> Mapping[str, ConfigData]:
+    namespace_map = configs.get(namespace)
+    if namespace_map is None:
+        raise NamespaceNotFound(f"Namespace {namespace} not found")
+    return namespace_map
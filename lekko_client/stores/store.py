@@ -1,37 +1,89 @@
 from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
 from hashlib import sha256
+from typing import Dict, List, Mapping, Optional, Set, Tuple
 
+from lekko_client.gen.lekko.backend.v1beta1.distribution_service_pb2 import (
+    Feature as DistFeature,
+)
 from lekko_client.gen.lekko.backend.v1beta1.distribution_service_pb2 import (
     GetRepositoryContentsResponse,
 )
-from lekko_client.models import ConfigData
+from lekko_client.models import ConfigData, NativeValue
+
+
+@dataclass
+class ChangeSet:
+    """The configs a load added, changed and removed, as (namespace, config key) pairs"""
+
+    added: List[Tuple[str, str]] = field(default_factory=list)
+    changed: List[Tuple[str, str]] = field(default_factory=list)
+    removed: List[Tuple[str, str]] = field(default_factory=list)
 
 
 class Store(ABC):
     def __init__(self) -> None:
         self._commit_sha = ""
         self._content_hash = ""
+        self._version = 0
+        self._base_context: Dict[str, NativeValue] = {}
 
     @abstractmethod
     def get(self, namespace: str, config_key: str) -> ConfigData:
         ...
 
-    def load(self, contents: GetRepositoryContentsResponse) -> bool:
-        if not contents:
-            return False
+    @abstractmethod
+    def get_namespace(self, namespace: str) -> Mapping[str, ConfigData]:
+        ...
 
-        contents = self.sort_contents(contents)
+    @abstractmethod
+    def get_all(self) -> Mapping[str, Mapping[str, ConfigData]]:
+        ...
+
+    def load(self, contents: Optional[GetRepositoryContentsResponse]) -> Optional[ChangeSet]:
+        """Loads new repository contents, returning the configs that changed, or None if nothing was loaded.
+
+        A load of a new commit that doesn't change any config returns an empty ChangeSet.
+        """
+        if contents is None:
+            return None
+
+        # Hashed independently of the order of the contents, which are only sorted when they get loaded
         content_hash = self.hash_contents(contents)
 
         if not self.should_update(contents, content_hash):
-            return False
+            return None
 
+        contents = self.sort_contents(contents)
+        changes = self.diff_contents(contents)
         if not self.load_impl(contents):
-            return False
+            return None
 
         self._commit_sha = contents.commit_sha
         self._content_hash = content_hash
-        return True
+        self._version += 1
+        return changes
+
+    def diff_contents(self, contents: GetRepositoryContentsResponse) -> ChangeSet:
+        """Compares the configs of new contents with the loaded ones, using the configs' shas"""
+        changes = ChangeSet()
+        loaded = self.get_all()
+        incoming: Set[Tuple[str, str]] = set()
+        for ns in contents.namespaces:
+            configs = loaded.get(ns.name, {})
+            for cfg in ns.features:
+                if cfg.feature:
+                    incoming.add((ns.name, cfg.name))
+                    config_data = configs.get(cfg.name)
+                    if config_data is None:
+                        changes.added.append((ns.name, cfg.name))
+                    elif not is_unchanged(config_data, cfg):
+                        changes.changed.append((ns.name, cfg.name))
+        for namespace, configs in loaded.items():
+            for key in configs:
+                if (namespace, key) not in incoming:
+                    changes.removed.append((namespace, key))
+        return changes
 
     @abstractmethod
     def load_impl(self, contents: GetRepositoryContentsResponse) -> bool:
@@ -45,6 +97,20 @@ class Store(ABC):
     def content_hash(self) -> str:
         return self._content_hash
 
+    @property
+    def version(self) -> int:
+        """Incremented by every load that changes the configs"""
+        return self._version
+
+    @property
+    def base_context(self) -> Dict[str, NativeValue]:
+        """Context values shared by every evaluation, which stores can specialize configs for at load time"""
+        return self._base_context
+
+    @base_context.setter
+    def base_context(self, context: Dict[str, NativeValue]) -> None:
+        self._base_context = context
+
     def should_update(self, contents: GetRepositoryContentsResponse, content_hash: str) -> bool:
         ret = contents.commit_sha != self.commit_sha or content_hash != self.content_hash
         return ret
@@ -58,4 +124,28 @@ class Store(ABC):
 
     @classmethod
     def hash_contents(cls, contents: GetRepositoryContentsResponse) -> str:
-        return sha256(contents.SerializeToString()).hexdigest()
+        """Returns a Merkle-style hash of the contents' configs.
+
+        Each namespace is hashed from the names and shas of its configs, and the contents from the names and hashes
+        of the namespaces, in name order. Only configs without a sha are serialized to be hashed.
+        """
+        namespace_hashes = []
+        for ns in contents.namespaces:
+            leaves = sorted(f"{cfg.name}\0{cfg.sha or cls._hash_feature(cfg)}" for cfg in ns.features)
+            namespace_hashes.append(f"{ns.name}\0{sha256(_join_hashes(leaves)).hexdigest()}")
+        namespace_hashes.sort()
+        return sha256(_join_hashes(namespace_hashes)).hexdigest()
+
+    @classmethod
+    def _hash_feature(cls, cfg: DistFeature) -> str:
+        return sha256(cfg.feature.SerializeToString(deterministic=True)).hexdigest()
+
+
+def is_unchanged(config_data: ConfigData, cfg: DistFeature) -> bool:
+    """Returns whether a loaded config is the same as a config of new contents. Configs without a sha are always
+    considered changed"""
+    return bool(cfg.sha) and config_data.config_sha == cfg.sha
+
+
+def _join_hashes(hashes: List[str]) -> bytes:
+    return "\n".join(hashes).encode()
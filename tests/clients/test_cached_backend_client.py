@@ -1,9 +1,19 @@
+import time
+from contextlib import contextmanager
 from unittest import mock
 
+import pytest
+from google.protobuf.wrappers_pb2 import Int64Value
+
 import lekko_client
+from lekko_client.exceptions import ClientNotInitialized
+from lekko_client.gen.lekko.backend.v1beta1.distribution_service_pb2 import (
+    Feature as DistFeature,
+)
 from lekko_client.gen.lekko.backend.v1beta1.distribution_service_pb2 import (
     GetRepositoryContentsResponse,
     GetRepositoryVersionResponse,
+    Namespace,
 )
 
 
@@ -46,3 +56,73 @@ def test_should_update_store():
             update_interval_ms=0,
         )
         assert client.should_update_store() is False
+
+
+@contextmanager
+def slow_loading_client(feature):
+    """A client whose first load completes after 0.5s"""
+
+    def get_contents(request):
+        time.sleep(0.5)
+        return GetRepositoryContentsResponse(
+            commit_sha="test_commit_sha1",
+            namespaces=[Namespace(name="ns", features=[DistFeature(name="config", sha="sha", feature=feature)])],
+        )
+
+    with mock.patch("lekko_client.clients.distribution_client.DistributionServiceStub") as stub:
+        stub().RegisterClient.return_value = mock.Mock(session_key="test_session_key")
+        stub().GetRepositoryVersion.return_value = GetRepositoryVersionResponse(commit_sha="test_commit_sha1")
+        stub().GetRepositoryContents.side_effect = get_contents
+        client = lekko_client.CachedBackendClient(
+            uri="test_uri",
+            store=lekko_client.MemoryStore(),
+            owner_name="test_owner",
+            repo_name="test_repo",
+            api_key="test_api_key",
+            update_interval_ms=10,
+        )
+        try:
+            yield client
+        finally:
+            client.close()
+
+
+def test_reads_wait_for_first_load(test_feature_no_constraints):
+    with slow_loading_client(test_feature_no_constraints) as client:
+        assert not client.initialized_event.is_set()
+        assert client.get_int("ns", "config", {}) == 1
+    with slow_loading_client(test_feature_no_constraints) as client:
+        assert client.get_proto_by_type("ns", "config", {}, Int64Value) == Int64Value(value=1)
+    with slow_loading_client(test_feature_no_constraints) as client:
+        assert client.get_proto("ns", "config", {}) == Int64Value(value=1)
+
+
+def test_reads_before_first_load_time_out(test_feature_no_constraints):
+    with slow_loading_client(test_feature_no_constraints) as client, mock.patch.object(
+        client.initialized_event, "wait", return_value=False
+    ):
+        with pytest.raises(ClientNotInitialized):
+            client.get_bool("ns", "config", {})
+
+
+def test_evaluations_wait_for_first_load(test_feature_no_constraints):
+    with slow_loading_client(test_feature_no_constraints) as client:
+        assert client.evaluate_namespace("ns", {}) == {"config": 1}
+    with slow_loading_client(test_feature_no_constraints) as client:
+        assert client.evaluate_all({}) == {"ns": {"config": 1}}
+
+
+def test_handles_wait_for_first_load(test_feature_no_constraints):
+    with slow_loading_client(test_feature_no_constraints) as client:
+        handle = client.bind("ns", "config", int)
+        assert handle({}) == 1
+
+
+def test_get_many_waits_for_first_load(test_feature_no_constraints):
+    with slow_loading_client(test_feature_no_constraints) as client:
+        assert client.get_many([("ns", "config", int), ("ns", "config", Int64Value)], {}) == [1, Int64Value(value=1)]
+
+
+def test_evaluate_batch_waits_for_first_load(test_feature_no_constraints):
+    with slow_loading_client(test_feature_no_constraints) as client:
+        assert client.evaluate_batch("ns", "config", {"age": [1, 2]}).paths == [[], []]
@@ -0,0 +1,85 @@
+from unittest import mock
+
+import pytest
+from google.protobuf import wrappers_pb2
+
+from lekko_client.clients import Client
+from lekko_client.exceptions import LekkoError
+
+
+class StaticClient(Client):
+    def __init__(self):
+        super().__init__("owner", "repo")
+        self.reads = mock.Mock()
+
+    def get_bool(self, namespace, key, context):
+        self.reads(namespace, key, context)
+        return True
+
+    def get_int(self, namespace, key, context):
+        self.reads(namespace, key, context)
+        return 1
+
+    def get_float(self, namespace, key, context):
+        self.reads(namespace, key, context)
+        return 0.5
+
+    def get_string(self, namespace, key, context):
+        self.reads(namespace, key, context)
+        return "a"
+
+    def get_json(self, namespace, key, context, read_only=False):
+        raise NotImplementedError
+
+    def get_proto(self, namespace, key, context):
+        raise NotImplementedError
+
+    def get_proto_by_type(self, namespace, key, context, proto_message_type):
+        self.reads(namespace, key, context, proto_message_type)
+        return proto_message_type(value=2)
+
+    def close(self):
+        pass
+
+
+def test_bind():
+    client = StaticClient()
+    handle = client.bind("ns", "config", int)
+    assert handle({"a": 1}) == 1
+    assert handle() == 1
+    assert client.reads.call_args_list == [mock.call("ns", "config", {"a": 1}), mock.call("ns", "config", {})]
+
+    assert client.bind("ns", "config", wrappers_pb2.Int64Value)() == wrappers_pb2.Int64Value(value=2)
+    client.reads.assert_called_with("ns", "config", {}, wrappers_pb2.Int64Value)
+
+    with pytest.raises(LekkoError):
+        client.bind("ns", "config", dict)
+
+
+def test_get_many():
+    client = StaticClient()
+    context = {"a": 1}
+    values = client.get_many(
+        [
+            ("ns", "b", bool),
+            ("ns", "i", int),
+            ("ns", "f", float),
+            ("ns", "s", str),
+            ("ns", "p", wrappers_pb2.Int64Value),
+        ],
+        context,
+    )
+    assert values == [True, 1, 0.5, "a", wrappers_pb2.Int64Value(value=2)]
+    assert client.reads.call_args_list == [
+        mock.call("ns", "b", context),
+        mock.call("ns", "i", context),
+        mock.call("ns", "f", context),
+        mock.call("ns", "s", context),
+        mock.call("ns", "p", context, wrappers_pb2.Int64Value),
+    ]
+
+    # Types are checked before reading anything
+    client.reads.reset_mock()
+    with pytest.raises(LekkoError):
+        client.get_many([("ns", "i", int), ("ns", "j", list)], context)
+    client.reads.assert_not_called()
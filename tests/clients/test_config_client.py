@@ -8,9 +8,11 @@ from google.protobuf import wrappers_pb2
 from google.protobuf.any_pb2 import Any
 
 from lekko_client.clients import APIClient, SidecarClient
+from lekko_client.context import Context
 from lekko_client.exceptions import (
     AuthenticationError,
     ConfigNotFoundError,
+    LekkoError,
     MismatchedProtoType,
     MismatchedType,
 )
@@ -58,6 +60,97 @@ def test_get_scalar(test_server, proto_fn_name, response_obj, response_val, test
     assert ("apikey", api_key) in completed_requests[1].metadata
 
 
+def test_get_with_context_object(test_server):
+    requests = [
+        test_server.MockRequestResponse("Register", messages.RegisterResponse),
+        test_server.MockRequestResponse("GetIntValue", messages.GetIntValueResponse(value=10)),
+        test_server.MockRequestResponse("GetIntValue", messages.GetIntValueResponse(value=10)),
+    ]
+    async_requests = test_server.mock_async_responses(requests)
+
+    client = SidecarClient("owner", "repo", "lekko_apikey123", context={"env": "prod", "ctx_key": 1})
+    context = Context({"ctx_key": 10, "user": "a"})
+    assert client.get_int("namespace", "val", context) == 10
+    assert client.get_int("namespace", "val", context) == 10
+
+    completed_requests = async_requests.result()
+    for request in completed_requests[1:]:
+        req_ctx = {k: getattr(v, v.WhichOneof("kind")) for k, v in request.arg.context.items()}
+        assert req_ctx == {"env": "prod", "ctx_key": 10, "user": "a"}
+
+
+def test_bind(test_server):
+    any_proto = Any()
+    any_proto.Pack(wrappers_pb2.Int32Value(value=10))
+    requests = [
+        test_server.MockRequestResponse("Register", messages.RegisterResponse),
+        test_server.MockRequestResponse("GetIntValue", messages.GetIntValueResponse(value=10)),
+        test_server.MockRequestResponse("GetProtoValue", messages.GetProtoValueResponse(value=any_proto)),
+    ]
+    async_requests = test_server.mock_async_responses(requests)
+
+    client = SidecarClient("owner", "repo", "lekko_apikey123")
+    handle = client.bind("namespace", "val", int)
+    assert repr(handle) == "ConfigHandle('namespace', 'val', int)"
+    assert handle({"user": "a"}) == 10
+    assert client.bind("namespace", "proto", wrappers_pb2.Int32Value)() == wrappers_pb2.Int32Value(value=10)
+
+    completed_requests = async_requests.result()
+    assert completed_requests[1].arg.key == "val"
+    assert completed_requests[1].arg.context["user"].string_value == "a"
+    assert completed_requests[2].arg.key == "proto"
+
+
+def test_get_many(test_server):
+    any_proto = Any()
+    any_proto.Pack(wrappers_pb2.Int32Value(value=10))
+    requests = [
+        test_server.MockRequestResponse("Register", messages.RegisterResponse),
+        test_server.MockRequestResponse("GetIntValue", messages.GetIntValueResponse(value=10)),
+        test_server.MockRequestResponse("GetBoolValue", messages.GetBoolValueResponse(value=True)),
+        test_server.MockRequestResponse("GetProtoValue", messages.GetProtoValueResponse(value=any_proto)),
+        test_server.MockRequestResponse("GetStringValue", messages.GetStringValueResponse(value="a")),
+    ]
+    async_requests = test_server.mock_async_responses(requests)
+
+    client = SidecarClient("owner", "repo", "lekko_apikey123", context={"env": "prod"})
+    with mock.patch.object(client, "_convert_context", wraps=client._convert_context) as convert_context:
+        values = client.get_many(
+            [
+                ("namespace", "int", int),
+                ("namespace", "bool", bool),
+                ("namespace", "proto", wrappers_pb2.Int32Value),
+                ("namespace", "string", str),
+            ],
+            {"user": "a"},
+        )
+    assert values == [10, True, wrappers_pb2.Int32Value(value=10), "a"]
+    convert_context.assert_called_once()
+
+    completed_requests = async_requests.result()
+    assert [request.arg.key for request in completed_requests[1:]] == ["int", "bool", "proto", "string"]
+    for request in completed_requests[1:]:
+        assert request.arg.context["user"].string_value == "a"
+        assert request.arg.context["env"].string_value == "prod"
+
+
+def test_get_many_errors(test_server_no_interceptor):
+    requests = [
+        test_server_no_interceptor.MockRequestResponse("Register", messages.RegisterResponse),
+        test_server_no_interceptor.MockRequestResponse("GetIntValue", messages.GetIntValueResponse(value=10)),
+        test_server_no_interceptor.MockRequestResponse(
+            "GetBoolValue", None, grpc.StatusCode.NOT_FOUND, "get evaluable feature: first feature: record not found"
+        ),
+    ]
+    test_server_no_interceptor.mock_async_responses(requests)
+
+    client = SidecarClient("owner", "repo", "lekko_apikey123")
+    with pytest.raises(ConfigNotFoundError):
+        client.get_many([("namespace", "int", int), ("namespace", "bool", bool)], {})
+    with pytest.raises(LekkoError):
+        client.get_many([("namespace", "json", dict)], {})
+
+
 def test_get_json(test_server):
     expected = {"key": "value", "int_key": 1}
     requests = [
@@ -117,7 +210,10 @@ def test_get_proto(test_server):
     assert resp == int_proto
 
     # If the proto symbol can't be found, we fall through to returning the Any proto
-    with mock.patch("google.protobuf.symbol_database.SymbolDatabase.GetSymbol", side_effect=KeyError):
+    with (
+        mock.patch("google.protobuf.symbol_database.SymbolDatabase.GetSymbol", side_effect=KeyError),
+        mock.patch.dict("lekko_client.helpers._MESSAGE_CLASSES", clear=True),
+    ):
         resp = client.get_proto("val", "namespace", {})
         assert resp == any_proto
 
@@ -207,8 +303,11 @@ def test_proto_errors(test_server_no_interceptor):
     with pytest.raises(MismatchedType):
         client.get_proto("key", "namespace", {})
 
-    with pytest.raises(grpc.RpcError):
+    # Other errors are re-raised as they are, without going through the client's frames again
+    with pytest.raises(grpc.RpcError) as excinfo:
         client.get_proto("key", "namespace", {})
+    assert [entry.name for entry in excinfo.traceback].count("_get_proto") == 1
+    assert excinfo.value.__cause__ is None
 
 
 def test_get_api_client(test_server):
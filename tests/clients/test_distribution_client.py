@@ -1,21 +1,45 @@
+import json
+from types import MappingProxyType
 from unittest import mock
 
 import pytest
 from google.protobuf import wrappers_pb2
 from google.protobuf.any_pb2 import Any as ProtoAny
+from google.protobuf.json_format import MessageToJson
 from google.protobuf.message import Message as ProtoMessage
-from google.protobuf.struct_pb2 import Struct
+from google.protobuf.struct_pb2 import Struct, Value
 
+import lekko_client
 from lekko_client.clients.config_client import AnyProto
 from lekko_client.clients.distribution_client import CachedDistributionClient
+from lekko_client.context import Context
 from lekko_client.evaluation.evaluation import EvaluationResult
+from lekko_client.evaluation.plan import EvaluationPlan
+from lekko_client.exceptions import (
+    ConfigNotFoundError,
+    LekkoError,
+    MismatchedProtoType,
+    MismatchedType,
+)
+from lekko_client.gen.lekko.backend.v1beta1.distribution_service_pb2 import (
+    Feature as DistFeature,
+)
 from lekko_client.gen.lekko.backend.v1beta1.distribution_service_pb2 import (
     FlagEvaluationEvent,
+    GetRepositoryContentsResponse,
+    Namespace,
     RepositoryKey,
 )
-from lekko_client.gen.lekko.feature.v1beta1.feature_pb2 import Feature
-from lekko_client.helpers import convert_context, get_context_keys
+from lekko_client.gen.lekko.feature.v1beta1.feature_pb2 import Constraint, Feature
+from lekko_client.gen.lekko.rules.v1beta3.rules_pb2 import CallExpression, Rule
+from lekko_client.helpers import (
+    convert_context,
+    get_context_keys,
+    json_value_to_python,
+)
 from lekko_client.models import ConfigData
+from lekko_client.stores.memory import MemoryStore
+from lekko_client.stores.store import ChangeSet
 
 
 @pytest.mark.parametrize(
@@ -87,6 +111,33 @@ def test_get_json(mock_distribution_client, test_feature_no_constraints, expecte
         assert expected == mock_distribution_client.get_json("namespace", "key", {})
 
 
+@pytest.mark.parametrize(
+    "value",
+    [
+        None,
+        {"nested": {"list": [1, 2.5, -0.0, 1e300, None, True, "ünï"], "empty": {}}, "": []},
+        [[], [{}], 2**60],
+        "",
+        0,
+    ],
+)
+def test_json_value_to_python(value):
+    s = Struct()
+    s.update({"key": value})
+    assert json_value_to_python(s.fields["key"]) == json.loads(MessageToJson(s.fields["key"]))
+    assert json_value_to_python(Value()) is None
+
+
+@pytest.mark.parametrize("number", [float("inf"), float("-inf"), float("nan")])
+def test_json_value_to_python_errors(number):
+    value = Value(list_value={"values": [{"number_value": number}]})
+    with pytest.raises(ValueError) as expected:
+        MessageToJson(value)
+    with pytest.raises(ValueError) as actual:
+        json_value_to_python(value)
+    assert str(actual.value) == str(expected.value)
+
+
 def test_get_proto_by_type(mock_distribution_client, test_feature_no_constraints):
     any_proto = AnyProto()
     int_proto = wrappers_pb2.Int32Value(value=10)
@@ -110,7 +161,10 @@ def test_get_proto(mock_distribution_client, test_feature_no_constraints):
     ):
         assert int_proto == mock_distribution_client.get_proto("namespace", "key", {})
 
-        with mock.patch("google.protobuf.symbol_database.SymbolDatabase.GetSymbol", side_effect=KeyError):
+        with (
+            mock.patch("google.protobuf.symbol_database.SymbolDatabase.GetSymbol", side_effect=KeyError),
+            mock.patch.dict("lekko_client.helpers._MESSAGE_CLASSES", clear=True),
+        ):
             assert any_proto == mock_distribution_client.get_proto("namespace", "key", {})
 
 
@@ -153,8 +207,424 @@ def test_accept_event_sentinel(mock_distribution_client):
     assert len(events_batcher.events) == 0
 
 
+def test_accept_events(mock_distribution_client):
+    events_batcher = CachedDistributionClient.EventsBatcher(mock_distribution_client, "", 0, 0)
+    events_batcher.add_events([FlagEvaluationEvent(), FlagEvaluationEvent()])
+    assert events_batcher.queue.qsize() == 1
+    events_batcher._accept_event()
+    assert len(events_batcher.events) == 2
+
+
 def test_stop_events_batcher(mock_distribution_client):
     events_batcher = CachedDistributionClient.EventsBatcher(mock_distribution_client, "", 0, 0)
     events_batcher.stop()
     # Check for termination sentinel value
     assert events_batcher.queue.get_nowait() is None
+
+
+def test_result_cache(mock_distribution_client_cls, test_feature_one_level_traversal):
+    store = MemoryStore()
+    client = mock_distribution_client_cls("uri", "owner", "repo", store, api_key="api_key", result_cache_size=10)
+    contents = GetRepositoryContentsResponse(
+        commit_sha="commit_1",
+        namespaces=[
+            Namespace(
+                name="ns", features=[DistFeature(name="key", sha="sha", feature=test_feature_one_level_traversal)]
+            )
+        ],
+    )
+    with mock.patch.object(client, "load_contents", return_value=contents):
+        assert client.load()
+
+    assert client.get_int("ns", "key", {"age": 10, "user_id": 1}) == 2
+    assert client.get_int("ns", "key", {"age": 10, "user_id": 2}) == 2
+    assert client.get_int("ns", "key", {"age": 11}) == 1
+    assert client.result_cache.info().hits == 1
+    assert client.result_cache.info().misses == 2
+    # Every evaluation is still tracked
+    assert client.events_batcher.add_event.call_count == 3
+
+    contents.commit_sha = "commit_2"
+    with mock.patch.object(client, "load_contents", return_value=contents):
+        assert client.load()
+    assert client.result_cache.info().currsize == 0
+
+
+def test_result_cache_signed_zero(mock_distribution_client_cls):
+    client = mock_distribution_client_cls(
+        "uri", "owner", "repo", MemoryStore(), api_key="api_key", result_cache_size=10
+    )
+    feature = Feature(key="key")
+    feature.tree.default.Pack(wrappers_pb2.Int64Value(value=0))
+    constraint = Constraint(
+        rule_ast_new=Rule(
+            call_expression=CallExpression(bucket=CallExpression.Bucket(context_key="k", threshold=50000))
+        )
+    )
+    constraint.value.Pack(wrappers_pb2.Int64Value(value=1))
+    feature.tree.constraints.append(constraint)
+    _load_store(client, Namespace(name="ns", features=[DistFeature(name="key", sha="sha", feature=feature)]))
+
+    # Bucketing hashes the bytes of the value, which differ for 0.0 and -0.0
+    assert client.get_int("ns", "key", {"k": 0.0}) == 0
+    assert client.get_int("ns", "key", {"k": -0.0}) == 1
+    assert client.result_cache.info().hits == 0
+
+
+def test_base_context_signed_zero(mock_distribution_client_cls):
+    client = mock_distribution_client_cls("uri", "owner", "repo", MemoryStore(), api_key="api_key", context={"x": 0.0})
+    feature = Feature(key="key")
+    feature.tree.default.Pack(wrappers_pb2.BoolValue(value=False))
+    constraint = Constraint(
+        rule_ast_new=Rule(
+            call_expression=CallExpression(bucket=CallExpression.Bucket(context_key="x", threshold=90000))
+        )
+    )
+    constraint.value.Pack(wrappers_pb2.BoolValue(value=True))
+    feature.tree.constraints.append(constraint)
+    _load_store(client, Namespace(name="ns", features=[DistFeature(name="key", sha="sha", feature=feature)]))
+
+    # The plan specialized for 0.0 doesn't hold for -0.0, which is in another bucket
+    assert client.store.get("ns", "key").base_plan is not None
+    assert client.get_bool("ns", "key", {}) is True
+    assert client.get_bool("ns", "key", {"x": -0.0}) is False
+
+
+def test_base_context_plans(mock_distribution_client_cls, test_feature_two_level_traversal):
+    store = MemoryStore()
+    client = mock_distribution_client_cls(
+        "uri", "owner", "repo", store, api_key="api_key", context={"age": 10}, result_cache_size=10
+    )
+    _load_store(
+        client,
+        Namespace(name="ns", features=[DistFeature(name="key", sha="sha", feature=test_feature_two_level_traversal)]),
+    )
+    assert store.base_context == {"age": 10}
+    config_data = store.get("ns", "key")
+    assert config_data.base_plan.context_keys == ("city",)
+
+    def result_path():
+        return list(client.events_batcher.add_event.call_args.args[0].result_path)
+
+    with mock.patch.object(config_data.plan, "evaluate", side_effect=AssertionError):
+        assert client.get_int("ns", "key", {"city": "Paris"}) == 2
+        assert result_path() == [0, 1]
+        assert client.evaluate_namespace("ns", {"city": "Rome"}) == {"key": 2}
+    # Contexts overriding the base values use the generic plan
+    for context in [{"age": 12, "city": "Rome"}, {"age": 10.0, "city": "Rome"}]:
+        with mock.patch.object(config_data.base_plan, "evaluate", side_effect=AssertionError):
+            client.get_int("ns", "key", context)
+    assert result_path() == [0, 0]
+    assert client.result_cache.info().currsize == 4
+
+
+def test_context_object(mock_distribution_client_cls, test_feature_two_level_traversal):
+    client = mock_distribution_client_cls("uri", "owner", "repo", MemoryStore(), api_key="api_key", context={"age": 12})
+    _load_store(
+        client,
+        Namespace(name="ns", features=[DistFeature(name="key", sha="sha", feature=test_feature_two_level_traversal)]),
+    )
+
+    context = Context({"city": "Paris"})
+    with mock.patch("lekko_client.clients.distribution_client.normalize_context") as normalize_context:
+        assert client.get_int("ns", "key", context) == 2
+        assert client.evaluate_namespace("ns", context) == {"key": 2}
+    normalize_context.assert_not_called()
+
+    event = client.events_batcher.add_event.call_args.args[0]
+    assert list(event.result_path) == [1, 1]
+    assert list(event.context_keys) == get_context_keys(convert_context({"age": 12, "city": "Paris"}))
+    # Per-call values override the client's
+    client.get_int("ns", "key", Context({"age": 10, "city": "Rome"}))
+    assert list(client.events_batcher.add_event.call_args.args[0].result_path) == [0, 0]
+
+
+def test_context_scope(mock_distribution_client_cls, test_feature_one_level_traversal, test_feature_no_constraints):
+    client = mock_distribution_client_cls(
+        "uri", "owner", "repo", MemoryStore(), api_key="api_key", result_cache_size=10
+    )
+    namespace = Namespace(
+        name="ns",
+        features=[
+            DistFeature(name="a", sha="sha_a", feature=test_feature_one_level_traversal),
+            DistFeature(name="b", sha="sha_b", feature=test_feature_one_level_traversal),
+        ],
+    )
+    _load_store(client, namespace)
+    lekko_client.set_client(client)
+    try:
+        with lekko_client.context_scope(age=10):
+            assert lekko_client.get_int("ns", "a") == 2
+            assert lekko_client.get_int("ns", "a") == 2
+            # Repeated reads are neither evaluated nor tracked again
+            assert client.events_batcher.add_event.call_count == 1
+
+            # Reads keep using the snapshot the scope started with
+            for feature in namespace.features:
+                feature.feature.CopyFrom(test_feature_no_constraints)
+                feature.sha += "_2"
+            contents = GetRepositoryContentsResponse(commit_sha="commit_2", namespaces=[namespace])
+            with mock.patch.object(client, "load_contents", return_value=contents):
+                assert client.load()
+            assert lekko_client.get_int("ns", "a") == 2
+            assert lekko_client.get_int("ns", "b") == 2
+            assert lekko_client.evaluate_namespace("ns") == {"a": 2, "b": 2}
+            # Results of the old snapshot aren't cached for the new one
+            assert client.result_cache.info().currsize == 0
+
+            assert lekko_client.get_int("ns", "a", {"age": 10}) == 1
+        with lekko_client.context_scope(age=10):
+            assert lekko_client.get_int("ns", "a") == 1
+        assert lekko_client.get_int("ns", "a") == 1
+    finally:
+        with mock.patch.object(client, "close"):
+            lekko_client.close()
+
+
+def test_context_scope_shares_rule_memo(mock_distribution_client_cls, test_feature_one_level_traversal):
+    client = mock_distribution_client_cls("uri", "owner", "repo", MemoryStore(), api_key="api_key")
+    namespace = Namespace(
+        name="ns",
+        features=[
+            DistFeature(name="a", sha="sha_a", feature=test_feature_one_level_traversal),
+            DistFeature(name="b", sha="sha_b", feature=test_feature_one_level_traversal),
+        ],
+    )
+    _load_store(client, namespace)
+    plan = client.store.get("ns", "b").plan
+    memos = []
+
+    def evaluate(context, memo=None):
+        memos.append(dict(memo or {}))
+        return EvaluationPlan.evaluate(plan, context, memo)
+
+    lekko_client.set_client(client)
+    try:
+        with lekko_client.context_scope(age=10), mock.patch.object(plan, "evaluate", side_effect=evaluate):
+            assert lekko_client.get_int("ns", "a") == 2
+            assert lekko_client.get_int("ns", "b") == 2
+        # "b" is evaluated with the rule results memoized for "a"
+        assert len(memos) == 1 and memos[0]
+    finally:
+        with mock.patch.object(client, "close"):
+            lekko_client.close()
+
+
+def test_bind(mock_distribution_client_cls, test_feature_one_level_traversal, test_feature_no_constraints):
+    client = mock_distribution_client_cls("uri", "owner", "repo", MemoryStore(), api_key="api_key")
+    namespace = Namespace(
+        name="ns", features=[DistFeature(name="a", sha="sha_a", feature=test_feature_one_level_traversal)]
+    )
+    _load_store(client, namespace)
+    handle = client.bind("ns", "a", int)
+    missing = client.bind("ns", "b", int)
+    message = client.bind("ns", "a", wrappers_pb2.Int64Value)
+
+    with mock.patch.object(client.store, "get", wraps=client.store.get) as get:
+        assert handle({"age": 10}) == 2
+        assert handle() == 1
+        assert handle(Context({"age": 10})) == 2
+        assert message({"age": 10}) == wrappers_pb2.Int64Value(value=2)
+        for _ in range(2):
+            with pytest.raises(ConfigNotFoundError):
+                missing()
+        # Store entries are only looked up once per load
+        assert get.call_count == 3
+    assert client.events_batcher.add_event.call_count == 4
+
+    with pytest.raises(MismatchedType):
+        client.bind("ns", "a", bool)()
+    with pytest.raises(MismatchedProtoType):
+        client.bind("ns", "a", wrappers_pb2.BoolValue)()
+    with pytest.raises(LekkoError):
+        client.bind("ns", "a", dict)
+
+    # Handles follow reloads
+    namespace.features[0].feature.CopyFrom(test_feature_no_constraints)
+    namespace.features[0].sha = "sha_a2"
+    namespace.features.append(DistFeature(name="b", sha="sha_b", feature=test_feature_no_constraints))
+    contents = GetRepositoryContentsResponse(commit_sha="commit_2", namespaces=[namespace])
+    with mock.patch.object(client, "load_contents", return_value=contents):
+        assert client.load() == ChangeSet(added=[("ns", "b")], changed=[("ns", "a")])
+        # Nothing new to load
+        assert client.load() is None
+    assert handle({"age": 10}) == 1
+    assert missing() == 1
+
+
+def test_bind_in_context_scope(mock_distribution_client_cls, test_feature_one_level_traversal):
+    client = mock_distribution_client_cls("uri", "owner", "repo", MemoryStore(), api_key="api_key")
+    _load_store(
+        client,
+        Namespace(name="ns", features=[DistFeature(name="a", sha="sha_a", feature=test_feature_one_level_traversal)]),
+    )
+    handle = client.bind("ns", "a", int)
+    with lekko_client.context_scope(age=10) as context:
+        assert handle(context) == 2
+        assert client.get_int("ns", "a", context) == 2
+        # Reads through the scope's context are evaluated once
+        assert client.events_batcher.add_event.call_count == 1
+
+
+def test_get_many(mock_distribution_client_cls, test_feature_one_level_traversal, test_feature_no_constraints):
+    client = mock_distribution_client_cls(
+        "uri", "owner", "repo", MemoryStore(), api_key="api_key", context={"env": "a"}
+    )
+    _load_store(
+        client,
+        Namespace(
+            name="ns",
+            features=[
+                DistFeature(name="a", sha="sha_a", feature=test_feature_one_level_traversal),
+                DistFeature(name="b", sha="sha_b", feature=test_feature_no_constraints),
+            ],
+        ),
+    )
+    requests = [("ns", "a", int), ("ns", "b", int), ("ns", "a", wrappers_pb2.Int64Value)]
+
+    with mock.patch.object(client, "_merge_context", wraps=client._merge_context) as merge_context:
+        assert client.get_many(requests, {"age": 10}) == [2, 1, wrappers_pb2.Int64Value(value=2)]
+    merge_context.assert_called_once_with({"age": 10})
+    client.events_batcher.add_event.assert_not_called()
+    events = client.events_batcher.add_events.call_args.args[0]
+    assert [event.feature_sha for event in events] == ["sha_a", "sha_b", "sha_a"]
+    assert {key.key for key in events[0].context_keys} == {"age", "env"}
+
+    # Reads before an error are still tracked
+    client.events_batcher.add_events.reset_mock()
+    with pytest.raises(ConfigNotFoundError):
+        client.get_many([("ns", "a", int), ("ns", "c", int)], {})
+    assert len(client.events_batcher.add_events.call_args.args[0]) == 1
+    with pytest.raises(MismatchedType):
+        client.get_many([("ns", "a", bool)], {})
+    with pytest.raises(LekkoError):
+        client.get_many([("ns", "a", dict)], {})
+
+    with lekko_client.context_scope(age=10) as context:
+        assert client.get_many(requests, context) == [2, 1, wrappers_pb2.Int64Value(value=2)]
+        assert client.get_int("ns", "a", context) == 2
+
+
+def test_evaluate_batch(mock_distribution_client, test_feature_two_level_traversal):
+    mock_distribution_client.store.get.return_value = ConfigData("test_sha", test_feature_two_level_traversal)
+    mock_distribution_client.context = {"age": 12}
+
+    result = mock_distribution_client.evaluate_batch("namespace", "key", {"city": ["Rome", "Paris", "Milan"]})
+    assert result.paths == [[1, 0], [1, 1], [1]]
+    mock_distribution_client.events_batcher.add_event.assert_not_called()
+
+
+def _load_store(client, *namespaces: Namespace) -> None:
+    contents = GetRepositoryContentsResponse(commit_sha="commit_1", namespaces=namespaces)
+    with mock.patch.object(client, "load_contents", return_value=contents):
+        assert client.load()
+
+
+def test_evaluate_all(mock_distribution_client_cls, test_feature_one_level_traversal, test_feature_two_level_traversal):
+    client = mock_distribution_client_cls("uri", "owner", "repo", MemoryStore(), api_key="api_key")
+    json_value = Struct()
+    json_value.update({"value": {"a": [1, "b"]}})
+    json_config = Feature(key="json")
+    json_config.tree.default.Pack(json_value.fields["value"])
+    _load_store(
+        client,
+        Namespace(
+            name="ns_1",
+            features=[
+                DistFeature(name="one", sha="sha_1", feature=test_feature_one_level_traversal),
+                DistFeature(name="two", sha="sha_2", feature=test_feature_two_level_traversal),
+                DistFeature(name="json", sha="sha_3", feature=json_config),
+            ],
+        ),
+        Namespace(
+            name="ns_2", features=[DistFeature(name="one", sha="sha_1", feature=test_feature_one_level_traversal)]
+        ),
+    )
+
+    context = {"age": 12, "city": "Rome"}
+    ns_1 = {"json": {"a": [1.0, "b"]}, "one": 2, "two": 2}
+    assert client.evaluate_all(context) == {"ns_1": ns_1, "ns_2": {"one": 2}}
+    assert client.evaluate_namespace("ns_1", context) == ns_1
+    for namespace, values in {"ns_1": ns_1, "ns_2": {"one": 2}}.items():
+        for key, value in values.items():
+            assert client.decode(client.get(namespace, key, context)) == value
+
+    # One batch of events per call
+    assert client.events_batcher.add_event.call_count == 4
+    assert client.events_batcher.add_events.call_count == 2
+    (events,) = client.events_batcher.add_events.call_args_list[0].args
+    assert [(e.namespace_name, e.feature_name, list(e.result_path)) for e in events] == [
+        ("ns_1", "json", []),
+        ("ns_1", "key", [1]),
+        ("ns_1", "key", [1, 0]),
+        ("ns_2", "key", [1]),
+    ]
+    assert all(list(e.context_keys) == get_context_keys(convert_context(context)) for e in events)
+
+
+def test_decoded_values_cache(mock_distribution_client_cls, test_feature_one_level_traversal):
+    client = mock_distribution_client_cls("uri", "owner", "repo", MemoryStore(), api_key="api_key")
+    json_value = Struct()
+    json_value.update({"value": {"a": [1, "b"]}})
+    json_config = Feature(key="json")
+    json_config.tree.default.Pack(json_value.fields["value"])
+    _load_store(
+        client,
+        Namespace(
+            name="ns",
+            features=[
+                DistFeature(name="int", sha="sha_1", feature=test_feature_one_level_traversal),
+                DistFeature(name="json", sha="sha_2", feature=json_config),
+            ],
+        ),
+    )
+    plan = client.store.get("ns", "int").plan
+
+    assert client.get_int("ns", "int", {"age": 12}) == 2
+    assert plan.results[1].decoded == {int: 2}
+    with mock.patch.object(ProtoAny, "Unpack", side_effect=AssertionError):
+        assert client.get_int("ns", "int", {"age": 12}) == 2
+
+    with pytest.raises(MismatchedType):
+        client.get_string("ns", "int", {"age": 12})
+    with mock.patch.object(ProtoAny, "Unpack", side_effect=AssertionError):
+        with pytest.raises(MismatchedType):
+            client.get_string("ns", "int", {"age": 12})
+
+    # JSON values are decoded once, but every caller gets its own copy
+    first = client.get_json("ns", "json", {})
+    first["a"].append("c")
+    assert client.get_json("ns", "json", {}) == {"a": [1.0, "b"]}
+
+    # Read-only values are shared without copying
+    shared = client.get_json("ns", "json", {}, read_only=True)
+    assert shared == MappingProxyType({"a": (1.0, "b")})
+    assert client.get_json("ns", "json", {}, read_only=True) is shared
+    with pytest.raises(TypeError):
+        shared["a"] = 1  # type: ignore[index]
+
+
+def test_unpacked_messages_cache(mock_distribution_client_cls):
+    client = mock_distribution_client_cls("uri", "owner", "repo", MemoryStore(), api_key="api_key")
+    proto_config = Feature(key="proto")
+    proto_config.tree.default.Pack(wrappers_pb2.Int32Value(value=10))
+    _load_store(client, Namespace(name="ns", features=[DistFeature(name="proto", sha="sha", feature=proto_config)]))
+
+    # Messages are unpacked once, but every caller gets its own copy
+    first = client.get_proto("ns", "proto", {})
+    first.value = 11
+    with mock.patch.object(ProtoAny, "Unpack", side_effect=AssertionError):
+        assert client.get_proto("ns", "proto", {}) == wrappers_pb2.Int32Value(value=10)
+        assert client.get_proto_by_type("ns", "proto", {}, wrappers_pb2.Int32Value) == wrappers_pb2.Int32Value(value=10)
+
+    with pytest.raises(MismatchedProtoType):
+        client.get_proto_by_type("ns", "proto", {}, wrappers_pb2.Int64Value)
+    with mock.patch.object(ProtoAny, "Unpack", side_effect=AssertionError):
+        with pytest.raises(MismatchedProtoType):
+            client.get_proto_by_type("ns", "proto", {}, wrappers_pb2.Int64Value)
+
+    # Unknown types are returned as a copy of the Any
+    with mock.patch("lekko_client.clients.distribution_client.get_message_class", return_value=None):
+        unknown = client.get_proto("ns", "proto", {})
+    unknown.type_url = ""
+    assert client.get_proto("ns", "proto", {}) == wrappers_pb2.Int32Value(value=10)
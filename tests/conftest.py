@@ -76,6 +76,9 @@ class PatchedUnaryUnary(grpc_testing._channel._multi_callable.UnaryUnary):
     def with_call(self, request, timeout=None, metadata=None, credentials=None, wait_for_ready=None, compression=None):
         return super().with_call(request, timeout, metadata, credentials)
 
+    def future(self, request, timeout=None, metadata=None, credentials=None, wait_for_ready=None, compression=None):
+        return super().future(request, timeout, metadata, credentials)
+
 
 grpc_testing._channel._channel._multi_callable.UnaryUnary = PatchedUnaryUnary
 
@@ -324,7 +327,7 @@ def mock_event_batcher():
 
 
 @pytest.fixture
-def mock_distribution_client(mock_store, mock_event_batcher) -> CachedDistributionClient:
+def mock_distribution_client_cls(mock_event_batcher):
     class MockDistributionClient(CachedDistributionClient):
         EventsBatcher = mock_event_batcher
 
@@ -339,5 +342,10 @@ def mock_distribution_client(mock_store, mock_event_batcher) -> CachedDistributi
             self.session_key = "session key"
             return _client
 
-    client = MockDistributionClient("uri", "owner", "repo", mock_store, api_key="api_key")
+    return MockDistributionClient
+
+
+@pytest.fixture
+def mock_distribution_client(mock_store, mock_distribution_client_cls) -> CachedDistributionClient:
+    client = mock_distribution_client_cls("uri", "owner", "repo", mock_store, api_key="api_key")
     return client
@@ -0,0 +1,63 @@
+from lekko_client.evaluation.analysis import rule_context_keys, rule_required_keys
+from lekko_client.evaluation.plan import build_plan
+from lekko_client.gen.lekko.rules.v1beta3.rules_pb2 import (
+    Atom,
+    CallExpression,
+    ComparisonOperator,
+    LogicalExpression,
+    LogicalOperator,
+    Rule,
+)
+
+
+def test_rule_context_keys():
+    rule = Rule(
+        logical_expression=LogicalExpression(
+            logical_operator=LogicalOperator.LOGICAL_OPERATOR_AND,
+            rules=[
+                Rule(atom=Atom(context_key="env", comparison_operator=ComparisonOperator.COMPARISON_OPERATOR_PRESENT)),
+                Rule(
+                    **{
+                        "not": Rule(
+                            call_expression=CallExpression(
+                                bucket=CallExpression.Bucket(context_key="user_id", threshold=50000)
+                            )
+                        )
+                    }
+                ),
+                Rule(bool_const=True),
+            ],
+        )
+    )
+    assert rule_context_keys(rule) == {"env", "user_id"}
+    assert rule_context_keys(Rule()) == set()
+
+
+def _atom(key, operator=ComparisonOperator.COMPARISON_OPERATOR_EQUALS):
+    return Rule(atom=Atom(context_key=key, comparison_operator=operator))
+
+
+def _logical(operator, *rules):
+    return Rule(logical_expression=LogicalExpression(logical_operator=operator, rules=rules))
+
+
+def test_rule_required_keys():
+    present = ComparisonOperator.COMPARISON_OPERATOR_PRESENT
+    and_, or_ = LogicalOperator.LOGICAL_OPERATOR_AND, LogicalOperator.LOGICAL_OPERATOR_OR
+    bucket = Rule(call_expression=CallExpression(bucket=CallExpression.Bucket(context_key="user_id")))
+
+    assert rule_required_keys(_atom("a")) == {"a"}
+    assert rule_required_keys(bucket) == {"user_id"}
+    assert rule_required_keys(Rule(**{"not": _atom("a")})) == set()
+    assert rule_required_keys(Rule(bool_const=True)) == set()
+    # Children after one that can raise might never be evaluated
+    assert rule_required_keys(_logical(and_, _atom("a", present), _atom("b"), _atom("c"))) == {"a", "b"}
+    assert rule_required_keys(_logical(and_, Rule(bool_const=True), bucket, _atom("a"))) == {"user_id"}
+    assert rule_required_keys(_logical(or_, _logical(and_, _atom("a"), _atom("b")), _atom("a"))) == {"a"}
+    assert rule_required_keys(_logical(or_, _atom("a"), _atom("b"))) == set()
+    assert rule_required_keys(_logical(and_)) == set()
+
+
+def test_plan_context_keys(test_feature_two_level_traversal, test_feature_no_constraints):
+    assert build_plan(test_feature_two_level_traversal, "ns").context_keys == ("age", "city")
+    assert build_plan(test_feature_no_constraints, "ns").context_keys == ()
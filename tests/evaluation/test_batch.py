@@ -0,0 +1,191 @@
+import struct
+from typing import Any
+
+import numpy as np
+import pytest
+from google.protobuf.struct_pb2 import Struct, Value
+from xxhash import xxh32
+
+from lekko_client.evaluation.batch import bucket_mask, bucket_values, evaluate_batch
+from lekko_client.evaluation.plan import build_plan
+from lekko_client.evaluation.rules import evaluate_rule
+from lekko_client.exceptions import EvaluationError, LekkoError
+from lekko_client.gen.lekko.feature.v1beta1.feature_pb2 import Constraint, Feature, Tree
+from lekko_client.gen.lekko.rules.v1beta3.rules_pb2 import (
+    Atom,
+    CallExpression,
+    ComparisonOperator,
+    LogicalExpression,
+    LogicalOperator,
+    Rule,
+)
+from lekko_client.helpers import convert_context, normalize_context
+
+
+def convert_to_value(v: Any) -> Value:
+    s = Struct()
+    s.update({"key": v})
+    return s.fields["key"]
+
+
+def atom(op: ComparisonOperator.ValueType, value: Any = None) -> Rule:
+    if value is None:
+        return Rule(atom=Atom(context_key="key", comparison_operator=op))
+    return Rule(atom=Atom(context_key="key", comparison_operator=op, comparison_value=convert_to_value(value)))
+
+
+def single_rule_feature(rule: Rule, test_feature_default_value, test_feature_constraint_value) -> Feature:
+    return Feature(
+        key="feature_1",
+        tree=Tree(
+            default=test_feature_default_value,
+            constraints=[Constraint(rule_ast_new=rule, value=test_feature_constraint_value)],
+        ),
+    )
+
+
+RULES = [
+    Rule(bool_const=True),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_PRESENT),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_EQUALS, "Rome"),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_EQUALS, 12),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_EQUALS, True),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_NOT_EQUALS, 12),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_LESS_THAN, 12),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_GREATER_THAN_OR_EQUALS, 12.5),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_CONTAINED_WITHIN, ["Rome", "Paris"]),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_CONTAINED_WITHIN, [12, 13.5]),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_CONTAINED_WITHIN, ["Rome", 12]),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_STARTS_WITH, "Ro"),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_ENDS_WITH, "is"),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_CONTAINS, "om"),
+    Rule(call_expression=CallExpression(bucket=CallExpression.Bucket(context_key="key", threshold=50000))),
+    Rule(
+        logical_expression=LogicalExpression(
+            logical_operator=LogicalOperator.LOGICAL_OPERATOR_OR,
+            rules=[
+                atom(ComparisonOperator.COMPARISON_OPERATOR_EQUALS, "Rome"),
+                Rule(**{"not": atom(ComparisonOperator.COMPARISON_OPERATOR_ENDS_WITH, "s")}),
+            ],
+        )
+    ),
+]
+
+COLUMNS = [
+    ["Rome", "Paris", "London", "Roma"],
+    np.array(["Rome", "Paris", "London", "Roma"]),
+    [11, 12, 13, 4],
+    np.array([11, 12, 13, 2**40], dtype=np.int64),
+    [11.5, 12.0, 12.5, float("nan")],
+    np.array([True, False, True, False]),
+    ["Rome", None, "Paris", None],
+    [12, "Rome", 12.0, True],
+    [0, 2**63 - 1, 4, 7],
+    ["", "é" * 20, "a very long user identifier", "Rome"],
+]
+
+
+@pytest.mark.parametrize("rule", RULES)
+@pytest.mark.parametrize("column", COLUMNS)
+def test_batch_matches_scalar(rule, column, test_feature_default_value, test_feature_constraint_value):
+    feature = single_rule_feature(rule, test_feature_default_value, test_feature_constraint_value)
+    plan = build_plan(feature, "ns_1")
+    values = column.tolist() if isinstance(column, np.ndarray) else column
+
+    expected = []
+    try:
+        for value in values:
+            context = normalize_context({"key": value} if value is not None else {})
+            expected.append(plan.evaluate(context))
+    except EvaluationError:
+        with pytest.raises(EvaluationError):
+            evaluate_batch(plan, feature, "ns_1", {"key": column})
+        return
+
+    result = evaluate_batch(plan, feature, "ns_1", {"key": column})
+    assert result.values == [r.value for r in expected]
+    assert result.paths == [r.path for r in expected]
+
+
+@pytest.mark.parametrize(
+    "context",
+    [{"a": 1}, {"a": 1, "c": 3}, {"c": 3}, {"f": 5}, {"h": 4}, {"p": "a foo bar"}, {"t": "anything"}, {"u": 11}],
+)
+def test_batch_complex_feature(test_complex_rule_feature, context):
+    plan = build_plan(test_complex_rule_feature, "default")
+    expected = plan.evaluate(normalize_context(context))
+    columns = {k: [v, v] for k, v in context.items()}
+    result = evaluate_batch(plan, test_complex_rule_feature, "default", columns)
+    assert result.values == [expected.value, expected.value]
+    assert result.paths == [expected.path, expected.path]
+
+
+def test_batch_scalar_columns_broadcast(test_feature_two_level_traversal):
+    plan = build_plan(test_feature_two_level_traversal, "ns_1")
+    result = evaluate_batch(plan, test_feature_two_level_traversal, "ns_1", {"age": 12, "city": ["Rome", "Milan"]})
+    assert result.paths == [[1, 0], [1]]
+
+
+def test_batch_skips_unreachable_nodes(test_feature_default_value, test_feature_constraint_value):
+    feature = single_rule_feature(Rule(bool_const=False), test_feature_default_value, test_feature_constraint_value)
+    feature.tree.constraints[0].constraints.append(Constraint(rule_ast_new=Rule(bool_const=True)))
+    feature.tree.constraints.append(
+        Constraint(
+            rule_ast_new=atom(ComparisonOperator.COMPARISON_OPERATOR_PRESENT), value=test_feature_constraint_value
+        )
+    )
+    plan = build_plan(feature, "ns_1")
+    assert plan.start == 2
+    result = evaluate_batch(plan, feature, "ns_1", {"key": [1, None]})
+    assert result.paths == [[1], []]
+
+
+def test_batch_mismatched_columns(test_feature_two_level_traversal):
+    plan = build_plan(test_feature_two_level_traversal, "ns_1")
+    with pytest.raises(LekkoError):
+        evaluate_batch(plan, test_feature_two_level_traversal, "ns_1", {"age": [1, 2], "city": ["Rome"]})
+
+
+BUCKET_IDS = [
+    ["user_1", "user_2", "", "é", "a very long user identifier that spans stripes", "🙂" * 9],
+    np.array(["user_1", "user_2", "user_300"]),
+    [0, 1, 255, 2**32, 2**63 - 1],
+    np.arange(1000, dtype=np.int32),
+    [0.0, -0.0, 1.5, -2.25, float("inf"), 1e300],
+    ["user_1", 12, 12.5, None],
+    ["user_1", "user_1\x00", "\x00"],
+]
+
+
+@pytest.mark.parametrize("ids", BUCKET_IDS)
+@pytest.mark.parametrize(
+    "namespace, config_name", [("ns_1", "feature_1"), ("", ""), ("namespace", "config_with_long_name")]
+)
+def test_bucket_values_match_scalar(ids, namespace, config_name):
+    values = ids.tolist() if isinstance(ids, np.ndarray) else ids
+    rule = Rule(call_expression=CallExpression(bucket=CallExpression.Bucket(context_key="key", threshold=50000)))
+
+    buckets = bucket_values(namespace, config_name, "key", ids)
+    mask = bucket_mask(namespace, config_name, "key", ids, 50000)
+
+    for value, bucket, passed in zip(values, buckets.tolist(), mask.tolist()):
+        context = convert_context({"key": value} if value is not None else {})
+        assert passed == evaluate_rule(rule, namespace, config_name, context)
+        assert bucket == (-1 if value is None else _scalar_bucket(namespace, config_name, "key", value))
+
+
+def _scalar_bucket(namespace: str, config_name: str, context_key: str, value: Any) -> int:
+    if isinstance(value, str):
+        value_bytes = bytes(value, "utf-8")
+    elif isinstance(value, int):
+        value_bytes = value.to_bytes(8, byteorder="big")
+    else:
+        value_bytes = struct.pack(">d", value)
+    return int(xxh32(bytes(namespace + config_name + context_key, "utf-8") + value_bytes, 0).intdigest() % 100000)
+
+
+def test_bucket_values_errors():
+    with pytest.raises(EvaluationError):
+        bucket_values("ns_1", "feature_1", "key", [True, False])
+    with pytest.raises(OverflowError):
+        bucket_values("ns_1", "feature_1", "key", np.array([1, -1]))
@@ -0,0 +1,45 @@
+from google.protobuf.any_pb2 import Any as ProtoAny
+
+from lekko_client.evaluation.cache import CacheInfo, ResultCache, project_context
+from lekko_client.evaluation.evaluation import EvaluationResult
+
+
+def test_lru_eviction():
+    cache = ResultCache(2)
+    results = [EvaluationResult(ProtoAny(), [i]) for i in range(3)]
+    cache.put("a", results[0], cache.generation)
+    cache.put("b", results[1], cache.generation)
+    assert cache.get("a") is results[0]
+    cache.put("c", results[2], cache.generation)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is results[0]
+    assert cache.get("c") is results[2]
+    assert cache.info() == CacheInfo(hits=3, misses=1, maxsize=2, currsize=2)
+
+
+def test_clear_discards_stale_results():
+    cache = ResultCache(2)
+    generation = cache.generation
+    cache.put("a", EvaluationResult(ProtoAny(), []), generation)
+    cache.clear()
+    assert cache.get("a") is None
+
+    # Evaluated before the clear, so must not be cached
+    cache.put("a", EvaluationResult(ProtoAny(), []), generation)
+    assert cache.get("a") is None
+    assert cache.info().currsize == 0
+
+
+def test_project_context():
+    context = {"a": 1, "b": True, "c": "x", "d": 1.5, "unused": "y"}
+    assert project_context(context, ("a", "b", "c", "d", "missing")) == (
+        (int, 1),
+        (bool, True),
+        (str, "x"),
+        (float, 1.5, 1.0),
+        None,
+    )
+    assert project_context({"a": 1}, ("a",)) != project_context({"a": True}, ("a",))
+    assert project_context({"a": None}, ("a",)) != project_context({}, ("a",))
+    assert project_context({"a": 0.0}, ("a",)) != project_context({"a": -0.0}, ("a",))
@@ -0,0 +1,219 @@
+from enum import IntEnum
+from typing import Any
+from unittest import mock
+
+import pytest
+from google.protobuf.struct_pb2 import Struct, Value
+
+from lekko_client.evaluation.compiler import RuleTable, compile_rule
+from lekko_client.evaluation.rules import evaluate_rule
+from lekko_client.exceptions import EvaluationError
+from lekko_client.gen.lekko.rules.v1beta3.rules_pb2 import (
+    Atom,
+    CallExpression,
+    ComparisonOperator,
+    LogicalExpression,
+    LogicalOperator,
+    Rule,
+)
+from lekko_client.helpers import convert_context, get_value_kind, normalize_context
+
+
+def convert_to_value(v: Any) -> Value:
+    s = Struct()
+    s.update({"key": v})
+    return s.fields["key"]
+
+
+def atom(op: ComparisonOperator.ValueType, value: Any = None, key: str = "key") -> Rule:
+    if value is None:
+        return Rule(atom=Atom(context_key=key, comparison_operator=op))
+    return Rule(atom=Atom(context_key=key, comparison_operator=op, comparison_value=convert_to_value(value)))
+
+
+def any_of(*rules: Rule) -> Rule:
+    return Rule(logical_expression=LogicalExpression(logical_operator=LogicalOperator.LOGICAL_OPERATOR_OR, rules=rules))
+
+
+RULES = [
+    Rule(),
+    Rule(bool_const=True),
+    Rule(bool_const=False),
+    Rule(call_expression=CallExpression()),
+    Rule(call_expression=CallExpression(bucket=CallExpression.Bucket(context_key="key", threshold=50000))),
+    Rule(logical_expression=LogicalExpression(logical_operator=LogicalOperator.LOGICAL_OPERATOR_AND)),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_UNSPECIFIED),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_PRESENT),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_EQUALS, "Rome"),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_EQUALS, 12),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_EQUALS, True),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_EQUALS, ["Rome"]),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_NOT_EQUALS, 12),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_LESS_THAN, 12),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_LESS_THAN_OR_EQUALS, 12),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_GREATER_THAN, 12),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_GREATER_THAN_OR_EQUALS, 12.5),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_GREATER_THAN_OR_EQUALS, "12"),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_CONTAINED_WITHIN, ["Rome", "Paris"]),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_CONTAINED_WITHIN, [12, 13.5]),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_CONTAINED_WITHIN, ["Rome", 12]),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_CONTAINED_WITHIN, "Rome"),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_CONTAINED_WITHIN, [12, "Rome", True]),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_CONTAINED_WITHIN, [False, 11, "Paris"]),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_CONTAINED_WITHIN, ["Paris", ["Rome"], "Rome"]),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_CONTAINED_WITHIN, []),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_CONTAINED_WITHIN, [str(i) for i in range(1000)] + [12]),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_STARTS_WITH, "Ro"),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_ENDS_WITH, "me"),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_CONTAINS, "om"),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_CONTAINS, 12),
+    Rule(
+        logical_expression=LogicalExpression(
+            logical_operator=LogicalOperator.LOGICAL_OPERATOR_OR,
+            rules=[
+                atom(ComparisonOperator.COMPARISON_OPERATOR_EQUALS, "Rome"),
+                atom(ComparisonOperator.COMPARISON_OPERATOR_LESS_THAN, 12),
+            ],
+        )
+    ),
+    Rule(
+        logical_expression=LogicalExpression(
+            logical_operator=LogicalOperator.LOGICAL_OPERATOR_AND,
+            rules=[
+                atom(ComparisonOperator.COMPARISON_OPERATOR_PRESENT),
+                Rule(**{"not": atom(ComparisonOperator.COMPARISON_OPERATOR_EQUALS, 12)}),
+            ],
+        )
+    ),
+    # OR chains of string comparisons
+    any_of(
+        atom(ComparisonOperator.COMPARISON_OPERATOR_STARTS_WITH, "Ro"),
+        atom(ComparisonOperator.COMPARISON_OPERATOR_ENDS_WITH, "is"),
+        atom(ComparisonOperator.COMPARISON_OPERATOR_CONTAINS, "2"),
+    ),
+    any_of(
+        atom(ComparisonOperator.COMPARISON_OPERATOR_CONTAINS, "a.b"),
+        atom(ComparisonOperator.COMPARISON_OPERATOR_CONTAINS, "(|"),
+        atom(ComparisonOperator.COMPARISON_OPERATOR_ENDS_WITH, "zz"),
+    ),
+    any_of(
+        atom(ComparisonOperator.COMPARISON_OPERATOR_STARTS_WITH, "Pa"),
+        atom(ComparisonOperator.COMPARISON_OPERATOR_ENDS_WITH, ""),
+    ),
+    any_of(
+        atom(ComparisonOperator.COMPARISON_OPERATOR_STARTS_WITH, "Pa"),
+        atom(ComparisonOperator.COMPARISON_OPERATOR_CONTAINS, 12),
+        atom(ComparisonOperator.COMPARISON_OPERATOR_STARTS_WITH, "Ro"),
+    ),
+    any_of(
+        atom(ComparisonOperator.COMPARISON_OPERATOR_STARTS_WITH, "Pa"),
+        atom(ComparisonOperator.COMPARISON_OPERATOR_STARTS_WITH, "Ro", key="other"),
+    ),
+    any_of(
+        atom(ComparisonOperator.COMPARISON_OPERATOR_STARTS_WITH, "Pa"),
+        atom(ComparisonOperator.COMPARISON_OPERATOR_EQUALS, "Rome"),
+    ),
+]
+
+CONTEXTS = [
+    None,
+    {},
+    {"other": 1},
+    {"key": "Rome"},
+    {"key": "Paris"},
+    {"key": "a.b"},
+    {"key": "axb"},
+    {"key": "x(|y"},
+    {"key": "12"},
+    {"key": 12},
+    {"key": 11},
+    {"key": 12.0},
+    {"key": 13.5},
+    {"key": True},
+    {"key": False},
+    {"key": 0},
+]
+
+
+def _outcome(fn: Any) -> Any:
+    try:
+        return fn()
+    except EvaluationError as e:
+        return ("error", str(e))
+
+
+@pytest.mark.parametrize("rule", RULES)
+@pytest.mark.parametrize("context", CONTEXTS)
+def test_compiled_rule_matches_interpreter(rule, context):
+    client_context = convert_context(context) if context is not None else None
+    native_context = normalize_context(context) if context is not None else None
+    predicate = compile_rule(rule, "ns_1", "feature_1")
+    expected = _outcome(lambda: evaluate_rule(rule, "ns_1", "feature_1", client_context))
+    assert _outcome(lambda: predicate(native_context, None)) == expected
+
+
+class Level(IntEnum):
+    LOW = 1
+
+
+@pytest.mark.parametrize("value", [Level.LOW, None, b"12", 2**63 - 1, 2**63, -(2**63) - 1, "\ud800", "é"])
+def test_normalized_values_match_converted_values(value):
+    try:
+        expected = convert_context({"key": value})["key"]
+    except Exception as e:
+        with pytest.raises(type(e)):
+            normalize_context({"key": value})
+        return
+    normalized = normalize_context({"key": value})["key"]
+    assert getattr(expected, expected.WhichOneof("kind")) == normalized
+    assert get_value_kind(expected) == get_value_kind(normalized)
+
+
+def test_rule_table_interning():
+    table = RuleTable()
+    rule = Rule(
+        logical_expression=LogicalExpression(
+            logical_operator=LogicalOperator.LOGICAL_OPERATOR_AND,
+            rules=[
+                atom(ComparisonOperator.COMPARISON_OPERATOR_EQUALS, "Rome"),
+                atom(ComparisonOperator.COMPARISON_OPERATOR_LESS_THAN, 12),
+            ],
+        )
+    )
+    bucket = Rule(call_expression=CallExpression(bucket=CallExpression.Bucket(context_key="key", threshold=50000)))
+
+    assert table.compile(rule, "ns_1", "feature_1") is table.compile(rule, "ns_2", "feature_2")
+    assert len(table) == 3
+    # Buckets hash the namespace and config name, they are only shared within a config
+    assert table.compile(bucket, "ns_1", "feature_1") is table.compile(bucket, "ns_1", "feature_1")
+    assert table.compile(bucket, "ns_1", "feature_1") is not table.compile(bucket, "ns_2", "feature_1")
+
+
+def test_compiled_rules_share_memo():
+    table = RuleTable()
+    equals = atom(ComparisonOperator.COMPARISON_OPERATOR_EQUALS, "Rome")
+    context = normalize_context({"key": "Rome"})
+    memo = {}
+    assert table.compile(equals, "ns_1", "feature_1")(context, memo) is True
+    assert list(memo.values()) == [True]
+
+    # Other configs reuse the memoized result of identical subtrees
+    memo = {slot: False for slot in memo}
+    negated = Rule(**{"not": equals})
+    assert table.compile(negated, "ns_2", "feature_2")(context, memo) is True
+    assert len(memo) == 2
+
+
+def test_buckets_share_encoded_values():
+    table = RuleTable()
+    bucket = Rule(call_expression=CallExpression(bucket=CallExpression.Bucket(context_key="key", threshold=50000)))
+    context = normalize_context({"key": "user-1"})
+    memo = {}
+    first = table.compile(bucket, "ns_1", "feature_1")(context, memo)
+    assert b"user-1" in memo.values()
+
+    # Buckets of other configs on the same key reuse the encoded value, and hash it with their own prefix
+    with mock.patch("lekko_client.evaluation.compiler._bucket_bytes", side_effect=AssertionError):
+        second = table.compile(bucket, "ns_1", "feature_2")(context, memo)
+    assert first == evaluate_rule(bucket, "ns_1", "feature_1", convert_context({"key": "user-1"}))
+    assert second == evaluate_rule(bucket, "ns_1", "feature_2", convert_context({"key": "user-1"}))
@@ -0,0 +1,123 @@
+import itertools
+from typing import Any
+
+import pytest
+from google.protobuf.struct_pb2 import Struct, Value
+
+from lekko_client.evaluation.compiler import compile_rule
+from lekko_client.evaluation.folding import fold_rule, rule_constant
+from lekko_client.exceptions import EvaluationError
+from lekko_client.gen.lekko.rules.v1beta3.rules_pb2 import (
+    Atom,
+    CallExpression,
+    ComparisonOperator,
+    LogicalExpression,
+    LogicalOperator,
+    Rule,
+)
+from lekko_client.helpers import normalize_context
+
+
+def convert_to_value(v: Any) -> Value:
+    s = Struct()
+    s.update({"key": v})
+    return s.fields["key"]
+
+
+def atom(op: ComparisonOperator.ValueType, value: Any = None, key: str = "key") -> Rule:
+    if value is None:
+        return Rule(atom=Atom(context_key=key, comparison_operator=op))
+    return Rule(atom=Atom(context_key=key, comparison_operator=op, comparison_value=convert_to_value(value)))
+
+
+def logical(op: LogicalOperator.ValueType, *rules: Rule) -> Rule:
+    return Rule(logical_expression=LogicalExpression(logical_operator=op, rules=rules))
+
+
+def negate(rule: Rule) -> Rule:
+    negation = Rule()
+    getattr(negation, "not").CopyFrom(rule)
+    return negation
+
+
+LEAVES = [
+    Rule(bool_const=True),
+    Rule(bool_const=False),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_PRESENT),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_EQUALS, "Rome"),
+    # Raises for string values
+    atom(ComparisonOperator.COMPARISON_OPERATOR_LESS_THAN, 12),
+    atom(ComparisonOperator.COMPARISON_OPERATOR_STARTS_WITH, "Ro", key="other"),
+    Rule(call_expression=CallExpression(bucket=CallExpression.Bucket(context_key="key", threshold=50000))),
+    Rule(logical_expression=LogicalExpression(logical_operator=LogicalOperator.LOGICAL_OPERATOR_AND)),
+]
+
+OPERATORS = [
+    LogicalOperator.LOGICAL_OPERATOR_AND,
+    LogicalOperator.LOGICAL_OPERATOR_OR,
+    LogicalOperator.LOGICAL_OPERATOR_UNSPECIFIED,
+]
+
+RULES = [
+    *LEAVES,
+    *(negate(leaf) for leaf in LEAVES),
+    *(logical(op, a, b) for op in OPERATORS for a, b in itertools.product(LEAVES, repeat=2)),
+    logical(
+        LogicalOperator.LOGICAL_OPERATOR_OR,
+        negate(LEAVES[3]),
+        logical(LogicalOperator.LOGICAL_OPERATOR_AND, LEAVES[5], LEAVES[4], LEAVES[2]),
+    ),
+]
+
+BASE_CONTEXTS = [{}, {"key": "Rome"}, {"key": "Paris"}, {"key": 11}, {"key": 12.5}, {"key": True}]
+
+OTHER_VALUES = [{}, {"other": "Rome"}, {"other": "Paris"}, {"other": 1}]
+
+
+def _outcome(predicate: Any, context: Any) -> Any:
+    try:
+        return predicate(context, None)
+    except EvaluationError as e:
+        return ("error", str(e))
+
+
+@pytest.mark.parametrize("base_context", BASE_CONTEXTS)
+def test_folded_rules_match_original(base_context):
+    native_base = normalize_context(base_context)
+    for rule in RULES:
+        folded = fold_rule(rule, native_base, "ns_1", "feature_1")
+        original_predicate = compile_rule(rule, "ns_1", "feature_1")
+        folded_predicate = compile_rule(folded, "ns_1", "feature_1")
+        for other in OTHER_VALUES:
+            context = normalize_context(base_context | other)
+            assert _outcome(folded_predicate, context) == _outcome(original_predicate, context), (rule, folded)
+
+
+def test_fold_rule():
+    rome = atom(ComparisonOperator.COMPARISON_OPERATOR_EQUALS, "Rome")
+    less_than = atom(ComparisonOperator.COMPARISON_OPERATOR_LESS_THAN, 12)
+    other = atom(ComparisonOperator.COMPARISON_OPERATOR_STARTS_WITH, "Ro", key="other")
+    present = atom(ComparisonOperator.COMPARISON_OPERATOR_PRESENT, key="other")
+    base_context = normalize_context({"key": "Rome"})
+
+    assert fold_rule(rome, base_context, "ns", "config") == Rule(bool_const=True)
+    assert fold_rule(negate(rome), base_context, "ns", "config") == Rule(bool_const=False)
+    # Rules that can't be folded are returned as they are
+    assert fold_rule(other, base_context, "ns", "config") is other
+    assert fold_rule(rome, None, "ns", "config") is rome
+    assert fold_rule(less_than, base_context, "ns", "config") is less_than
+
+    assert fold_rule(logical(LogicalOperator.LOGICAL_OPERATOR_AND, rome, other), base_context, "ns", "config") == other
+    assert rule_constant(
+        fold_rule(logical(LogicalOperator.LOGICAL_OPERATOR_OR, present, rome), base_context, "ns", "config")
+    )
+    # The children before a constant that decides the result are kept when they can raise
+    assert fold_rule(
+        logical(LogicalOperator.LOGICAL_OPERATOR_OR, less_than, rome, other), base_context, "ns", "config"
+    ) == logical(LogicalOperator.LOGICAL_OPERATOR_OR, less_than, Rule(bool_const=True))
+    assert fold_rule(
+        logical(LogicalOperator.LOGICAL_OPERATOR_AND, Rule(bool_const=True), Rule(bool_const=True)),
+        None,
+        "ns",
+        "config",
+    ) == Rule(bool_const=True)
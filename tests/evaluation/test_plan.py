@@ -0,0 +1,241 @@
+import random
+
+import pytest
+from google.protobuf.wrappers_pb2 import Int64Value
+
+from lekko_client.evaluation.evaluation import evaluate
+from lekko_client.evaluation.plan import build_plan
+from lekko_client.exceptions import EvaluationError
+from lekko_client.gen.lekko.feature.v1beta1.feature_pb2 import Constraint, Feature
+from lekko_client.gen.lekko.rules.v1beta3.rules_pb2 import (
+    Atom,
+    ComparisonOperator,
+    LogicalExpression,
+    LogicalOperator,
+    Rule,
+)
+from lekko_client.helpers import convert_context, normalize_context
+
+
+@pytest.mark.parametrize(
+    "context",
+    [
+        {"a": 1},
+        {"a": 1, "c": 3},
+        {"c": 3},
+        {"f": 3},
+        {"f": 5},
+        {"h": 4},
+        {"i": 4},
+        {"p": "a foo bar"},
+        {"q": "hello world"},
+        {"r": "a foo bar"},
+        {"s": 2},
+        {"t": "anything"},
+        {"u": 11},
+    ],
+)
+def test_plan_matches_interpreter(test_complex_rule_feature, context):
+    expected = evaluate(test_complex_rule_feature, "default", convert_context(context))
+    result = build_plan(test_complex_rule_feature, "default").evaluate(normalize_context(context))
+    assert result == expected
+    assert result.value.Unpack(Int64Value())
+
+
+@pytest.mark.parametrize(
+    "feature_fixture_name",
+    ["test_feature_no_constraints", "test_feature_one_level_traversal", "test_feature_two_level_traversal"],
+)
+@pytest.mark.parametrize(
+    "context",
+    [None, {}, {"age": 5}, {"age": 10}, {"age": 12}, {"age": 10, "city": "Rome"}, {"age": 12, "city": "Paris"}],
+)
+def test_plan_paths(feature_fixture_name, context, request):
+    feature = request.getfixturevalue(feature_fixture_name)
+    client_context = convert_context(context) if context is not None else None
+    native_context = normalize_context(context) if context is not None else None
+    plan = build_plan(feature, "ns_1")
+    assert plan.evaluate(native_context) == evaluate(feature, "ns_1", client_context)
+
+
+def test_plan_results_are_prebuilt(test_feature_two_level_traversal):
+    plan = build_plan(test_feature_two_level_traversal, "ns_1")
+    context = normalize_context({"age": 12, "city": "Paris"})
+    assert plan.evaluate(context) is plan.evaluate(context)
+    assert plan.next_sibling == [3, 2, -1, -1, 5, -1]
+    assert plan.first_child == [1, -1, -1, 4, -1, -1]
+
+
+def test_plan_skips_rules_missing_required_keys(test_feature_two_level_traversal):
+    plan = build_plan(test_feature_two_level_traversal, "ns_1")
+    assert plan.key_bits == {"age": 1, "city": 2}
+    assert plan.required == [1, 2, 2, 1, 2, 2]
+
+    plan.predicates = [_unexpected_call] * len(plan.predicates)
+    assert plan.evaluate(normalize_context({"country": "Italy"})) == plan.default
+    assert plan.evaluate() == plan.default
+
+
+def test_plan_skipping_keeps_errors():
+    feature = Feature(key="config")
+    feature.tree.default.Pack(Int64Value(value=0))
+    string_equals = Rule(
+        atom=Atom(
+            context_key="a",
+            comparison_operator=ComparisonOperator.COMPARISON_OPERATOR_EQUALS,
+            comparison_value={"string_value": "x"},
+        )
+    )
+    rule = Rule(
+        logical_expression=LogicalExpression(
+            logical_operator=LogicalOperator.LOGICAL_OPERATOR_AND,
+            rules=[string_equals, Rule(atom=Atom(context_key="b"))],
+        )
+    )
+    feature.tree.constraints.append(Constraint(rule_ast_new=rule))
+    plan = build_plan(feature, "ns")
+    assert plan.required == [plan.key_bits["a"]]
+
+    # The first atom raises on an int, so a missing "b" can't skip the rule
+    context = {"a": 1}
+    with pytest.raises(EvaluationError) as expected:
+        evaluate(feature, "ns", convert_context(context))
+    with pytest.raises(EvaluationError) as actual:
+        plan.evaluate(normalize_context(context))
+    assert str(actual.value) == str(expected.value)
+    assert plan.evaluate(normalize_context({"b": 1})) == plan.default
+
+
+def _lookup_table_feature(seed):
+    rng = random.Random(seed)
+    values = [{"string_value": "a"}, {"string_value": "b"}, {"number_value": 1}, {"number_value": 2.5}]
+    values += [{"bool_value": True}, {"null_value": 0}]
+    feature = Feature(key="config")
+    feature.tree.default.Pack(Int64Value(value=-1))
+    for i in range(40):
+        key = rng.choice(["region", "region", "region", "tier"])
+        if rng.random() < 0.5:
+            atom = Atom(
+                context_key=key,
+                comparison_operator=ComparisonOperator.COMPARISON_OPERATOR_CONTAINED_WITHIN,
+                comparison_value={"list_value": {"values": rng.sample(values, rng.randint(0, 3))}},
+            )
+        else:
+            operator = rng.choice(
+                [ComparisonOperator.COMPARISON_OPERATOR_EQUALS] * 5 + [ComparisonOperator.COMPARISON_OPERATOR_PRESENT]
+            )
+            atom = Atom(context_key=key, comparison_operator=operator, comparison_value=rng.choice(values[:5]))
+        constraint = Constraint(rule_ast_new=Rule(atom=atom))
+        constraint.value.Pack(Int64Value(value=i))
+        feature.tree.constraints.append(constraint)
+    return feature
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_plan_dispatch_matches_interpreter(seed):
+    feature = _lookup_table_feature(seed)
+    plan = build_plan(feature, "ns")
+    assert plan.dispatch
+    for region in [None, "a", "b", "c", 1, 1.0, 2.5, 3, True, False]:
+        for tier in [None, "a", 2.5]:
+            context = {k: v for k, v in {"region": region, "tier": tier}.items() if v is not None}
+            try:
+                expected = evaluate(feature, "ns", convert_context(context))
+            except EvaluationError as e:
+                with pytest.raises(EvaluationError, match=str(e)):
+                    plan.evaluate(normalize_context(context))
+            else:
+                assert plan.evaluate(normalize_context(context)) == expected
+
+
+def _range_feature(seed):
+    rng = random.Random(seed)
+    numbers = [{"number_value": n} for n in (-1, 0, 0.5, 1, 10, 100, 2**53, float("inf"), float("nan"))]
+    operators = [
+        ComparisonOperator.COMPARISON_OPERATOR_LESS_THAN,
+        ComparisonOperator.COMPARISON_OPERATOR_LESS_THAN_OR_EQUALS,
+        ComparisonOperator.COMPARISON_OPERATOR_GREATER_THAN,
+        ComparisonOperator.COMPARISON_OPERATOR_GREATER_THAN_OR_EQUALS,
+    ]
+    feature = Feature(key="config")
+    feature.tree.default.Pack(Int64Value(value=-1))
+    for i in range(30):
+        value = rng.choice(numbers * 10 + [{"string_value": "1"}])
+        atom = Atom(context_key=rng.choice(["size"] * 9 + ["other"]), comparison_value=value)
+        atom.comparison_operator = rng.choice(operators * 10 + [ComparisonOperator.COMPARISON_OPERATOR_EQUALS])
+        constraint = Constraint(rule_ast_new=Rule(atom=atom))
+        constraint.value.Pack(Int64Value(value=i))
+        feature.tree.constraints.append(constraint)
+    return feature
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_plan_intervals_match_interpreter(seed):
+    feature = _range_feature(seed)
+    plan = build_plan(feature, "ns")
+    assert plan.dispatch
+    sizes = [None, -2, -1, -0.5, 0, -0.0, 0.25, 0.5, 1, 1.0, 5, 10, 99.9, 100, 2**53, 2**53 + 1, 1e300]
+    sizes += [float("inf"), float("-inf"), float("nan"), "1", True]
+    for size in sizes:
+        context = {"size": size} if size is not None else {}
+        try:
+            expected = evaluate(feature, "ns", convert_context(context))
+        except EvaluationError as e:
+            with pytest.raises(EvaluationError, match=str(e)):
+                plan.evaluate(normalize_context(context))
+        else:
+            assert plan.evaluate(normalize_context(context)) == expected
+
+
+def _unexpected_call(context, memo):
+    raise AssertionError("predicate should have been skipped")
+
+
+def test_plan_empty_config_tree():
+    with pytest.raises(EvaluationError):
+        build_plan(Feature(), "ns").evaluate()
+
+
+@pytest.mark.parametrize(
+    "base_context", [{"age": 10}, {"age": 12}, {"age": "10"}, {"city": "Rome"}, {"age": 10, "city": "Paris"}]
+)
+@pytest.mark.parametrize("context", [{}, {"age": 5}, {"city": "Rome"}, {"city": "Paris"}, {"country": "Italy"}])
+def test_plan_specialized_for_base_context(test_feature_two_level_traversal, base_context, context):
+    context = context | base_context
+    plan = build_plan(test_feature_two_level_traversal, "ns_1", base_context=normalize_context(base_context))
+    try:
+        expected = evaluate(test_feature_two_level_traversal, "ns_1", convert_context(context))
+    except EvaluationError as e:
+        # Rules that raise for the base values aren't folded
+        with pytest.raises(EvaluationError, match=str(e)):
+            plan.evaluate(normalize_context(context))
+    else:
+        assert plan.evaluate(normalize_context(context)) == expected
+
+
+def test_plan_folds_constant_rules(test_feature_two_level_traversal):
+    plan = build_plan(test_feature_two_level_traversal, "ns_1", base_context={"age": 12})
+    # Only the second top level constraint can pass, and its children still depend on the city
+    assert plan.start == 3
+    assert plan.constant is None
+    assert plan.context_keys == ("city",)
+    assert plan.next_sibling == [-1, -1, -1, -1, 5, -1]
+
+    plan = build_plan(test_feature_two_level_traversal, "ns_1", base_context={"age": 10, "city": "Paris"})
+    assert plan.constant is not None
+    assert plan.constant.path == [0, 1]
+    plan.predicates = [_unexpected_call] * len(plan.predicates)
+    assert plan.evaluate({"age": 10, "city": "Paris"}) is plan.constant
+
+    feature = Feature(key="config")
+    feature.tree.default.Pack(Int64Value(value=0))
+    for i, rule in enumerate([Rule(bool_const=False), Rule(bool_const=True), Rule(atom=Atom(context_key="a"))]):
+        constraint = Constraint(rule_ast_new=rule)
+        constraint.value.Pack(Int64Value(value=i))
+        feature.tree.constraints.append(constraint)
+    plan = build_plan(feature, "ns")
+    assert plan.constant == evaluate(feature, "ns")
+    assert plan.constant.path == [1]
+    # The constraint after one that always passes is never visited
+    assert plan.start == 1
+    assert plan.next_sibling == [-1, -1, -1]
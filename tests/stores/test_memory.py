@@ -0,0 +1,190 @@
+from unittest import mock
+
+import pytest
+
+from lekko_client.evaluation.plan import build_plan
+from lekko_client.exceptions import ConfigNotFoundError, NamespaceNotFound
+from lekko_client.gen.lekko.backend.v1beta1.distribution_service_pb2 import (
+    Feature as DistFeature,
+)
+from lekko_client.gen.lekko.backend.v1beta1.distribution_service_pb2 import (
+    GetRepositoryContentsResponse,
+    Namespace,
+)
+from lekko_client.stores.memory import MemoryStore
+from lekko_client.stores.store import ChangeSet
+
+
+@pytest.fixture
+def contents(test_feature_one_level_traversal) -> GetRepositoryContentsResponse:
+    return GetRepositoryContentsResponse(
+        commit_sha="commit_1",
+        namespaces=[
+            Namespace(
+                name="ns_1",
+                features=[DistFeature(name="key", sha="sha_1", feature=test_feature_one_level_traversal)],
+            )
+        ],
+    )
+
+
+def test_load(contents):
+    store = MemoryStore()
+    assert store.load(contents)
+    assert store.commit_sha == "commit_1"
+
+    config_data = store.get("ns_1", "key")
+    assert config_data.config_sha == "sha_1"
+    assert config_data.plan is not None
+
+    # Loading identical contents is a no-op
+    assert store.load(contents) is None
+
+    with pytest.raises(NamespaceNotFound):
+        store.get("ns_2", "key")
+    with pytest.raises(ConfigNotFoundError):
+        store.get("ns_1", "missing")
+
+
+def test_load_interns_rules(test_feature_one_level_traversal):
+    contents = GetRepositoryContentsResponse(
+        commit_sha="commit_1",
+        namespaces=[
+            Namespace(
+                name=name, features=[DistFeature(name="key", sha="sha_1", feature=test_feature_one_level_traversal)]
+            )
+            for name in ["ns_1", "ns_2"]
+        ],
+    )
+    store = MemoryStore()
+    assert store.load(contents)
+    assert store.get("ns_1", "key").plan.predicates == store.get("ns_2", "key").plan.predicates
+
+
+def test_load_specializes_for_base_context(contents):
+    store = MemoryStore()
+    store.base_context = {"age": 10}
+    assert store.load(contents)
+    config_data = store.get("ns_1", "key")
+    assert config_data.base_plan.constant.path == [0]
+    assert config_data.plan.constant is None
+
+
+def test_load_skips_specialization_for_unread_base_context(contents):
+    store = MemoryStore()
+    store.base_context = {"region": "eu"}
+    assert store.load(contents)
+    assert store.get("ns_1", "key").base_plan is None
+
+
+def test_incremental_load(test_feature_one_level_traversal, test_feature_no_constraints):
+    def contents(commit_sha, *features):
+        return GetRepositoryContentsResponse(
+            commit_sha=commit_sha,
+            namespaces=[
+                Namespace(
+                    name="ns_1",
+                    features=[DistFeature(name=name, sha=sha, feature=feature) for name, sha, feature in features],
+                )
+            ],
+        )
+
+    store = MemoryStore()
+    changes = store.load(
+        contents(
+            "commit_1",
+            ("a", "sha_a", test_feature_one_level_traversal),
+            ("b", "sha_b", test_feature_one_level_traversal),
+            ("c", "sha_c", test_feature_one_level_traversal),
+        )
+    )
+    assert changes == ChangeSet(added=[("ns_1", "a"), ("ns_1", "b"), ("ns_1", "c")])
+    a, b = store.get("ns_1", "a"), store.get("ns_1", "b")
+
+    with mock.patch("lekko_client.stores.memory.build_plan", wraps=build_plan) as compile_plan:
+        changes = store.load(
+            contents(
+                "commit_2",
+                ("a", "sha_a", test_feature_one_level_traversal),
+                ("b", "sha_b2", test_feature_no_constraints),
+                ("d", "sha_d", test_feature_no_constraints),
+            )
+        )
+    assert changes == ChangeSet(added=[("ns_1", "d")], changed=[("ns_1", "b")], removed=[("ns_1", "c")])
+    # Only new and changed configs are compiled, unchanged ones are reused along with their plans
+    assert compile_plan.call_count == 2
+    assert store.get("ns_1", "a") is a
+    assert store.get("ns_1", "b") is not b and store.get("ns_1", "b").plan.constant is not None
+    with pytest.raises(ConfigNotFoundError):
+        store.get("ns_1", "c")
+
+    # A new commit without config changes
+    changes = store.load(
+        contents(
+            "commit_3",
+            ("a", "sha_a", test_feature_one_level_traversal),
+            ("b", "sha_b2", test_feature_no_constraints),
+            ("d", "sha_d", test_feature_no_constraints),
+        )
+    )
+    assert changes == ChangeSet()
+    assert store.commit_sha == "commit_3"
+    assert store.get("ns_1", "a") is a
+
+    # Configs without a sha, and plans specialized for another base context, are rebuilt
+    store.base_context = {"age": 10}
+    changes = store.load(
+        contents(
+            "commit_4",
+            ("a", "sha_a", test_feature_one_level_traversal),
+            ("b", "", test_feature_no_constraints),
+            ("d", "sha_d", test_feature_no_constraints),
+        )
+    )
+    assert changes == ChangeSet(changed=[("ns_1", "b")])
+    assert store.get("ns_1", "a") is not a
+    assert store.get("ns_1", "a").base_plan is not None
+
+
+def test_hash_contents(test_feature_one_level_traversal, test_feature_no_constraints):
+    def contents(*namespaces):
+        return GetRepositoryContentsResponse(
+            commit_sha="commit_1",
+            namespaces=[
+                Namespace(
+                    name=name,
+                    features=[DistFeature(name=key, sha=sha, feature=feature) for key, sha, feature in features],
+                )
+                for name, features in namespaces
+            ],
+        )
+
+    a = ("a", "sha_a", test_feature_one_level_traversal)
+    b = ("b", "sha_b", test_feature_one_level_traversal)
+    content_hash = MemoryStore.hash_contents(contents(("ns_1", [a, b]), ("ns_2", [a])))
+    # The order of namespaces and configs doesn't matter
+    assert MemoryStore.hash_contents(contents(("ns_2", [a]), ("ns_1", [b, a]))) == content_hash
+    # Configs are hashed from their shas
+    assert MemoryStore.hash_contents(contents(("ns_1", [a, b]), ("ns_2", [b]))) != content_hash
+    assert MemoryStore.hash_contents(contents(("ns_1", [a, b]), ("ns_3", [a]))) != content_hash
+    assert (
+        MemoryStore.hash_contents(contents(("ns_1", [a, b]), ("ns_2", [("a", "sha_a", test_feature_no_constraints)])))
+        == content_hash
+    )
+    # Configs without a sha are hashed from their contents
+    assert MemoryStore.hash_contents(
+        contents(("ns_1", [("a", "", test_feature_one_level_traversal)]))
+    ) != MemoryStore.hash_contents(contents(("ns_1", [("a", "", test_feature_no_constraints)])))
+
+    store = MemoryStore()
+    assert store.load(contents(("ns_1", [b, a])))
+    assert list(store.get_namespace("ns_1")) == ["a", "b"]
+    # Unchanged contents are neither sorted nor serialized
+    unchanged = contents(("ns_1", [a, b]))
+    with (
+        mock.patch.object(MemoryStore, "sort_contents") as sort_contents,
+        mock.patch.object(DistFeature, "SerializeToString") as serialize,
+    ):
+        assert store.load(unchanged) is None
+    sort_contents.assert_not_called()
+    serialize.assert_not_called()
@@ -0,0 +1,97 @@
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from enum import IntEnum
+from unittest import mock
+
+import pytest
+
+from lekko_client.context import Context, context_scope, current_scope
+from lekko_client.helpers import convert_context, get_context_keys, normalize_context
+
+
+class Level(IntEnum):
+    LOW = 1
+
+
+def test_context_values():
+    values = {"user": "a", "level": Level.LOW, "ratio": 0.5, "beta": True, "other": b"x"}
+    context = Context(values)
+    assert dict(context) == normalize_context(values)
+    assert context.native == normalize_context(values)
+    assert type(context["level"]) is int
+    assert "user" in context and "missing" not in context
+    assert len(context) == 5
+    assert context.proto_values == convert_context(values)
+    assert context.context_keys == tuple(get_context_keys(convert_context(values)))
+    # Conversions are cached
+    assert context.proto_values is context.proto_values
+    assert context.context_keys is context.context_keys
+    assert Context(context).native is context.native
+
+    with pytest.raises(ValueError):
+        Context({"big": 2**63})
+
+
+def test_context_keys_are_interned():
+    key = "".join(["us", "er"])
+    assert next(iter(Context({key: 1}))) is sys.intern("user")
+
+
+def test_context_equality():
+    assert Context({"a": 1, "b": "x"}) == Context({"b": "x", "a": 1})
+    assert hash(Context({"a": 1, "b": "x"})) == hash(Context({"b": "x", "a": 1}))
+    assert Context({"a": 1}) != Context({"a": True})
+    assert Context({"a": 1}) != Context({"a": 1.0})
+    assert Context({"a": 1}) != Context({"a": 2})
+    assert len({Context({"a": 1}), Context({"a": 1}), Context()}) == 2
+
+
+def test_context_merged():
+    base = {"env": "prod", "region": "eu", "user": "base"}
+    context = Context({"user": "a", "level": 2})
+    merged = context.merged(base)
+    assert list(merged.items()) == list(normalize_context(base | {"user": "a", "level": 2}).items())
+    assert context.merged({}) is context
+
+    # Merging with an equal base again reuses the last result
+    with mock.patch("lekko_client.context.normalize_value") as normalize_value:
+        assert context.merged(dict(base)) is merged
+    normalize_value.assert_not_called()
+    assert context.merged(base | {"env": "dev"})["env"] == "dev"
+
+
+def test_context_merged_typed_base():
+    context = Context({"user": "a"})
+    # Bases equal as dicts but holding different context values aren't merged from the cache
+    for value in [1, True, 1.0, 0.0, -0.0]:
+        merged = context.merged({"x": value})
+        assert type(merged["x"]) is type(value)
+        assert repr(merged["x"]) == repr(value)
+
+
+def test_context_scope():
+    assert current_scope() is None
+    with context_scope(user="a", tenant="t") as outer:
+        assert outer == Context({"user": "a", "tenant": "t"})
+        assert current_scope().context is outer
+        with context_scope({"context": 1, "user": "b"}, level=2) as inner:
+            assert dict(inner) == {"user": "b", "tenant": "t", "context": 1, "level": 2}
+        assert current_scope().context is outer
+    assert current_scope() is None
+
+
+def test_context_scopes_are_isolated():
+    with context_scope(user="a"):
+        with ThreadPoolExecutor(1) as executor:
+            assert executor.submit(current_scope).result() is None
+
+    async def read(user):
+        with context_scope(user=user):
+            await asyncio.sleep(0)
+            return current_scope().context["user"]
+
+    async def main():
+        return await asyncio.gather(read("a"), read("b"))
+
+    assert asyncio.run(main()) == ["a", "b"]
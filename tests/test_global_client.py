@@ -0,0 +1,207 @@
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import pytest
+
+import lekko_client
+from lekko_client.clients import Client
+from lekko_client.exceptions import ClientNotInitialized
+
+
+def test_not_initialized():
+    lekko_client.close()
+    with pytest.raises(ClientNotInitialized):
+        lekko_client.get_int("ns", "config")
+
+
+def test_set_client_closes_previous_client():
+    first = mock.Mock(spec=Client)
+    second = mock.Mock(spec=Client)
+    first.get_int.return_value = 1
+    second.get_int.return_value = 2
+
+    lekko_client.set_client(first)
+    assert lekko_client.get_int("ns", "config", {"a": 1}) == 1
+    first.get_int.assert_called_once_with("ns", "config", {"a": 1})
+
+    lekko_client.set_client(second)
+    first.close.assert_called_once()
+    assert lekko_client.get_int("ns", "config") == 2
+
+    lekko_client.close()
+    second.close.assert_called_once()
+    with pytest.raises(ClientNotInitialized):
+        lekko_client.get_int("ns", "config")
+
+
+def test_bind():
+    # Handles can be declared before the client is initialized
+    handle = lekko_client.bind("ns", "config", int)
+    lekko_client.close()
+    with pytest.raises(ClientNotInitialized):
+        handle()
+
+    first = mock.Mock(spec=Client)
+    first.bind.return_value.return_value = 1
+    lekko_client.set_client(first)
+    assert handle({"a": 1}) == 1
+    assert handle() == 1
+    first.bind.assert_called_once_with("ns", "config", int)
+    first.bind.return_value.assert_called_with({})
+    with lekko_client.context_scope(user="a") as context:
+        handle()
+        first.bind.return_value.assert_called_with(context)
+
+    # Bound again to a new client
+    second = mock.Mock(spec=Client)
+    second.bind.return_value.return_value = 2
+    lekko_client.set_client(second)
+    assert handle() == 2
+    lekko_client.close()
+
+
+def test_get_many():
+    client = mock.Mock(spec=Client)
+    client.get_many.return_value = [1, True]
+    lekko_client.set_client(client)
+    requests = [("ns", "a", int), ("ns", "b", bool)]
+    assert lekko_client.get_many(requests, {"a": 1}) == [1, True]
+    client.get_many.assert_called_with(requests, {"a": 1})
+    with lekko_client.context_scope(user="a") as context:
+        lekko_client.get_many(requests)
+        client.get_many.assert_called_with(requests, context)
+    lekko_client.close()
+
+
+def test_previous_client_closed_after_reads_in_flight():
+    reading = threading.Event()
+    done_reading = threading.Event()
+    first = mock.Mock(spec=Client)
+    second = mock.Mock(spec=Client)
+    second.get_int.return_value = 2
+
+    def slow_read(*args):
+        reading.set()
+        done_reading.wait(5)
+        # The client must not be closed while a read is using it
+        assert not first.close.called
+        return 1
+
+    first.get_int.side_effect = slow_read
+    lekko_client.set_client(first)
+    with ThreadPoolExecutor(2) as executor:
+        read = executor.submit(lekko_client.get_int, "ns", "config")
+        reading.wait()
+        swap = executor.submit(lekko_client.set_client, second)
+        # Reads started after the swap use the new client, without waiting for the previous one
+        assert lekko_client.get_int("ns", "config") == 2
+        swap_done = swap.done()
+        done_reading.set()
+        assert not swap_done
+        assert read.result() == 1
+        swap.result()
+    first.close.assert_called_once()
+    lekko_client.close()
+
+
+def test_close_from_read():
+    client = mock.Mock(spec=Client)
+
+    def read(*args):
+        lekko_client.close()
+        # Closed once the read is done
+        assert not client.close.called
+        return 1
+
+    client.get_int.side_effect = read
+    lekko_client.set_client(client)
+    results = []
+    reader = threading.Thread(target=lambda: results.append(lekko_client.get_int("ns", "config")), daemon=True)
+    reader.start()
+    reader.join(5)
+    assert results == [1]
+    client.close.assert_called_once()
+    with pytest.raises(ClientNotInitialized):
+        lekko_client.get_int("ns", "config")
+
+
+def test_set_client_from_read_during_swap():
+    reading = threading.Event()
+    first = mock.Mock(spec=Client)
+    second = mock.Mock(spec=Client)
+    second.get_int.return_value = 2
+    third = mock.Mock(spec=Client)
+    third.get_int.return_value = 3
+
+    def read(*args):
+        if reading.is_set():
+            return 1
+        reading.set()
+        # Waits for the swap below, which waits for this read
+        while lekko_client.get_int("ns", "config") != 2:
+            pass
+        lekko_client.set_client(third)
+        return 1
+
+    first.get_int.side_effect = read
+    lekko_client.set_client(first)
+    results = []
+    reader = threading.Thread(target=lambda: results.append(lekko_client.get_int("ns", "config")), daemon=True)
+    reader.start()
+    reading.wait()
+    swap = threading.Thread(target=lekko_client.set_client, args=(second,), daemon=True)
+    swap.start()
+    reader.join(5)
+    swap.join(5)
+    assert results == [1]
+    assert not swap.is_alive()
+    first.close.assert_called_once()
+    second.close.assert_called_once()
+    assert lekko_client.get_int("ns", "config") == 3
+    lekko_client.close()
+
+
+SWAPS = 100
+
+
+class CountingClient(mock.NonCallableMock):
+    def __init__(self, value, closed):
+        super().__init__(spec=Client)
+        self.value = value
+        self.closed = closed
+
+    def get_int(self, *args):
+        return -1 if self.value in self.closed else self.value
+
+    def close(self):
+        self.closed.add(self.value)
+
+
+def test_concurrent_reads_and_swaps():
+    # Switch threads often to interleave reads with swaps
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-4)
+    closed = set()
+    stop = threading.Event()
+
+    def read():
+        results = []
+        while not stop.is_set():
+            results.append(lekko_client.get_int("ns", "config"))
+        return results
+
+    try:
+        lekko_client.set_client(CountingClient(0, closed))
+        with ThreadPoolExecutor(4) as executor:
+            readers = [executor.submit(read) for _ in range(4)]
+            for i in range(1, SWAPS):
+                lekko_client.set_client(CountingClient(i, closed))
+            stop.set()
+            results = [r for reader in readers for r in reader.result()]
+    finally:
+        sys.setswitchinterval(switch_interval)
+    assert results and -1 not in results
+    lekko_client.close()
+    assert closed == set(range(SWAPS))